@@ -0,0 +1,48 @@
+"""
+Start-up time of the lightweight and the full gsdc import paths
+
+    python benchmarks/import_time.py --repeat 20
+
+Each statement runs in a fresh interpreter; the time of a bare interpreter
+start is subtracted, so the numbers are the cost of the import itself
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Final, List, Optional
+
+ROOT: Final[str] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATEMENTS: Final[Dict[str, str]] = {
+    "check_script": "import gsdc; gsdc.check_script('(A)1[(B)2](A)2')",
+    "parsers": "import gsdc; gsdc.bonds_parser('(A)3'); gsdc.types_parser('(A)3')",
+    "cli": "import gsdc.cli",
+    "full": "import gsdc; gsdc.Pot; gsdc.Writer; gsdc.ConformerLibrary",
+}
+
+
+def best_of(statement: str, repeat: int) -> float:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True, env=env)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+    bare = best_of("pass", args.repeat)
+    for name, statement in STATEMENTS.items():
+        ms = (best_of(statement, args.repeat) - bare) * 1e3
+        print(f"{name:16s} {ms:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Scaling benchmarks of every gsdc stage
+
+Each case builds its input outside of the timed region, then measures the
+wall time of one stage, its peak traced memory and, for writers, the
+output rate. Results are written to JSON and can be compared with a
+stored baseline:
+
+    python benchmarks/run.py --sizes 1e3 1e4 1e5 --output bench.json
+    python benchmarks/run.py --output bench.json --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --threshold 0.25
+
+The exit code is 1 if some case is slower than its baseline by more than
+the threshold. Everything runs offline in a temporary directory
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Final, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gsdc import Box, Mol, MolGraph, Pot, bonds_parser, types_parser
+
+SIZES: Final[List[int]] = [1000, 10000]
+CHAIN: Final[int] = 100
+RING: Final[int] = 20
+TOPOLOGIES: Final[Tuple[str, ...]] = ("linear", "branched", "cyclic")
+
+Case = Tuple[Callable[[], object], Callable[[object], Optional[int]]]
+
+
+def script(topology: str, num_beads: int) -> str:
+    """Script of a tree molecule with about num_beads beads"""
+    if topology == "branched":
+        return f"(A)1((A)2[(B)2]){max(num_beads // 4, 1)}"
+    return f"(A){num_beads}"
+
+
+class Ring(MolGraph):
+    """Cyclic molecule, scripts describe only trees"""
+
+    def __init__(self, num_beads: int) -> None:
+        self.script = f"ring{num_beads}"
+        self.types = ["A"] * num_beads
+        bonds = [(i, i + 1) for i in range(num_beads - 1)] + [(0, num_beads - 1)]
+        super().__init__(bonds)
+
+
+def molecule(topology: str, num_beads: int) -> MolGraph:
+    if topology == "cyclic":
+        return Ring(num_beads)
+    return Mol(script(topology, num_beads))
+
+
+def box_for(size: int, rho: float = 3.0, periodic: bool = True) -> Box:
+    """Cubic box for size beads, with walls on every axis if not periodic"""
+    edge = (size / rho) ** (1.0 / 3.0)
+    return Box(edge, edge, edge, pbc=(periodic,) * 3)
+
+
+def solvated(size: int, topology: str) -> Pot:
+    """Solvent-heavy pot: 10 % of beads in chains, the rest is solvent"""
+    pot = Pot(box_for(size), seed=0)
+    mol = Mol(script(topology if topology != "cyclic" else "linear", CHAIN))
+    pot.add_many(mol, max(size // (10 * CHAIN), 1), workers=1)
+    pot.fuller("W")
+    return pot
+
+
+def cases(size: int, topology: str, periodic: bool, directory: str) -> Dict[str, Case]:
+    """Stage name -> (setup, run); run returns the number of written bytes"""
+    path = os.path.join(directory, "out")
+    length = RING if topology == "cyclic" else CHAIN
+    copies = max(size // length, 1)
+
+    def layout(mol: MolGraph) -> None:
+        box = box_for(size, periodic=periodic)
+        rng = np.random.default_rng(0)
+        for _ in range(copies):
+            mol.get_coords(box, periodic=periodic, rng=rng)
+
+    def written(run: Callable[[Pot], None]) -> Callable[[object], Optional[int]]:
+        def wrapper(pot: object) -> int:
+            run(pot)  # type: ignore
+            return os.path.getsize(path)
+
+        return wrapper
+
+    result: Dict[str, Case] = {
+        "get_coords": (lambda: molecule(topology, length), layout),  # type: ignore
+        "pot_add": (
+            lambda: (
+                Pot(box_for(size, periodic=periodic), seed=0),
+                molecule(topology, length),
+            ),
+            lambda s: s[0].add_many(s[1], copies, workers=1),  # type: ignore
+        ),
+    }
+    if topology != "cyclic":
+        text = script(topology, size)
+        result["bonds_parser"] = (lambda: text, bonds_parser)  # type: ignore
+        result["types_parser"] = (lambda: text, types_parser)  # type: ignore
+        result["check_graph"] = (
+            lambda: bonds_parser(text),
+            lambda bonds: MolGraph(bonds),  # type: ignore
+        )
+    if periodic:
+        result["fuller"] = (
+            lambda: Pot(box_for(size), seed=0),
+            lambda pot: pot.fuller("W"),  # type: ignore
+        )
+        result["brew"] = (
+            lambda: solvated(size, topology),
+            written(lambda pot: pot.brew(name=path)),
+        )
+        result["dl_meso_config"] = (
+            lambda: solvated(size, topology),
+            written(lambda pot: pot.dl_meso_config(file=path)),
+        )
+        result["dl_meso_field"] = (
+            lambda: solvated(size, topology),
+            written(lambda pot: pot.dl_meso_field(file=path)),
+        )
+    return result
+
+
+def measure(case: Case, memory: bool) -> Dict[str, float]:
+    """Times one case and, optionally, repeats it under tracemalloc"""
+    setup, run = case
+    state = setup()
+    start = time.perf_counter()
+    written = run(state)
+    seconds = time.perf_counter() - start
+    record: Dict[str, float] = {"seconds": seconds}
+    if isinstance(written, int):
+        record["mb_per_s"] = written / 1e6 / max(seconds, 1e-9)
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        run(state)
+        record["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return record
+
+
+def run_all(
+    sizes: List[int], topologies: List[str], stages: Optional[List[str]], memory: bool
+) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            for topology in topologies:
+                for periodic in (True, False):
+                    table = cases(size, topology, periodic, directory)
+                    for stage, case in table.items():
+                        if stages and stage not in stages:
+                            continue
+                        box = "periodic" if periodic else "walls"
+                        key = f"{stage}/{topology}/{box}/{size}"
+                        results[key] = measure(case, memory)
+                        print(f"{key:48s} {results[key]['seconds']:10.4f} s")
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Cases slower than the baseline by more than threshold"""
+    regressions = list()
+    for key, record in results.items():
+        if key in baseline:
+            ratio = record["seconds"] / max(baseline[key]["seconds"], 1e-9)
+            if ratio > 1.0 + threshold:
+                regressions.append(f"{key}: {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=float, default=SIZES)
+    parser.add_argument("--topologies", nargs="+", default=list(TOPOLOGIES))
+    parser.add_argument("--stages", nargs="+", default=None)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_all(
+        [int(size) for size in args.sizes],
+        args.topologies,
+        args.stages,
+        not args.no_memory,
+    )
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, mode="w") as f:
+                json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,57 @@
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
 from .bonds_parser import bonds_parser
 from .bondset import Bondtype
 from .check_graph import CheckGraph
 from .check_script import check_script
-from .constructor import MolGraph, rnd_vector
 from .exceptions import (EmptyGraphError, FixedDictError, FixedOutBoxError,
                          FixedRootError, GapsMolGraphError,
                          IterationLimitError, MolGraphConnectionError,
                          MolGraphSimplicityError, NegativeValueError,
-                         OutBoxError)
-from .gsdc import Pot
-from .molecule import Mol
-from .periodic_box import Box
+                         OutBoxError, QualityError)
 from .types_parser import types_parser
 
+if TYPE_CHECKING:
+    from .conformers import ConformerLibrary
+    from .constructor import MolGraph, rnd_vector
+    from .gsdc import Pot
+    from .molecule import Mol
+    from .periodic_box import Box
+    from .profiler import Profiler
+    from .writer import Writer
+
+# NumPy and gsd are imported only when one of these names is first used,
+# so validation-only tools (check_script, parsers) start fast
+_LAZY: Dict[str, str] = {
+    "ConformerLibrary": ".conformers",
+    "MolGraph": ".constructor",
+    "rnd_vector": ".constructor",
+    "Pot": ".gsdc",
+    "Mol": ".molecule",
+    "Box": ".periodic_box",
+    "Profiler": ".profiler",
+    "Writer": ".writer",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY))
+
+
 __all__ = [
     "bonds_parser",
     "Bondtype",
     "CheckGraph",
+    "ConformerLibrary",
     "rnd_vector",
     "MolGraph",
     "NegativeValueError",
@@ -29,9 +64,12 @@ __all__ = [
     "EmptyGraphError",
     "IterationLimitError",
     "OutBoxError",
+    "QualityError",
     "Box",
     "types_parser",
     "check_script",
     "Mol",
     "Pot",
+    "Profiler",
+    "Writer",
 ]
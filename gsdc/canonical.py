@@ -0,0 +1,293 @@
+"""
+Canonical form of type-labelled molecular graphs
+
+Different scripts may describe the same molecule, e.g. "(A)2(B)1" and
+"(B)1(A)2". Colour refinement (1-dimensional Weisfeiler-Lehman) starting
+from bead types splits beads into order-independent classes; every bead
+of the first tied class is individualized in turn and refined again, and
+the leaf of this search with the smallest relabelled graph gives the
+canonical numbering. The key of a molecule is the digest of its bonds and
+types in that numbering, so equal keys mean identical graphs and
+equivalent scripts always get equal keys. Trees, e.g. linear and
+branched chains, are numbered in near-linear time instead: subtrees
+hanging from the tree centre are ranked level by level (Aho, Hopcroft and
+Ullman) and beads are numbered depth-first with children in rank order
+"""
+
+import hashlib
+import json
+import weakref
+from collections import Counter
+from functools import cached_property
+from typing import Final, List, Sequence, Tuple
+
+import numpy as np
+
+VERSION: Final[int] = 3
+
+
+def _neighbours(num_beads: int, bonds: np.ndarray) -> np.ndarray:
+    """(num_beads, max_degree) neighbour ids padded with num_beads"""
+    ends = np.concatenate([bonds, bonds[:, ::-1]])
+    ends = ends[np.lexsort((ends[:, 1], ends[:, 0]))]
+    degree = np.bincount(ends[:, 0], minlength=num_beads)
+    slot = np.arange(len(ends)) - np.repeat(np.cumsum(degree) - degree, degree)
+    table = np.full((num_beads, max(int(degree.max(initial=0)), 1)), num_beads)
+    table[ends[:, 0], slot] = ends[:, 1]
+    return table
+
+
+def refine(colors: np.ndarray, neighbours: np.ndarray) -> np.ndarray:
+    """
+    Colour refinement up to the stable partition
+
+    Colours are ranks of (own colour, sorted neighbour colours) signatures,
+    so they do not depend on the bead numbering
+
+    Args:
+        colors (np.ndarray): (n,) initial integer colours
+        neighbours (np.ndarray): padded neighbour table of _neighbours
+
+    Returns:
+        np.ndarray: (n,) stable colours numbered from 0
+    """
+    _, colors = np.unique(colors, return_inverse=True)
+    count = colors.max(initial=-1) + 1
+    while True:
+        padded = np.append(colors, -1)[neighbours]
+        padded.sort(axis=1)
+        signature = np.column_stack([colors, padded])
+        order = np.lexsort(signature.T[::-1])
+        ordered = signature[order]
+        changed = np.any(ordered[1:] != ordered[:-1], axis=1)
+        colors = np.empty_like(colors)
+        colors[order] = np.cumsum(np.concatenate([[0], changed]))
+        new_count = colors.max(initial=-1) + 1
+        if new_count == count:
+            return colors
+        count = new_count
+
+
+def _prepare(types: Sequence[str], bonds: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    edges = np.array(bonds, dtype=np.int64).reshape(-1, 2)
+    num_beads = max(len(types), int(edges.max(initial=-1)) + 1)
+    names = {name: i for i, name in enumerate(sorted(set(types)))}
+    colors = np.array([names[t] for t in types] or [0] * num_beads)
+    return colors, _neighbours(num_beads, edges)
+
+
+def _breadth_first(
+    start: List[int], adjacency: List[List[int]]
+) -> Tuple[List[int], List[int]]:
+    """Visiting order and parents from start beads (parent of a start is -1)"""
+    parent = [-2] * len(adjacency)
+    for bead in start:
+        parent[bead] = -1
+    visited = list(start)
+    for bead in visited:
+        for other in adjacency[bead]:
+            if parent[other] == -2:
+                parent[other] = bead
+                visited.append(other)
+    return visited, parent
+
+
+def tree_order(colors: np.ndarray, neighbours: np.ndarray) -> np.ndarray:
+    """
+    Canonical numbering of a tree
+
+    The centre (one bead or two bonded ones) roots the tree. Subtrees are
+    ranked from the deepest level up by (colour, sorted ranks of children),
+    equal ranks on a level mean isomorphic subtrees, so any tie gives the
+    same relabelled graph
+
+    Args:
+        colors (np.ndarray): (n,) bead colours
+        neighbours (np.ndarray): padded neighbour table of _neighbours
+
+    Returns:
+        np.ndarray: order[c] is the bead placed at canonical position c,
+            shorter than n if the graph is not connected
+    """
+    n = len(colors)
+    adjacency = [row[row < n].tolist() for row in neighbours]
+    visited, _ = _breadth_first([0], adjacency)
+    visited, parent = _breadth_first([visited[-1]], adjacency)
+    path = [visited[-1]]
+    while parent[path[-1]] >= 0:
+        path.append(parent[path[-1]])
+    roots = path[(len(path) - 1) // 2 : len(path) // 2 + 1]
+    visited, parent = _breadth_first(roots, adjacency)
+    depth = [0] * n
+    for bead in visited[len(roots) :]:
+        depth[bead] = depth[parent[bead]] + 1
+    children: List[List[int]] = [[] for _ in range(n)]
+    for bead in visited[len(roots) :]:
+        children[parent[bead]].append(bead)
+    levels: List[List[int]] = [[] for _ in range(depth[visited[-1]] + 1)]
+    for bead in visited:
+        levels[depth[bead]].append(bead)
+    rank = [0] * n
+    color = colors.tolist()
+    for level in reversed(levels):
+        labels = [
+            (color[bead], tuple(sorted(rank[child] for child in children[bead])))
+            for bead in level
+        ]
+        index = {label: i for i, label in enumerate(sorted(set(labels)))}
+        for bead, label in zip(level, labels):
+            rank[bead] = index[label]
+    order: List[int] = []
+    stack = sorted(roots, key=lambda bead: rank[bead], reverse=True)
+    while stack:
+        bead = stack.pop()
+        order.append(bead)
+        stack.extend(sorted(children[bead], key=lambda c: rank[c], reverse=True))
+    return np.array(order, dtype=np.int64)
+
+
+def _relabel(order: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Bonds in the numbering of order, each bond and the list sorted"""
+    rank = np.argsort(order)
+    relabelled = np.sort(rank[edges], axis=1)
+    return relabelled[np.lexsort((relabelled[:, 1], relabelled[:, 0]))]
+
+
+def _find(orbits: List[int], bead: int) -> int:
+    """Representative of the orbit of a bead, with path halving"""
+    while orbits[bead] != bead:
+        orbits[bead] = orbits[orbits[bead]]
+        bead = orbits[bead]
+    return bead
+
+
+def canonical_order(types: Sequence[str], bonds: Sequence) -> np.ndarray:
+    """
+    Canonical numbering by individualization and refinement
+
+    Every bead of the first tied colour class is individualized in turn,
+    down to discrete colourings; the numbering that gives the smallest
+    relabelled graph is kept. Leaves with equal graphs reveal automorphisms
+    and first choices in the orbit of an explored one are skipped
+
+    Args:
+        types (Sequence[str]): bead types
+        bonds (Sequence): bonded bead ids
+
+    Returns:
+        np.ndarray: order[c] is the bead placed at canonical position c
+    """
+    colors, neighbours = _prepare(types, bonds)
+    edges = np.array(bonds, dtype=np.int64).reshape(-1, 2)
+    if len(edges) == len(colors) - 1:
+        order = tree_order(colors, neighbours)
+        if len(order) == len(colors):
+            return order
+    orbits = list(range(len(colors)))
+    explored: List[int] = list()
+    best: Tuple[List[int], List[int], np.ndarray] = ([], [], np.arange(0))
+    # (colours, bead to individualize or -1, depth)
+    stack: List[Tuple[np.ndarray, int, int]] = [(colors, -1, 0)]
+    while stack:
+        current, chosen, depth = stack.pop()
+        if depth == 1:
+            root = _find(orbits, chosen)
+            if any(_find(orbits, bead) == root for bead in explored):
+                continue
+            explored.append(chosen)
+        if chosen >= 0:
+            current = 2 * current + 1
+            current[chosen] -= 1
+        current = refine(current, neighbours)
+        sizes = np.bincount(current)
+        if len(sizes) < len(current):
+            tied = np.flatnonzero(current == np.flatnonzero(sizes > 1)[0])
+            stack.extend((current, int(bead), depth + 1) for bead in tied[::-1])
+            continue
+        order = np.argsort(current)
+        leaf = (colors[order].tolist(), _relabel(order, edges).ravel().tolist())
+        if len(best[2]) == 0 or leaf < best[:2]:
+            best = leaf + (order,)
+        elif leaf == best[:2]:
+            # equal relabelled graphs: the two numberings differ by an
+            # automorphism, beads it maps onto each other share an orbit
+            for a, b in zip(best[2].tolist(), order.tolist()):
+                orbits[_find(orbits, a)] = _find(orbits, b)
+    return best[2]
+
+
+def canonical_form(types: Sequence[str], bonds: Sequence) -> Tuple[np.ndarray, str]:
+    """
+    Canonical numbering and the key of a molecule
+
+    Args:
+        types (Sequence[str]): bead types
+        bonds (Sequence): bonded bead ids
+
+    Returns:
+        Tuple[np.ndarray, str]: canonical order and hex digest of the
+            relabelled types and bonds
+    """
+    order = canonical_order(types, bonds)
+    relabelled = _relabel(order, np.array(bonds, dtype=np.int64).reshape(-1, 2))
+    description = {
+        "version": VERSION,
+        "types": [types[i] for i in order] if len(types) else [],
+        "bonds": relabelled.tolist(),
+    }
+    text = json.dumps(description, sort_keys=True)
+    return order, hashlib.sha1(text.encode()).hexdigest()
+
+
+class Topology:
+    """
+    Canonical form of a molecule with bonds and, optionally, bead types
+
+    The signature is a cheap invariant, so the key is only needed to tell
+    apart molecules with equal signatures
+    """
+
+    bonds: List[Tuple[int, int]]
+
+    @cached_property
+    def canonical(self) -> Tuple[np.ndarray, str]:
+        """Canonical order of beads and topology key"""
+        return canonical_form(getattr(self, "types", []), self.bonds)
+
+    @property
+    def key(self) -> str:
+        """Stable key of the type-labelled topology, equal for equivalent scripts"""
+        return self.canonical[1]
+
+    @cached_property
+    def signature(self) -> Tuple:
+        """Numbers of beads and bonds, type counts and the degree histogram"""
+        types = getattr(self, "types", [])
+        edges = np.reshape(np.array(self.bonds, dtype=np.int64), (-1, 2))
+        degree = np.bincount(edges.ravel(), minlength=len(types))
+        return (
+            len(degree),
+            len(edges),
+            tuple(sorted(Counter(types).items())),
+            tuple(np.bincount(degree).tolist()),
+        )
+
+
+_interned: "weakref.WeakValueDictionary[str, Topology]" = weakref.WeakValueDictionary()
+
+
+def intern(molecule):
+    """
+    Shared instance of a topology
+
+    The first molecule registered with a key represents every equivalent
+    one, so they share one layout, one conformer pool and one species.
+    Entries are held weakly and vanish with the last use of the molecule
+
+    Args:
+        molecule (MolGraph): molecule (Mol or bare MolGraph)
+
+    Returns:
+        MolGraph: registered equivalent molecule
+    """
+    return _interned.setdefault(molecule.key, molecule)
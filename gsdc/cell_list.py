@@ -0,0 +1,141 @@
+from typing import Final, Tuple
+
+import numpy as np
+
+from .periodic_box import Box
+
+CHUNK: Final[int] = 1 << 18
+
+
+class CellList:
+    """
+    Periodic cell list over bead coordinates
+
+    The box is split into cells with edges not shorter than cutoff, so all
+    pairs closer than cutoff are found among the 27 neighbouring cells.
+    Cells wrap around and distances use the minimum image only along the
+    periodic axes of the box, wall axes have no neighbours past the wall.
+    Everything is done with sorting and NumPy indexing, without Python
+    loops over beads
+
+    Attributes:
+        self.cutoff (float): search radius
+        self.lengths (np.ndarray): box edges
+        self.pbc (np.ndarray): periodic axes
+        self.shape (np.ndarray): number of cells along each axis
+        self.cell (np.ndarray): cell index of every bead
+        self.order (np.ndarray): bead ids sorted by cell
+        self.start (np.ndarray): first position of each cell in self.order
+        self.count (np.ndarray): number of beads in each cell
+    """
+
+    def __init__(self, coords: np.ndarray, box: Box, cutoff: float) -> None:
+        """
+        Args:
+            coords (np.ndarray): (n, 3) coordinates in the box centered at 0.0
+            box (Box): instance of box
+            cutoff (float): search radius
+
+        Raises:
+            ValueError: cutoff is not positive
+        """
+        if cutoff <= 0.0:
+            raise ValueError("CellList: cutoff <= 0")
+        self.coords = np.reshape(coords, (-1, 3))
+        self.cutoff = cutoff
+        self.lengths = box.lengths
+        self.pbc = np.array(box.pbc)
+        self.shape = np.maximum((self.lengths // cutoff).astype(np.int64), 1)
+        frac = self.coords / self.lengths + 0.5
+        frac = np.where(self.pbc, frac % 1.0, np.clip(frac, 0.0, 1.0))
+        xyz = np.minimum((frac * self.shape).astype(np.int64), self.shape - 1)
+        self.cell = np.ravel_multi_index(xyz.T, self.shape)
+        self.order = np.argsort(self.cell, kind="stable")
+        num_cells = int(np.prod(self.shape))
+        self.count = np.bincount(self.cell, minlength=num_cells)
+        self.start = np.cumsum(self.count) - self.count
+
+    def _shifts(self) -> Tuple[np.ndarray, bool]:
+        """
+        Neighbour cell shifts and whether they cover each pair of cells once
+
+        A half shell (the zero shift and 13 of the 26 others) is enough
+        when shifts along periodic axes can't alias, i.e. those axes are
+        at least 3 cells wide. Otherwise all distinct shifts are used and
+        each pair of cells is visited from both sides
+        """
+        if np.all(~self.pbc | (self.shape >= 3)):
+            axes = [np.array([-1, 0, 1])] * 3
+            shifts = np.array(np.meshgrid(*axes, indexing="ij")).reshape(3, -1).T
+            return shifts[len(shifts) // 2 :], True
+        axes = [
+            np.unique(np.array([-1, 0, 1]) % n) if periodic else np.array([-1, 0, 1])
+            for n, periodic in zip(self.shape, self.pbc)
+        ]
+        shifts = np.array(np.meshgrid(*axes, indexing="ij")).reshape(3, -1).T
+        return np.where(self.pbc, (shifts + 1) % self.shape - 1, shifts), False
+
+    def pairs(
+        self, cutoff: float = 0.0, chunk: int = CHUNK
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds all pairs of beads closer than cutoff (minimum image)
+
+        Pairs are generated per pair of occupied neighbouring cells, so
+        the work grows with the number of beads and not with the number
+        of (mostly empty) cells
+
+        Args:
+            cutoff (float, optional): search radius not larger than self.cutoff.
+                Defaults to self.cutoff.
+            chunk (int, optional): occupied cells processed at once, bounds memory.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: i, j (i < j) and distance
+        """
+        cutoff = cutoff or self.cutoff
+        occupied = np.flatnonzero(self.count)
+        xyz = np.unravel_index(occupied, self.shape)
+        coords = self.coords[self.order]
+        image = np.where(self.pbc, self.lengths, np.inf)
+        shifts, half = self._shifts()
+        found_i, found_j, found_r = [], [], []
+        for shift in shifts:
+            same = not np.any(shift)
+            for a in range(0, len(occupied), chunk):
+                first = occupied[a : a + chunk]
+                second = np.zeros(len(first), dtype=np.int64)
+                valid = np.ones(len(first), dtype=bool)
+                for step, cell, n, periodic in zip(shift, xyz, self.shape, self.pbc):
+                    cell = cell[a : a + chunk] + step
+                    if periodic:
+                        cell[cell == n] = 0
+                        cell[cell < 0] = n - 1
+                    else:
+                        valid &= (cell >= 0) & (cell < n)
+                    second = second * n + cell
+                first, second = first[valid], second[valid]
+                m, n = self.count[first], self.count[second]
+                size = m * n
+                k = np.arange(int(size.sum())) - np.repeat(np.cumsum(size) - size, size)
+                p, q = np.divmod(k, np.repeat(n, size))
+                i = np.repeat(self.start[first], size) + p
+                j = np.repeat(self.start[second], size) + q
+                if same or not half:
+                    keep = i < j
+                    i, j = i[keep], j[keep]
+                d = coords[j] - coords[i]
+                d -= self.lengths * np.round(d / image)
+                r2 = np.einsum("ij,ij->i", d, d)
+                close = r2 < cutoff**2
+                i, j = self.order[i[close]], self.order[j[close]]
+                found_i.append(np.minimum(i, j))
+                found_j.append(np.maximum(i, j))
+                found_r.append(np.sqrt(r2[close]))
+        if not found_i:
+            return (
+                np.array([], dtype=np.int64),
+                np.array([], dtype=np.int64),
+                np.array([]),
+            )
+        return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_r)
@@ -0,0 +1,149 @@
+"""
+Checkpoints of pot builds
+
+A checkpoint is a single .npz file: coordinates, type ids with the type
+names, bonds, sampler buffers and a JSON header with the box, species,
+generator states and the recipe position. It is written to a temporary
+file and renamed, so an interrupted write never spoils the previous one
+"""
+
+import json
+import os
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
+
+from .bonds_parser import bonds_parser
+from .molecule import Mol
+from .periodic_box import Box
+from .polymers import Chain
+from .storage import Buffer
+from .types_parser import types_parser
+
+if TYPE_CHECKING:
+    from .gsdc import Pot
+
+VERSION = 1
+
+
+def _seed_state(seed_sequence: np.random.SeedSequence) -> dict:
+    return {
+        "entropy": seed_sequence.entropy,
+        "spawn_key": list(seed_sequence.spawn_key),
+        "pool_size": seed_sequence.pool_size,
+        "n_children_spawned": seed_sequence.n_children_spawned,
+    }
+
+
+def save(pot: "Pot", path: str, position: int = 0) -> None:
+    """
+    Writes the state of a pot
+
+    Args:
+        pot (Pot): pot to save
+        path (str): .npz file
+        position (int, optional): molecules of the recipe already added.
+            Defaults to 0.
+    """
+    sampler = pot.sampler.state()
+    header = {
+        "version": VERSION,
+        "box": [pot.box.x, pot.box.y, pot.box.z],
+        "pbc": list(pot.box.pbc),
+        "rho": pot.rho,
+        "molecules": pot.molecules,
+        "species": pot.species,
+        "sequence": pot.sequence,
+        "masses": pot.masses,
+        "charges": pot.charges,
+        "diameters": pot.diameters,
+        "bond_params": pot.bond_params,
+        "position": position,
+        "seed_sequence": _seed_state(pot.seed_sequence),
+        "rng": pot.rng.bit_generator.state,
+        "sampler": {"block": sampler["block"], "rng": sampler["rng"]},
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, mode="wb") as f:
+        np.savez(
+            f,
+            header=np.array(json.dumps(header)),
+            coords=pot.coords,
+            names=np.array(pot.type_names, dtype=str),
+            typeids=pot.typeid,
+            bonds=pot.bonds,
+            bond_names=np.array(pot.bond_names, dtype=str),
+            bond_typeids=pot.bond_typeid,
+            vectors=sampler["vectors"],
+            uniform=sampler["uniform"],
+        )
+    os.replace(tmp, path)
+
+
+def load(path: str) -> Tuple["Pot", int]:
+    """
+    Restores a pot written by save
+
+    Args:
+        path (str): .npz file
+
+    Raises:
+        ValueError: unsupported checkpoint version
+
+    Returns:
+        Tuple[Pot, int]: pot and the recipe position
+    """
+    from .gsdc import Pot
+
+    with np.load(path) as data:
+        header = json.loads(str(data["header"]))
+        if header["version"] != VERSION:
+            raise ValueError(f"checkpoint: unsupported version {header['version']}")
+        seed = header["seed_sequence"]
+        x, y, z = header["box"]
+        pot = Pot(
+            Box(x, y, z, pbc=header.get("pbc", (True, True, True))),
+            seed=np.random.SeedSequence(
+                seed["entropy"],
+                spawn_key=tuple(seed["spawn_key"]),
+                pool_size=seed["pool_size"],
+            ),
+            dtype=data["coords"].dtype,
+        )
+        pot.type_names = data["names"].tolist()
+        pot.bond_names = data["bond_names"].tolist()
+        pot._typeid = Buffer((), data["typeids"].dtype)
+        pot._bond_typeid = Buffer((), data["bond_typeids"].dtype)
+        pot._append_ids(data["coords"], data["typeids"], ())
+        pot._bonds.assign(data["bonds"])
+        pot._bond_typeid.assign(data["bond_typeids"])
+        pot.sampler.set_state(
+            {
+                **header["sampler"],
+                "vectors": data["vectors"],
+                "uniform": data["uniform"],
+            }
+        )
+    pot.seed_sequence = np.random.SeedSequence(
+        seed["entropy"],
+        spawn_key=tuple(seed["spawn_key"]),
+        pool_size=seed["pool_size"],
+        n_children_spawned=seed["n_children_spawned"],
+    )
+    pot.rng.bit_generator.state = header["rng"]
+    pot.rho = header["rho"]
+    pot.molecules = header["molecules"]
+    pot.species = header["species"]
+    pot.sequence = [
+        (script, count) for script, count in header.get("sequence", pot.species.items())
+    ]
+    pot.masses = header.get("masses", {})
+    pot.charges = header.get("charges", {})
+    pot.diameters = header.get("diameters", {})
+    pot.bond_params = {k: tuple(v) for k, v in header.get("bond_params", {}).items()}
+    for script in pot.species:
+        if bonds_parser(script):
+            pot._shared(Mol(script))
+        else:  # single bead chains of Pot.polydisperse
+            pot.topologies[script] = Chain(script, types_parser(script), [])
+    return pot, header["position"]
@@ -0,0 +1,267 @@
+"""
+Batch construction of systems from declarative recipes
+
+    gsdc recipe.json [--workers N] [--force] [--dry-run]
+
+A recipe (JSON or TOML) describes one system or a list of them under
+"systems"; top-level keys are defaults for every entry:
+
+    {
+        "output": "runs",
+        "name": "micelle",
+        "box": [10.0, 10.0, 10.0],
+        "rho": 3,
+        "seed": 1,
+        "molecules": [{"script": "(A)1[(B)2](A)2", "count": 20}],
+        "solvent": "W",
+        "formats": ["gsd", "config", "field"],
+        "conformers": "conformers.npz",
+        "order": "hilbert",
+        "sweep": {"rho": [3, 4], "molecules.0.count": [10, 20]}
+    }
+
+"sweep" expands an entry into the cartesian product of the listed values,
+keys are dotted paths into the entry. "solvent" is a bead type or a
+composition such as {"W": 0.9, "E": 0.1}, see Pot.fuller. "order" writes
+beads along a "morton" or "hilbert" curve, see Pot.brew. Each system is
+written into <output>/<name>_<index> and skipped if its files are up to date
+"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Final, List, Optional, Tuple
+
+from .writer import FILE_NAMES
+
+if TYPE_CHECKING:
+    from .conformers import ConformerLibrary
+    from .molecule import Mol
+
+STAMP: Final[str] = ".gsdc-recipe"
+DEFAULTS: Final[Dict[str, Any]] = {
+    "output": ".",
+    "name": "system",
+    "rho": 3,
+    "seed": None,
+    "molecules": [],
+    "solvent": "W",
+    "formats": ["gsd", "config", "field"],
+    "conformers": None,
+    "order": None,
+}
+
+System = Dict[str, Any]
+
+_libraries: Dict[str, "ConformerLibrary"] = dict()
+
+
+def load_recipe(path: str) -> Dict[str, Any]:
+    """
+    Reads a JSON or TOML recipe
+
+    Args:
+        path (str): recipe file, TOML if it ends with .toml
+
+    Returns:
+        Dict[str, Any]: recipe
+    """
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ModuleNotFoundError:  # Python < 3.11
+            import tomli as tomllib  # type: ignore
+        with open(path, mode="rb") as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _set(entry: Dict[str, Any], path: str, value: Any) -> None:
+    """Sets a value by a dotted path, list items are addressed by index"""
+    keys = path.split(".")
+    target: Any = entry
+    for key in keys[:-1]:
+        target = target[int(key)] if isinstance(target, list) else target[key]
+    if isinstance(target, list):
+        target[int(keys[-1])] = value
+    else:
+        target[keys[-1]] = value
+
+
+def expand(recipe: Dict[str, Any]) -> List[System]:
+    """
+    Expands a recipe into the list of systems
+
+    Args:
+        recipe (Dict[str, Any]): recipe
+
+    Raises:
+        ValueError: an entry has no box
+
+    Returns:
+        List[System]: systems with defaults, sweeps and names resolved
+    """
+    defaults = {k: v for k, v in recipe.items() if k != "systems"}
+    entries = recipe.get("systems", [dict()])
+    systems: List[System] = list()
+    for entry in entries:
+        base = copy.deepcopy({**DEFAULTS, **defaults, **entry})
+        sweep = base.pop("sweep", dict())
+        keys = list(sweep)
+        for values in itertools.product(*[sweep[k] for k in keys]):
+            system = copy.deepcopy(base)
+            for key, value in zip(keys, values):
+                _set(system, key, value)
+            if "box" not in system:
+                raise ValueError(f"gsdc: no box in {system['name']}")
+            system["name"] = f"{system['name']}_{len(systems)}"
+            system["directory"] = os.path.join(system["output"], system["name"])
+            systems.append(system)
+    return systems
+
+
+def digest(system: System) -> str:
+    """Hash of everything that defines the output of a system"""
+    text = json.dumps(system, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def outputs(system: System) -> List[str]:
+    return [os.path.join(system["directory"], FILE_NAMES[f]) for f in system["formats"]]
+
+
+def up_to_date(system: System) -> bool:
+    """True if the stamp matches the system and every output exists"""
+    stamp = os.path.join(system["directory"], STAMP)
+    if not all(os.path.exists(path) for path in outputs(system) + [stamp]):
+        return False
+    with open(stamp) as f:
+        return f.read().strip() == digest(system)
+
+
+@lru_cache(maxsize=None)
+def molecule(script: str) -> "Mol":
+    """
+    Parsed and validated molecule, shared by all systems of a worker
+
+    Equivalent scripts resolve to one instance, see gsdc.canonical.intern
+    """
+    from .canonical import intern
+    from .molecule import Mol
+
+    return intern(Mol(script))
+
+
+def library(path: Optional[str]) -> Optional["ConformerLibrary"]:
+    """Conformer library of a worker, loaded once per path"""
+    from .conformers import ConformerLibrary
+
+    if not path:
+        return None
+    if path not in _libraries:
+        _libraries[path] = ConformerLibrary(path)
+    return _libraries[path]
+
+
+def build(system: System) -> Tuple[str, float]:
+    """
+    Builds and writes one system
+
+    Args:
+        system (System): expanded recipe entry
+
+    Returns:
+        Tuple[str, float]: name of the system and build time in seconds
+    """
+    from .gsdc import Pot
+    from .periodic_box import Box
+
+    start = time.perf_counter()
+    pot = Pot(Box(*system["box"]), seed=system["seed"])
+    pot.rho = system["rho"]
+    conformers = library(system["conformers"])
+    for item in system["molecules"]:
+        pot.add_many(
+            molecule(item["script"]), item["count"], workers=1, library=conformers
+        )
+    if system["solvent"]:
+        pot.fuller(system["solvent"])
+    os.makedirs(system["directory"], exist_ok=True)
+    for fmt, path in zip(system["formats"], outputs(system)):
+        if fmt == "gsd":
+            pot.brew(name=path, order=system["order"])
+        elif fmt == "config":
+            pot.dl_meso_config(
+                name=system["name"],
+                solvent=system["solvent"],
+                file=path,
+                order=system["order"],
+            )
+        else:
+            pot.dl_meso_field(name=system["name"], file=path)
+    with open(os.path.join(system["directory"], STAMP), mode="w") as f:
+        f.write(digest(system) + "\n")
+    return system["name"], time.perf_counter() - start
+
+
+def warm_up(systems: List[System]) -> None:
+    """Generates conformers of all molecules once and saves the libraries"""
+    for path in {s["conformers"] for s in systems if s["conformers"]}:
+        conformers = library(path)
+        if conformers is None:
+            continue
+        for system in systems:
+            if system["conformers"] == path:
+                for item in system["molecules"]:
+                    conformers.get(molecule(item["script"]))
+        conformers.save()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="gsdc", description="Builds systems from a JSON/TOML recipe"
+    )
+    parser.add_argument("recipe", help="recipe file (.json or .toml)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="rebuild everything")
+    parser.add_argument("--dry-run", action="store_true", help="only list systems")
+    args = parser.parse_args(argv)
+
+    systems = expand(load_recipe(args.recipe))
+    todo = [s for s in systems if args.force or not up_to_date(s)]
+    for system in systems:
+        if system not in todo:
+            print(f"{system['name']:32s} up to date")
+    if args.dry_run:
+        for system in todo:
+            print(f"{system['name']:32s} -> {system['directory']}")
+        return 0
+    warm_up(todo)
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1 or len(todo) < 2:
+        results = map(build, todo)
+        for name, seconds in results:
+            print(f"{name:32s} {seconds:10.3f} s")
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for name, seconds in executor.map(build, todo):
+                print(f"{name:32s} {seconds:10.3f} s")
+    print(
+        f"{len(todo)} built, {len(systems) - len(todo)} skipped, "
+        f"{time.perf_counter() - start:.3f} s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Final, List, Optional
+
+import numpy as np
+
+from .constructor import BOND_LENGTH, ITERATION_LIMIT, MolGraph
+from .exceptions import IterationLimitError
+from .periodic_box import Box
+
+VERSION: Final[int] = 2
+POOL_SIZE: Final[int] = 16
+MAX_BYTES: Final[int] = 256 * 1024 * 1024
+
+
+def unwrap(bonds: List, coords: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Makes a molecule whole, walking over its bonds from bead 0
+
+    Args:
+        bonds (List[Tuple[int, int]]): bonds of a connected graph
+        coords (np.ndarray): (n, 3) wrapped coordinates
+        lengths (np.ndarray): box edges
+
+    Returns:
+        np.ndarray: (n, 3) coordinates without periodic jumps along bonds
+    """
+    neighbours: Dict[int, List[int]] = {i: [] for i in range(len(coords))}
+    for b in bonds:
+        neighbours[b[0]].append(b[1])
+        neighbours[b[1]].append(b[0])
+    coords = np.array(coords, dtype=np.float64)
+    seen = {0}
+    queue = [0]
+    while queue:
+        i = queue.pop()
+        for j in neighbours[i]:
+            if j not in seen:
+                d = coords[j] - coords[i]
+                coords[j] = coords[i] + d - lengths * np.round(d / lengths)
+                seen.add(j)
+                queue.append(j)
+    return coords
+
+
+def random_rotations(count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Uniformly distributed rotation matrices from random unit quaternions
+
+    Args:
+        count (int): number of matrices
+        rng (np.random.Generator): source of random numbers
+
+    Returns:
+        np.ndarray: (count, 3, 3) rotation matrices
+    """
+    q = rng.normal(size=(count, 4))
+    q /= np.linalg.norm(q, axis=1)[:, None]
+    w, x, y, z = q.T
+    return np.stack(
+        [
+            np.stack(
+                [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], -1
+            ),
+            np.stack(
+                [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], -1
+            ),
+            np.stack(
+                [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], -1
+            ),
+        ],
+        axis=1,
+    )
+
+
+class ConformerLibrary:
+    """
+    Pool of relaxed conformations per molecular topology
+
+    Conformations are generated once with MolGraph.get_coords, made whole
+    and centered, and then reused: a copy of a molecule is a stored
+    conformation with a random rotation and translation. The library can
+    be kept in a .npz file between runs
+
+    Attributes:
+        self.path (Optional[str]): .npz file of the library
+        self.pool_size (int): conformations generated per topology
+        self.max_bytes (int): size cap, least recently used entries are evicted
+        self.hits (int), self.misses (int), self.evictions (int): statistics
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        pool_size: int = POOL_SIZE,
+        max_bytes: int = MAX_BYTES,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            path (Optional[str]): .npz file, loaded if it exists. Defaults to None.
+            pool_size (int, optional): conformations per topology.
+                Defaults to POOL_SIZE.
+            max_bytes (int, optional): size cap of the library. Defaults to MAX_BYTES.
+            seed (Optional[int]): seed of conformer generation. Defaults to None.
+        """
+        self.path = path
+        self.pool_size = pool_size
+        self.max_bytes = max_bytes
+        self.rng = np.random.default_rng(seed)
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __enter__(self) -> "ConformerLibrary":
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.path:
+            self.save()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self.entries.values())
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def key(
+        molecule: MolGraph,
+        bond_length: float = BOND_LENGTH,
+        iteration_limit: int = ITERATION_LIMIT,
+    ) -> str:
+        """
+        Stable key of a topology with its layout settings
+
+        Args:
+            molecule (MolGraph): molecule (Mol or bare MolGraph)
+            bond_length (float, optional): Defaults to BOND_LENGTH.
+            iteration_limit (int, optional): Defaults to ITERATION_LIMIT.
+
+        Returns:
+            str: hex digest
+        """
+        description = {
+            "version": VERSION,
+            "topology": molecule.key,
+            "bond_length": repr(float(bond_length)),
+            "iteration_limit": int(iteration_limit),
+        }
+        text = json.dumps(description, sort_keys=True)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def get(
+        self,
+        molecule: MolGraph,
+        bond_length: float = BOND_LENGTH,
+        iteration_limit: int = ITERATION_LIMIT,
+    ) -> np.ndarray:
+        """
+        Returns the pool of conformations, generating it on a miss
+
+        Pools are stored in the canonical bead order, so equivalent
+        molecules written by different scripts share one entry
+
+        Returns:
+            np.ndarray: (pool_size, num_beads, 3) centered conformations
+        """
+        key = ConformerLibrary.key(molecule, bond_length, iteration_limit)
+        order = molecule.canonical[0]
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][:, np.argsort(order)]
+        self.misses += 1
+        edge = 4.0 * bond_length * max(molecule.num_beads ** (1.0 / 3.0), 1.0)
+        box = Box(edge, edge, edge)
+        lengths = np.array([edge, edge, edge])
+        pool = np.empty((self.pool_size, molecule.num_beads, 3))
+        for k in range(self.pool_size):
+            x, y, z = molecule.get_coords(
+                box,
+                bond_length=bond_length,
+                iteration_limit=iteration_limit,
+                rng=self.rng,
+            )
+            coords = unwrap(molecule.bonds, np.vstack([x, y, z]).T, lengths)
+            pool[k] = coords - coords.mean(axis=0)
+        self.entries[key] = pool[:, order]
+        self._evict()
+        return pool
+
+    def place(
+        self,
+        molecule: MolGraph,
+        box: Box,
+        count: int,
+        rng: np.random.Generator,
+        bond_length: float = BOND_LENGTH,
+        iteration_limit: int = ITERATION_LIMIT,
+    ) -> np.ndarray:
+        """
+        Places count copies of a molecule at random positions and orientations
+
+        Args:
+            molecule (MolGraph): molecule
+            box (Box): instance of box
+            count (int): number of copies
+            rng (np.random.Generator): source of random numbers
+
+        Raises:
+            IterationLimitError: some copy can't be placed between the walls
+
+        Returns:
+            np.ndarray: (count * num_beads, 3) coordinates wrapped into the box
+        """
+        pool = self.get(molecule, bond_length, iteration_limit)
+        chosen = pool[rng.integers(len(pool), size=count)]
+        rotated = np.einsum("kij,knj->kni", random_rotations(count, rng), chosen)
+        coords = rotated + box.sample(rng.random((count, 3)))[:, None, :]
+        if box.walls:
+            # copies crossing a wall are shifted again, all at once
+            for _ in range(iteration_limit):
+                out = np.flatnonzero(~np.all(box.inside(coords), axis=1))
+                if len(out) == 0:
+                    break
+                shift = box.sample(rng.random((len(out), 3)))
+                coords[out] = rotated[out] + shift[:, None, :]
+            else:
+                raise IterationLimitError(iteration_limit)
+        return box.wrap(coords.reshape(-1, 3))
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Drops one entry or the whole library
+
+        Args:
+            key (Optional[str]): key of the entry. Defaults to None (all entries).
+        """
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def _evict(self) -> None:
+        while len(self.entries) > 1 and self.nbytes > self.max_bytes:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the library to a .npz file
+
+        Args:
+            path (Optional[str]): Defaults to self.path.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("ConformerLibrary: path is not set")
+        with open(path, mode="wb") as f:
+            np.savez_compressed(
+                f, **{f"c_{key}": pool for key, pool in self.entries.items()}
+            )
+
+    def load(self, path: str) -> None:
+        """
+        Reads a library from a .npz file, keeping the stored order
+
+        Args:
+            path (str): .npz file
+        """
+        with np.load(path) as data:
+            for name in data.files:
+                self.entries[name[2:]] = data[name]
+        self._evict()
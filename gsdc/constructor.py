@@ -1,49 +1,61 @@
-from typing import Dict, Final, Optional, Tuple
+from typing import Dict, Final, List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from .bondset import Bondtype
+from .canonical import Topology
 from .check_graph import CheckGraph
 from .exceptions import (EmptyGraphError, FixedDictError, FixedOutBoxError,
                          FixedRootError, GapsMolGraphError,
                          IterationLimitError, MolGraphConnectionError,
                          MolGraphSimplicityError)
 from .periodic_box import Box
+from .profiler import DISABLED, Profiler
+from .sampler import Sampler
 
 BOND_LENGTH: Final[float] = (1.0 / 3.0) ** (1.0 / 3.0)
 ITERATION_LIMIT: Final[int] = 1000
+REDRAW: Final[int] = 8
 EPS = 0.001
 
 
-def rnd_vector(length: float = BOND_LENGTH) -> np.ndarray:
+def rnd_vector(
+    length: float = BOND_LENGTH, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
     """
     Generates a random 3D vector of a given length
 
+    The direction is a normalized normal triple, uniform on the sphere.
+    Batch construction should use a Sampler instead
+
     Args:
         length (float, optional): Defaults to LENGTH_BOND = (1/3)^(1/3) ~ 0.693..
+        rng (Optional[np.random.Generator]): source of random numbers.
+            Defaults to the global np.random state.
 
     Returns:
         np.ndarray: random 3D vector of any given length
     """
-    v = np.random.uniform(-1.0, 1.0, 3)
+    generator = np.random if rng is None else rng
+    v = generator.normal(size=3)
     v = v / np.sqrt(np.sum(v**2)) * length
     return v
 
 
-def repulsive_force(bond_length: float, x: float) -> float:
+def repulsive_force(bond_length: float, x: np.ndarray) -> np.ndarray:
     """_summary_
 
     Args:
         bond_length (float): lengths of bond
-        x (float): coordinate
+        x (np.ndarray): bond lengths
 
     Returns:
-        float: linear repulsive force
+        np.ndarray: linear repulsive force
     """
     return (bond_length / x - 1.0) * 0.5
 
 
-class MolGraph:
+class MolGraph(Topology):
     """
     Creation, building and processing of a molecular graph
         Graph must be simple and fully-connected
@@ -53,6 +65,7 @@ class MolGraph:
         self.num_beads (int): number of beads (nodes)
         self.cyclical (bool): True if graph is cyclical, False otherwise
         self.directed (bool): True if graph is directed, False otherwise
+        self.key (str): canonical topology key
     """
 
     def __init__(self, bonds: Bondtype, sort: bool = True) -> None:
@@ -102,6 +115,9 @@ class MolGraph:
         bond_length: float = BOND_LENGTH,
         iteration_limit: int = ITERATION_LIMIT,
         periodic: bool = True,
+        rng: Optional[np.random.Generator] = None,
+        profiler: Optional[Profiler] = None,
+        sampler: Optional[Sampler] = None,
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Gets coordinates of the molecular graph in 3D-box
@@ -111,7 +127,14 @@ class MolGraph:
             box (Box): instance of box
             bond_length (float, optional): Defaults to BOND_LENGTH.
             iteration_limit (int, optional): Defaults to ITERATION_LIMIT.
-            periodic (bool, optional): False if graph in impenetrable box. Defaults to True.
+            periodic (bool, optional): True to honour box.pbc, False if
+                graph in impenetrable box. Defaults to True.
+            rng (Optional[np.random.Generator]): source of random numbers.
+                Defaults to the global np.random state.
+            profiler (Optional[Profiler]): receives the time of the layout,
+                the number of iterations and rejected moves. Defaults to None.
+            sampler (Optional[Sampler]): buffered source of random numbers,
+                takes precedence over rng. Defaults to None.
 
         Raises:
             FixedRootError: First id of fixed beads not equal 0
@@ -121,9 +144,44 @@ class MolGraph:
         Returns:
             Tuple[np.ndarray, np.ndarray, np.ndarray]: x, y, z coordinates
         """
-        x = np.random.uniform(-box.x / 2, box.x / 2, self.num_beads)
-        y = np.random.uniform(-box.y / 2, box.y / 2, self.num_beads)
-        z = np.random.uniform(-box.z / 2, box.z / 2, self.num_beads)
+        profiler = DISABLED if profiler is None else profiler
+        stats = [0, 0]
+        with profiler.stage("get_coords"):
+            try:
+                return self._layout(
+                    box,
+                    fixed_coords,
+                    bond_length,
+                    iteration_limit,
+                    periodic,
+                    rng,
+                    sampler,
+                    stats,
+                )
+            finally:
+                profiler.count("get_coords.iterations", stats[0])
+                profiler.count("get_coords.rejections", stats[1])
+
+    def _layout(
+        self,
+        box: Box,
+        fixed_coords: Optional[Dict[int, Tuple[float, float, float]]],
+        bond_length: float,
+        iteration_limit: int,
+        periodic: bool,
+        rng: Optional[np.random.Generator],
+        sampler: Optional[Sampler],
+        stats: List[int],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Layout of MolGraph.get_coords, stats gets [iterations, rejections]"""
+        if sampler is None:
+            generator = np.random if rng is None else rng
+            x = generator.uniform(-box.x / 2, box.x / 2, self.num_beads)
+            y = generator.uniform(-box.y / 2, box.y / 2, self.num_beads)
+            z = generator.uniform(-box.z / 2, box.z / 2, self.num_beads)
+        else:
+            u = sampler.uniform(3 * self.num_beads).reshape(3, -1)
+            x, y, z = box.sample(u.T).T
         if fixed_coords:
             if 0 in fixed_coords:
                 if len(fixed_coords) == 1:
@@ -142,68 +200,119 @@ class MolGraph:
             fixed_coords = {0: (x[0], y[0], z[0])}
             only_id0_fixed = True
 
+        walls = box.walls if periodic else [0, 1, 2]
+        wall_box = Box(box.x, box.y, box.z, [i not in walls for i in range(3)])
+        coords = np.column_stack([x, y, z])
         if only_id0_fixed and self.directed and (not self.cyclical):
-            # sequential graph generation
+            # sequential graph generation, a rejected move is redrawn in a batch
             for bond in self.bonds:
-                label_to_break = False
                 num_iter = 0
-                while not label_to_break:
-                    num_iter += 1
-                    if num_iter > iteration_limit:
+                batch = 1
+                while True:
+                    if num_iter >= iteration_limit:
                         raise IterationLimitError(iteration_limit)
-                    v = rnd_vector(length=bond_length)
-                    xt = x[bond[0]] + v[0]
-                    yt = y[bond[0]] + v[1]
-                    zt = z[bond[0]] + v[2]
-                    if not box.check_in_box(xt, yt, zt):
-                        if periodic:
-                            xt, yt, zt = box.periodic_correct(xt, yt, zt)
-                            label_to_break = True
+                    batch = min(batch, iteration_limit - num_iter)
+                    if sampler is None:
+                        generator = np.random if rng is None else rng
+                        v = generator.normal(size=(batch, 3))
+                        v *= bond_length / np.sqrt(np.sum(v**2, axis=1))[:, None]
                     else:
-                        label_to_break = True
-                    if label_to_break:
-                        x[bond[1]] = xt
-                        y[bond[1]] = yt
-                        z[bond[1]] = zt
+                        v = sampler.vectors(batch, bond_length)
+                    new = coords[bond[0]] + v
+                    valid = np.flatnonzero(wall_box.inside(new))
+                    if len(valid):
+                        num_iter += int(valid[0]) + 1
+                        stats[0] += int(valid[0]) + 1
+                        stats[1] += int(valid[0])
+                        coords[bond[1]] = wall_box.wrap(new[valid[0]])
                         break
+                    num_iter += batch
+                    stats[0] += batch
+                    stats[1] += batch
+                    batch = REDRAW
         else:
-            ## random graph generation (only without periodic conditions)
+            ## random graph generation, bonds are relaxed unwrapped
             r_max: float = bond_length * 2
             r_min: float = 0.0
-            fx = np.zeros(self.num_beads)
-            fy = np.zeros(self.num_beads)
-            fz = np.zeros(self.num_beads)
+            bonds = np.array(self.bonds)
+            free = np.ones(self.num_beads, dtype=bool)
+            free[list(fixed_coords)] = False
+            force = np.zeros((self.num_beads, 3))
             num_iter = 0
             while r_max - r_min > bond_length * EPS:
                 num_iter += 1
+                stats[0] += 1
                 if num_iter > iteration_limit:
                     raise IterationLimitError(iteration_limit)
-                fx[:] = 0.0
-                fy[:] = 0.0
-                fz[:] = 0.0
-                r_max = 0.0
-                r_min = bond_length * 2
-                for b in self.bonds:
-                    dx = x[b[0]] - x[b[1]]
-                    dy = y[b[0]] - y[b[1]]
-                    dz = z[b[0]] - z[b[1]]
-                    r = np.sqrt(dx**2 + dy**2 + dz**2)
-                    if r > r_max:
-                        r_max = r
-                    if r < r_min:
-                        r_min = r
-                    f = repulsive_force(bond_length, r)
-                    fx[b[0]] += f * dx
-                    fx[b[1]] -= f * dx
-                    fy[b[0]] += f * dy
-                    fy[b[1]] -= f * dy
-                    fz[b[0]] += f * dz
-                    fz[b[1]] -= f * dz
-                for i in range(self.num_beads):
-                    if i not in fixed_coords:
-                        xt = x[i] + fx[i]
-                        yt = y[i] + fy[i]
-                        zt = z[i] + fz[i]
-                        if box.check_in_box(xt, yt, xt):
-                            x[i], y[i], z[i] = xt, yt, zt
+                d = coords[bonds[:, 0]] - coords[bonds[:, 1]]
+                r = np.sqrt(np.sum(d**2, axis=1))
+                r_max, r_min = float(r.max()), float(r.min())
+                f = repulsive_force(bond_length, r)[:, None] * d
+                force[:] = 0.0
+                np.add.at(force, bonds[:, 0], f)
+                np.add.at(force, bonds[:, 1], -f)
+                new = coords + force
+                moved = free & wall_box.inside(new)
+                stats[1] += int(np.sum(free & ~moved))
+                coords[moved] = new[moved]
+            coords = wall_box.wrap(coords)
+        x, y, z = coords.T.copy()
         return x, y, z
+
+    def grow_many(
+        self,
+        box: Box,
+        anchors: np.ndarray,
+        bond_length: float = BOND_LENGTH,
+        iteration_limit: int = ITERATION_LIMIT,
+        rng: Optional[np.random.Generator] = None,
+        walls: Optional[Sequence[int]] = None,
+        sampler: Optional[Sampler] = None,
+    ) -> np.ndarray:
+        """
+        Grows many copies of the graph at once, one copy per anchor
+
+        Copies are grown bond by bond with vectorized steps; moves through
+        a wall are redrawn only for the copies that made them
+
+        Args:
+            box (Box): instance of box
+            anchors (np.ndarray): (count, 3) coordinates of bead 0 of each copy
+            bond_length (float, optional): Defaults to BOND_LENGTH.
+            iteration_limit (int, optional): redraws per bond. Defaults to ITERATION_LIMIT.
+            rng (Optional[np.random.Generator]): source of random numbers.
+                Defaults to the global np.random state.
+            walls (Optional[Sequence[int]]): impenetrable axes (0, 1, 2),
+                the other axes are periodic. Defaults to box.walls.
+            sampler (Optional[Sampler]): buffered source of random directions,
+                takes precedence over rng. Defaults to None.
+
+        Raises:
+            ValueError: graph is cyclic or not directed
+            IterationLimitError: some copy can't be grown
+
+        Returns:
+            np.ndarray: (count, num_beads, 3) coordinates
+        """
+        if self.cyclical or not self.directed:
+            raise ValueError("MolGraph: grow_many needs a directed acyclic graph")
+        if sampler is None:
+            sampler = Sampler(rng)
+        if walls is not None:
+            box = Box(box.x, box.y, box.z, [i not in walls for i in range(3)])
+        anchors = np.reshape(anchors, (-1, 3))
+        coords = np.empty((len(anchors), self.num_beads, 3))
+        coords[:, 0] = anchors
+        for bond in self.bonds:
+            todo = np.arange(len(anchors))
+            for _ in range(iteration_limit):
+                v = sampler.vectors(len(todo), bond_length)
+                new = coords[todo, bond[0]] + v
+                inside = box.inside(new)
+                coords[todo[inside], bond[1]] = new[inside]
+                todo = todo[~inside]
+                if len(todo) == 0:
+                    break
+            else:
+                raise IterationLimitError(iteration_limit)
+        return box.wrap(coords)
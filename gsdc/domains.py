@@ -0,0 +1,487 @@
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Deque, Dict, Final, Iterator, List, Optional, Tuple
+
+import gsd.hoomd
+import numpy as np
+
+from .cell_list import CellList
+from .gsdc import BOND_K, BOND_R0, Pot
+from .molecule import Mol
+from .periodic_box import Box
+from .storage import expand
+
+AXES: Final[Dict[str, int]] = {"x": 0, "y": 1, "z": 2}
+SEAM_CUTOFF: Final[float] = 0.3
+
+DomainType = Tuple[int, np.ndarray, np.ndarray, List[str], np.ndarray, int]
+
+
+def _split(total: int, parts: int) -> List[int]:
+    """Splits an integer into nearly equal integer parts"""
+    return [len(chunk) for chunk in np.array_split(np.arange(total), parts)]
+
+
+def _build_domain(
+    index: int,
+    box: Box,
+    shift: np.ndarray,
+    content: List[Tuple[Mol, int]],
+    solvent: str,
+    num_solvent: int,
+    seed: np.random.SeedSequence,
+) -> DomainType:
+    """
+    Builds one domain as an independent pot in its own sub-box
+
+    The sub-box has walls at the domain borders, so no bond crosses them,
+    the other axes keep the periodicity of the full box. Then the domain
+    is shifted to its place in the full box
+
+    Returns:
+        DomainType: index, coordinates, type ids, type names, bonds and
+            number of molecules
+    """
+    pot = Pot(box, seed=seed)
+    for molecule, count in content:
+        for _ in range(count):
+            x, y, z = molecule.get_coords(box, sampler=pot.sampler)
+            pot._append(np.vstack([x, y, z]).T, molecule.types, molecule.bonds)
+            pot.molecules += 1
+    if num_solvent > 0:
+        pot.fuller(solvent, number=num_solvent)
+    coords = np.reshape(pot.coords, (-1, 3)) + shift
+    return index, coords, pot.typeid, list(pot.type_names), pot.bonds, pot.molecules
+
+
+def _config_chunk(f, types: List[str], coords: np.ndarray, first: int) -> None:
+    """Writes DL_MESO CONFIG records numbered from first"""
+    f.writelines(
+        f"{t}   {first + i :7.0f}\n{c[0] :16.10f}{c[1] :16.10f}{c[2] :16.10f}\n"
+        for i, (t, c) in enumerate(zip(types, coords))
+    )
+
+
+class _ConfigStream:
+    """
+    DL_MESO CONFIG written domain by domain
+
+    Solvent beads go straight to the file, molecule beads to one temporary
+    file per species, appended in the FIELD order at the end
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        box: Box,
+        num_solvent: int,
+        species: Dict[str, int],
+    ) -> None:
+        """
+        Args:
+            path (str): CONFIG path
+            name (str): title of the file
+            box (Box): the full box
+            num_solvent (int): solvent beads of all domains
+            species (Dict[str, int]): beads of every species in FIELD order
+        """
+        self.f = open(path, mode="w+")
+        self.tails: Dict[str, IO[str]] = dict()
+        self.next = {"": 1}
+        first = num_solvent + 1
+        for script, beads in species.items():
+            self.tails[script] = tempfile.TemporaryFile(mode="w+")
+            self.next[script] = first
+            first += beads
+        self.f.write(f"DL_MESO {name}\n")
+        self.f.write(f"       0       1{first - 1:10.0f}\n")
+        self.f.write(f"{box.x:16.10f}{0.0:16.10f}{0.0:16.10f}\n")
+        self.f.write(f"{0.0:16.10f}{box.y:16.10f}{0.0:16.10f}\n")
+        self.f.write(f"{0.0:16.10f}{0.0:16.10f}{box.z:16.10f} \n")
+
+    def write(
+        self,
+        coords: np.ndarray,
+        typeid: np.ndarray,
+        type_names: List[str],
+        chunks: List[Tuple[str, int]],
+    ) -> None:
+        """
+        Writes one domain: molecule beads in chunks of (script, beads),
+        the solvent after them
+        """
+        types = np.array(type_names, dtype=str)[typeid]
+        start = 0
+        for script, beads in chunks:
+            stop = start + beads
+            f = self.tails[script]
+            _config_chunk(f, types[start:stop], coords[start:stop], self.next[script])
+            self.next[script] += beads
+            start = stop
+        _config_chunk(self.f, types[start:], coords[start:], self.next[""])
+        self.next[""] += len(types) - start
+
+    def close(self, complete: bool = True) -> None:
+        """Appends the species, if the build is complete, and closes the files"""
+        try:
+            for tail in self.tails.values():
+                if complete:
+                    tail.seek(0)
+                    shutil.copyfileobj(tail, self.f)
+        finally:
+            for tail in self.tails.values():
+                tail.close()
+            self.f.close()
+
+
+class _GsdStream:
+    """
+    GSD frame filled domain by domain
+
+    Arrays live in memory-mapped temporary files, so the full system is
+    never held in memory. Masses, charges and diameters are left to the
+    GSD defaults, which are MASS, CHARGE and DIAMETER of gsdc.gsdc
+    """
+
+    def __init__(
+        self, N: int, num_bonds: int, types: List[str], bond_types: List[str]
+    ) -> None:
+        """
+        Args:
+            N (int): beads of all domains
+            num_bonds (int): bonds of all domains
+            types (List[str]): sorted bead types
+            bond_types (List[str]): sorted bond types named by bead types
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.types = types
+        self.bond_types = bond_types
+        # bond type id of every pair of type ids, names are sorted
+        names = np.array(types, dtype=str)
+        pairs = np.char.add(names[:, None], names[None, :]).ravel()
+        self.pair_typeid = np.searchsorted(bond_types, pairs).astype(np.uint32)
+        self.position = self._array("position", (N, 3), np.float32)
+        self.typeid = self._array("typeid", (N,), np.uint32)
+        self.group = self._array("group", (num_bonds, 2), np.uint32)
+        self.bond_typeid = self._array("bond_typeid", (num_bonds,), np.uint32)
+        self.N = self.M = 0
+
+    def _array(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        if not np.prod(shape):
+            return np.zeros(shape, dtype=dtype)
+        path = os.path.join(self.directory.name, name)
+        return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+
+    def write(
+        self,
+        coords: np.ndarray,
+        typeid: np.ndarray,
+        type_names: List[str],
+        bonds: np.ndarray,
+    ) -> None:
+        """Copies one domain in after the previous ones"""
+        n, m = len(coords), len(bonds)
+        ids = np.searchsorted(self.types, type_names)[typeid]
+        pair = np.sort(ids[bonds], axis=1)
+        self.position[self.N : self.N + n] = coords
+        self.typeid[self.N : self.N + n] = ids
+        self.group[self.M : self.M + m] = bonds.astype(np.int64) + self.N
+        self.bond_typeid[self.M : self.M + m] = self.pair_typeid[
+            pair[:, 0] * len(self.types) + pair[:, 1]
+        ]
+        self.N += n
+        self.M += m
+
+    def close(self, path: Optional[str], box: Box) -> None:
+        """Writes the frame to path, if given, and removes the temporary files"""
+        try:
+            if path:
+                frame = gsd.hoomd.Frame()
+                frame.configuration.box = [box.x, box.y, box.z, 0, 0, 0]
+                frame.log["box/periodic"] = np.array(box.pbc, dtype=np.uint8)
+                frame.particles.N = self.N
+                frame.particles.types = list(self.types)
+                frame.particles.typeid = self.typeid
+                frame.particles.position = self.position
+                frame.bonds.N = self.M
+                frame.bonds.types = list(self.bond_types)
+                frame.bonds.typeid = self.bond_typeid
+                frame.bonds.group = self.group
+                ids = np.arange(len(self.bond_types))
+                params = expand({}, self.bond_types, ids, (BOND_K, BOND_R0))
+                frame.log["bonds/k"] = np.ascontiguousarray(params[:, 0])
+                frame.log["bonds/r0"] = np.ascontiguousarray(params[:, 1])
+                with gsd.hoomd.open(name=path, mode="w") as f:
+                    f.append(frame)
+        finally:
+            del self.position, self.typeid, self.group, self.bond_typeid
+            self.directory.cleanup()
+
+
+class DomainBuilder:
+    """
+    Builds very large systems slab by slab
+
+    The box is cut into equal slabs along one axis. Each slab gets its share
+    of molecules and solvent from the global composition and is built in a
+    worker process, so the memory of a worker is bounded by the slab size.
+    Slabs are streamed to the output as soon as they are ready
+
+    Attributes:
+        self.box (Box): the full box
+        self.domains (int): number of slabs
+        self.axis (int): 0, 1 or 2 for slabs across x, y or z
+        self.content (List[Tuple[Mol, int]]): molecules and their counts
+        self.rho (float): number density
+    """
+
+    def __init__(
+        self,
+        box: Box,
+        domains: int,
+        axis: str = "x",
+        seed: Optional[int] = None,
+        rho: float = 3,
+    ) -> None:
+        """
+        Args:
+            box (Box): the full box
+            domains (int): number of slabs
+            axis (str, optional): "x", "y" or "z". Defaults to "x".
+            seed (Optional[int]): seed of the whole build. Defaults to None.
+            rho (float, optional): number density. Defaults to 3.
+
+        Raises:
+            ValueError: unknown axis or domains < 1
+        """
+        if axis not in AXES:
+            raise ValueError(f"DomainBuilder: unknown axis {axis}")
+        if domains < 1:
+            raise ValueError("DomainBuilder: domains < 1")
+        self.box = box
+        self.domains = domains
+        self.axis = AXES[axis]
+        self.content: List[Tuple[Mol, int]] = list()
+        self.rho = rho
+        self.seeds = np.random.SeedSequence(seed).spawn(domains)
+
+    def add(self, molecule: Mol, count: int) -> None:
+        """
+        Adds count copies of a molecule to the global composition
+
+        A molecule equivalent to an added one is built as that one, so a
+        species has one bead numbering in every domain
+
+        Args:
+            molecule (Mol): molecule
+            count (int): number of copies
+        """
+        molecule = next(
+            (
+                known
+                for known, _ in self.content
+                if known.signature == molecule.signature and known.key == molecule.key
+            ),
+            molecule,
+        )
+        self.content.append((molecule, count))
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.array([self.box.x, self.box.y, self.box.z], dtype=np.float64)
+
+    @property
+    def domain_box(self) -> Box:
+        lengths = self.lengths
+        lengths[self.axis] /= self.domains
+        pbc = list(self.box.pbc)
+        pbc[self.axis] = False
+        x, y, z = lengths.tolist()
+        return Box(x, y, z, pbc=pbc)
+
+    @property
+    def N(self) -> int:
+        return int(self.box.volume * self.rho)
+
+    def _center(self, index: int) -> float:
+        """Position of the domain center along the axis"""
+        width = self.lengths[self.axis] / self.domains
+        return -0.5 * self.lengths[self.axis] + (index + 0.5) * width
+
+    def _tasks(self, solvent: str) -> List[Tuple]:
+        """Splits the composition and the solvent quota over the domains"""
+        counts = [_split(count, self.domains) for _, count in self.content]
+        beads = _split(self.N, self.domains)
+        tasks = list()
+        for d in range(self.domains):
+            content = [(mol, c[d]) for (mol, _), c in zip(self.content, counts)]
+            num_solvent = beads[d] - sum(mol.num_beads * c for mol, c in content)
+            if num_solvent < 0:
+                raise ValueError(f"DomainBuilder: domain {d} is overfilled")
+            shift = np.zeros(3)
+            shift[self.axis] = self._center(d)
+            tasks.append(
+                (
+                    d,
+                    self.domain_box,
+                    shift,
+                    content,
+                    solvent,
+                    num_solvent,
+                    self.seeds[d],
+                )
+            )
+        return tasks
+
+    def _composition(self, solvent: str) -> Pot:
+        """Pot with bead types and species of the whole system, without beads"""
+        pot = Pot(self.box)
+        types = {t for molecule, _ in self.content for t in molecule.types}
+        pot.type_ids(sorted(types | {solvent}))
+        for molecule, count in self.content:
+            if count > 0:
+                pot._count(molecule, count)
+        return pot
+
+    def build(
+        self,
+        solvent: str = "W",
+        workers: Optional[int] = None,
+        window: Optional[int] = None,
+    ) -> Iterator[DomainType]:
+        """
+        Builds the domains in a process pool
+
+        At most window domains are submitted ahead of the consumer, so
+        finished domains do not pile up in memory
+
+        Args:
+            solvent (str, optional): solvent bead type. Defaults to "W".
+            workers (Optional[int]): number of processes,
+                1 builds in the current process. Defaults to os.cpu_count().
+            window (Optional[int]): domains in flight. Defaults to 2 * workers.
+
+        Yields:
+            DomainType: domains in order of their position along the axis
+        """
+        tasks = self._tasks(solvent)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for task in tasks:
+                yield _build_domain(*task)
+        else:
+            window = window or 2 * workers
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending: Deque[Future] = deque()
+                for task in tasks:
+                    pending.append(executor.submit(_build_domain, *task))
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+    def write(
+        self,
+        config: Optional[str] = "CONFIG",
+        gsd: Optional[str] = None,
+        name: str = "molecule cyclic example",
+        solvent: str = "W",
+        workers: Optional[int] = None,
+        seam_cutoff: float = SEAM_CUTOFF,
+        field: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        Builds all domains, writes them and checks the seams between them
+
+        Every domain is written as soon as it arrives and then dropped.
+        CONFIG gets the solvent first and the molecules grouped by species
+        in the order of FIELD; GSD keeps the domain order and is filled
+        in memory-mapped temporary files
+
+        Args:
+            config (Optional[str]): DL_MESO CONFIG path. Defaults to "CONFIG".
+            gsd (Optional[str]): GSD path. Defaults to None.
+            name (str, optional): title of the DL_MESO files.
+            solvent (str, optional): solvent bead type. Defaults to "W".
+            workers (Optional[int]): number of processes. Defaults to os.cpu_count().
+            seam_cutoff (float, optional): beads of neighbouring domains closer
+                than this are reported. Defaults to SEAM_CUTOFF.
+            field (Optional[str]): DL_MESO FIELD path. Defaults to None.
+
+        Returns:
+            Dict[str, float]: seam report with number of close pairs and
+                the minimal distance between beads of different domains
+        """
+        tasks = self._tasks(solvent)
+        composition = self._composition(solvent)
+        scripts = [composition._shared(mol).script for mol, _ in self.content]
+        num_solvent = sum(task[5] for task in tasks)
+        if field:
+            counts = np.zeros(len(composition.type_names), dtype=np.int64)
+            for mol, count in self.content:
+                np.add.at(counts, composition.type_ids(mol.types), count)
+            counts[composition.type_ids([solvent])] += num_solvent
+            composition.dl_meso_field(name=name, file=field, counts=counts)
+        stream = gsd_stream = None
+        if config:
+            beads = {
+                script: composition.topologies[script].num_beads * count
+                for script, count in composition.species.items()
+            }
+            stream = _ConfigStream(config, name, self.box, num_solvent, beads)
+        if gsd:
+            bond_types = sorted(
+                {
+                    "".join(sorted((mol.types[i], mol.types[j])))
+                    for mol, count in self.content
+                    if count > 0
+                    for i, j in mol.bonds
+                }
+            )
+            num_bonds = sum(len(mol.bonds) * count for mol, count in self.content)
+            gsd_stream = _GsdStream(
+                self.N, num_bonds, composition.type_names, bond_types
+            )
+        seam_coords, seam_labels = list(), list()
+        half = 0.5 * self.lengths[self.axis] / self.domains
+        complete = False
+        try:
+            for index, coords, typeid, names, bonds, _ in self.build(solvent, workers):
+                if stream is not None:
+                    chunks = [
+                        (script, mol.num_beads * count)
+                        for script, (mol, count) in zip(scripts, tasks[index][3])
+                        if count > 0
+                    ]
+                    stream.write(coords, typeid, names, chunks)
+                if gsd_stream is not None:
+                    gsd_stream.write(coords, typeid, names, bonds)
+                # coordinate along the axis relative to the domain center
+                local = coords[:, self.axis] - self._center(index)
+                seam = np.abs(np.abs(local) - half) < seam_cutoff
+                seam_coords.append(coords[seam])
+                seam_labels.append(np.full(int(seam.sum()), index))
+            complete = True
+        finally:
+            if stream is not None:
+                stream.close(complete)
+            if gsd_stream is not None:
+                gsd_stream.close(gsd if complete else None, self.box)
+        return self._seam_report(
+            np.vstack(seam_coords), np.concatenate(seam_labels), seam_cutoff
+        )
+
+    def _seam_report(
+        self, coords: np.ndarray, labels: np.ndarray, cutoff: float
+    ) -> Dict[str, float]:
+        """Pairs of beads from different domains closer than cutoff"""
+        i, j, r = CellList(coords, self.box, cutoff).pairs()
+        across = labels[i] != labels[j]
+        return {
+            "pairs": int(across.sum()),
+            "min_distance": float(r[across].min()) if across.any() else float(cutoff),
+        }
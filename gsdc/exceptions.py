@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 
 class NegativeValueError(Exception):
@@ -55,3 +55,11 @@ class IterationLimitError(Exception):
 
     def __str__(self):
         return f"Iteration limit is over ({self.message})"
+
+
+class QualityError(Exception):
+    def __init__(self, failed: Optional[List[str]] = None):
+        self.failed: List[str] = failed or list()
+
+    def __str__(self):
+        return f"Quality thresholds are violated ({', '.join(self.failed)})"
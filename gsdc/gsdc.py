@@ -1,164 +1,1460 @@
-from typing import List
+import copy
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import (Dict, Final, Iterable, List, Optional, Sequence, Tuple,
+                    Union)
 
 import gsd
 import gsd.hoomd
 import numpy as np
+from numpy.typing import DTypeLike
 
+from . import checkpoint, ordering
+from .cell_list import CellList
+from .conformers import ConformerLibrary
+from .constructor import BOND_LENGTH, ITERATION_LIMIT
+from .exceptions import IterationLimitError, QualityError
 from .molecule import Mol
 from .periodic_box import Box
+from .polymers import Chain, Polymer, chain_lengths
+from .profiler import DISABLED, staged
+from .quality import CUTOFF, VOXEL, check, quality_report
+from .sampler import Sampler
+from .storage import BOND_DTYPE, POSITION_DTYPE, Buffer, encode, expand
+from .structures import Template, lattice, sphere
+
+MASS: Final[float] = 1.0
+CHARGE: Final[float] = 0.0
+DIAMETER: Final[float] = 1.0
+BOND_K: Final[float] = 128.0
+BOND_R0: Final[float] = 0.5
+
+# topology of a species: a parsed script or a chain of Pot.polydisperse
+Species = Union[Mol, Chain]
+
+
+def _build_chunk(
+    shm_name: str,
+    molecule: Mol,
+    box: Box,
+    seeds: Sequence[np.random.SeedSequence],
+    start: int,
+) -> None:
+    """
+    Builds copies start..start+len(seeds) of a molecule into shared memory
+
+    Args:
+        shm_name (str): name of the shared block with (count * num_beads, 3) floats
+        molecule (Mol): molecule to build
+        box (Box): instance of box
+        seeds (Sequence[np.random.SeedSequence]): one seed per copy
+        start (int): index of the first copy
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        n = molecule.num_beads
+        coords = np.ndarray(
+            (shm.size // (3 * 8), 3), dtype=np.float64, buffer=shm.buf
+        )
+        for i, seed in enumerate(seeds):
+            sampler = Sampler(seed, block=4 * n)
+            x, y, z = molecule.get_coords(box, sampler=sampler)
+            k = (start + i) * n
+            coords[k : k + n, 0] = x
+            coords[k : k + n, 1] = y
+            coords[k : k + n, 2] = z
+        del coords
+    finally:
+        shm.close()
+
+
+def _split(composition: Dict[str, Union[int, float]], total: int) -> List[int]:
+    """
+    Bead counts of a composition
+
+    Integer values are exact counts, float values are fractions of what is
+    left, distributed by the largest remainder so the counts sum to total
+
+    Args:
+        composition (Dict[str, Union[int, float]]): counts or fractions per type
+        total (int): number of beads
+
+    Raises:
+        ValueError: negative values, exact counts above total or no fractions
+            to fill the rest
+
+    Returns:
+        List[int]: counts in the order of the composition
+    """
+    values = np.array(list(composition.values()), dtype=np.float64)
+    exact = np.array([isinstance(v, (int, np.integer)) for v in composition.values()])
+    if np.any(values < 0.0):
+        raise ValueError("Pot: fuller: negative amount in the composition")
+    counts = np.where(exact, values, 0.0).astype(np.int64)
+    rest = total - int(counts.sum())
+    if rest < 0:
+        raise ValueError("Pot: fuller: exact counts exceed the number of beads")
+    fractions = np.where(exact, 0.0, values)
+    if rest > 0:
+        if fractions.sum() <= 0.0:
+            raise ValueError("Pot: fuller: no fractions to fill the rest")
+        share = rest * fractions / fractions.sum()
+        counts += np.floor(share).astype(np.int64)
+        left = rest - int(np.floor(share).sum())
+        counts[np.argsort(np.floor(share) - share, kind="stable")[:left]] += 1
+    return counts.tolist()
 
 
 class Pot:
-    def __init__(self, box: Box):
+    """
+    Container of a molecular system under construction
+
+    Storage is compact and ready for output: positions are self.dtype
+    (float32 unless float64 is asked for), type ids are the smallest
+    unsigned integers for the number of types, bonds are uint32 as in
+    GSD. The relaxation math in MolGraph stays float64, results are cast
+    once when they are appended
+
+    Attributes:
+        self.coords (np.ndarray): (N, 3) positions
+        self.typeid (np.ndarray): (N,) ids into self.type_names
+        self.bonds (np.ndarray): (M, 2) uint32 bonded bead ids
+        self.bond_typeid (np.ndarray): (M,) ids into self.bond_names,
+            0 ("") is a script bond typed by its bead types
+        self.types (List[str]), self.bond_types (List[str]): decoded names
+        self.masses, self.charges, self.diameters (Dict[str, float]):
+            properties by bead type, MASS, CHARGE and DIAMETER if missing
+        self.bond_params (Dict[str, Tuple[float, float]]): harmonic constant
+            and rest length by bond type, (BOND_K, BOND_R0) if missing
+        self.species (Dict[str, int]): number of molecules by script
+        self.sequence (List[Tuple[str, int]]): scripts and counts of
+            consecutive molecules in the storage order
+        self.topologies (Dict[str, Species]): molecule of every added script,
+            equivalent scripts share the first added one
+    """
+
+    def __init__(
+        self,
+        box: Box,
+        seed: Union[int, np.random.SeedSequence, None] = None,
+        dtype: DTypeLike = POSITION_DTYPE,
+    ):
         self.box = box
-        self.coords = np.array(list())
-        self.types: List = list()
-        self.bonds: List = list()
+        self.dtype = np.dtype(dtype)
+        self._coords = Buffer((3,), self.dtype)
+        self._typeid = Buffer((), np.uint8)
+        self._bonds = Buffer((2,), BOND_DTYPE)
+        self._bond_typeid = Buffer((), np.uint8)
+        self.type_names: List[str] = list()
+        self.bond_names: List[str] = [""]
         self.molecules: int = 0
+        self.species: Dict[str, int] = dict()
+        self.sequence: List[Tuple[str, int]] = list()
+        self.topologies: Dict[str, Species] = dict()
+        self.masses: Dict[str, float] = dict()
+        self.charges: Dict[str, float] = dict()
+        self.diameters: Dict[str, float] = dict()
+        self.bond_params: Dict[str, Tuple[float, float]] = dict()
         self.rho = 3
-        self.N = 0
+        self.profiler = DISABLED
+        if isinstance(seed, np.random.SeedSequence):
+            # fresh copy: spawning must not depend on the caller's sequence state
+            self.seed_sequence = np.random.SeedSequence(
+                seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size
+            )
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        self.sampler = Sampler(self.seed_sequence.spawn(1)[0])
+
+    @property
+    def N(self) -> int:
+        return len(self._coords)
+
+    @property
+    def coords(self) -> np.ndarray:
+        return self._coords.array
+
+    @coords.setter
+    def coords(self, coords: np.ndarray) -> None:
+        self._coords.assign(coords)
+
+    @property
+    def typeid(self) -> np.ndarray:
+        return self._typeid.array
 
-    def add(self, molecule: Mol):
-        x, y, z = molecule.get_coords(self.box)
-        coord = np.vstack([x, y, z]).T
-        if len(self.coords) < 1:
-            self.coords = coord
+    @property
+    def types(self) -> List[str]:
+        return np.array(self.type_names, dtype=str)[self.typeid].tolist()
+
+    @types.setter
+    def types(self, types: Iterable[str]) -> None:
+        self.type_names = list()
+        ids, dtype = encode(self.type_names, types, np.dtype(np.uint8))
+        self._typeid = Buffer((), dtype)
+        self._typeid.assign(ids)
+
+    @property
+    def bonds(self) -> np.ndarray:
+        return self._bonds.array
+
+    @bonds.setter
+    def bonds(self, bonds: np.ndarray) -> None:
+        self._bonds.assign(bonds)
+
+    @property
+    def bond_typeid(self) -> np.ndarray:
+        return self._bond_typeid.array
+
+    @property
+    def bond_types(self) -> List[str]:
+        return np.array(self.bond_names, dtype=str)[self.bond_typeid].tolist()
+
+    @bond_types.setter
+    def bond_types(self, bond_types: Iterable[str]) -> None:
+        self.bond_names = [""]
+        ids, dtype = encode(self.bond_names, bond_types, np.dtype(np.uint8))
+        self._bond_typeid = Buffer((), dtype)
+        self._bond_typeid.assign(ids)
+
+    def type_ids(self, types: Iterable[str]) -> np.ndarray:
+        """Ids of bead types, unknown ones are registered"""
+        ids, dtype = encode(self.type_names, types, self._typeid.dtype)
+        if dtype != self._typeid.dtype:
+            self._typeid.astype(dtype)
+        return ids
+
+    def set_type(
+        self,
+        name: str,
+        mass: Optional[float] = None,
+        charge: Optional[float] = None,
+        diameter: Optional[float] = None,
+    ) -> None:
+        """
+        Sets properties of a bead type, they are expanded per bead on output
+
+        Args:
+            name (str): bead type
+            mass (Optional[float]): Defaults to None, the value is kept.
+            charge (Optional[float]): Defaults to None, the value is kept.
+            diameter (Optional[float]): Defaults to None, the value is kept.
+        """
+        for table, value in (
+            (self.masses, mass),
+            (self.charges, charge),
+            (self.diameters, diameter),
+        ):
+            if value is not None:
+                table[name] = float(value)
+
+    def set_bond_type(self, name: str, k: float = BOND_K, r0: float = BOND_R0) -> None:
+        """
+        Sets harmonic parameters of a bond type
+
+        Args:
+            name (str): bead types of a script bond in alphabetical order,
+                e.g. "AB", or the name of crosslinks
+            k (float, optional): force constant. Defaults to BOND_K.
+            r0 (float, optional): rest length. Defaults to BOND_R0.
+        """
+        self.bond_params[name] = (float(k), float(r0))
+
+    def _per_bead(self, table: Dict[str, float], default: float) -> np.ndarray:
+        """(N,) float32 values of a bead type table"""
+        return expand(table, self.type_names, self.typeid, default)
+
+    def _append(
+        self,
+        coords: np.ndarray,
+        types: Iterable[str],
+        bonds: Iterable = (),
+    ) -> None:
+        """
+        Appends beads to the pot storage
+
+        Args:
+            coords (np.ndarray): (n, 3) coordinates of the new beads
+            types (Iterable[str]): types of the new beads
+            bonds (Iterable, optional): bonds between the new beads,
+                numbered from 0. Defaults to ().
+        """
+        self._append_ids(coords, self.type_ids(types), bonds)
+
+    def _append_ids(
+        self,
+        coords: np.ndarray,
+        typeid: np.ndarray,
+        bonds: Iterable = (),
+        bond_typeid: Optional[np.ndarray] = None,
+    ) -> None:
+        """Appends beads given by type ids, see Pot._append"""
+        bonds = np.reshape(np.asarray(bonds, dtype=np.int64), (-1, 2)) + self.N
+        self._coords.extend(coords)
+        self._typeid.extend(typeid)
+        self._bonds.extend(bonds)
+        if bond_typeid is None:
+            bond_typeid = np.zeros(len(bonds), dtype=self._bond_typeid.dtype)
+        self._bond_typeid.extend(bond_typeid)
+        self.profiler.peak("coords.nbytes", self.coords.nbytes)
+        self.profiler.peak("bonds", len(self._bonds))
+
+    @staged("add")
+    def add(
+        self,
+        molecule: Mol,
+        library: Optional[ConformerLibrary] = None,
+        iteration_limit: int = ITERATION_LIMIT,
+    ):
+        molecule = self._layout(molecule)
+        if library is None:
+            x, y, z = molecule.get_coords(
+                self.box,
+                iteration_limit=iteration_limit,
+                profiler=self.profiler,
+                sampler=self.sampler,
+            )
+            coords = np.vstack([x, y, z]).T
         else:
-            self.coords = np.vstack([self.coords, coord])
-        self.types += molecule.types
-        self.bonds += [(b[0] + self.N, b[1] + self.N) for b in molecule.bonds]
-        self.N += molecule.num_beads
+            coords = library.place(molecule, self.box, 1, self.rng)
+        self._append(coords, molecule.types, molecule.bonds)
         self.molecules += 1
+        self._count(molecule, 1)
+
+    @staged("build")
+    def build(
+        self,
+        recipe: Sequence[Tuple[Mol, int]],
+        path: Optional[str] = None,
+        every: int = 1000,
+        retries: int = 3,
+        position: int = 0,
+        library: Optional[ConformerLibrary] = None,
+    ) -> int:
+        """
+        Adds molecules of a recipe one by one with checkpoints
+
+        A molecule exceeding the iteration limit is retried with a doubled
+        limit, which then stays for the rest of its species. If it still
+        fails, or the build is interrupted, the last consistent state is
+        saved, so Pot.resume continues from it
+
+        Args:
+            recipe (Sequence[Tuple[Mol, int]]): molecules and their counts
+            path (Optional[str]): checkpoint .npz file. Defaults to None.
+            every (int, optional): molecules between checkpoints. Defaults to 1000.
+            retries (int, optional): attempts with a doubled iteration limit.
+                Defaults to 3.
+            position (int, optional): molecules of the recipe already added.
+                Defaults to 0.
+            library (Optional[ConformerLibrary]): see Pot.add. Defaults to None.
 
+        Raises:
+            IterationLimitError: a molecule failed after all retries
+
+        Returns:
+            int: recipe position, the total number of its molecules
+        """
+        done = 0
+        try:
+            for molecule, count in recipe:
+                limit = ITERATION_LIMIT
+                for _ in range(max(position - done, 0), count):
+                    for attempt in range(retries + 1):
+                        try:
+                            self.add(molecule, library, iteration_limit=limit)
+                            break
+                        except IterationLimitError:
+                            self.profiler.count("build.retries")
+                            if attempt == retries:
+                                raise
+                            limit *= 2
+                    position += 1
+                    if path and position % every == 0:
+                        self.checkpoint(path, position)
+                done += count
+        except BaseException:
+            if path:
+                self.checkpoint(path, position)
+            raise
+        if path:
+            self.checkpoint(path, position)
+        return position
+
+    @staged("checkpoint")
+    def checkpoint(self, path: str, position: int = 0) -> None:
+        """
+        Saves the pot, see gsdc.checkpoint
+
+        Args:
+            path (str): .npz file
+            position (int, optional): molecules of the recipe already added.
+                Defaults to 0.
+        """
+        checkpoint.save(self, path, position)
+
+    @staticmethod
+    def resume(path: str) -> Tuple["Pot", int]:
+        """
+        Restores a pot with its random state from a checkpoint
+
+        Args:
+            path (str): .npz file written by Pot.checkpoint
+
+        Returns:
+            Tuple[Pot, int]: pot and the recipe position to pass to Pot.build
+        """
+        return checkpoint.load(path)
+
+    @staged("add_many")
+    def add_many(
+        self,
+        molecule: Mol,
+        count: int,
+        workers: Optional[int] = None,
+        library: Optional[ConformerLibrary] = None,
+    ):
+        """
+        Adds count copies of a molecule, building them in a process pool
+
+        Every copy gets its own generator spawned from the pot seed, so a
+        fixed seed gives the same coordinates for any number of workers.
+        Workers write straight into a shared memory block
+
+        Args:
+            molecule (Mol): molecule to add
+            count (int): number of copies
+            workers (Optional[int]): number of processes,
+                1 builds in the current process. Defaults to os.cpu_count().
+            library (Optional[ConformerLibrary]): if given, copies are stored
+                conformations placed in one vectorized pass. Defaults to None.
+        """
+        if count < 1:
+            return
+        molecule = self._layout(molecule)
+        if library is not None:
+            coords = library.place(molecule, self.box, count, self.rng)
+            self._extend(molecule, coords, count)
+            return
+        workers = workers or os.cpu_count() or 1
+        seeds = self.seed_sequence.spawn(count)
+        n = molecule.num_beads
+        shm = shared_memory.SharedMemory(create=True, size=count * n * 3 * 8)
+        try:
+            starts = [
+                int(chunk[0])
+                for chunk in np.array_split(np.arange(count), min(count, workers * 4))
+            ]
+            ends = starts[1:] + [count]
+            if workers == 1:
+                for a, b in zip(starts, ends):
+                    _build_chunk(shm.name, molecule, self.box, seeds[a:b], a)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(
+                            _build_chunk, shm.name, molecule, self.box, seeds[a:b], a
+                        )
+                        for a, b in zip(starts, ends)
+                    ]
+                    for future in futures:
+                        future.result()
+            coords = np.ndarray(
+                (count * n, 3), dtype=np.float64, buffer=shm.buf
+            ).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+        self._extend(molecule, coords, count)
+
+    def _extend(self, molecule: Mol, coords: np.ndarray, count: int) -> None:
+        """
+        Appends count built copies of a molecule
+
+        Copies are stored in the bead numbering of the shared equivalent
+        molecule, so every copy of a species matches its FIELD entry
+        """
+        shared = self._layout(molecule)
+        if shared is not molecule:
+            beads = self._numbering(molecule, shared)
+            coords = np.reshape(coords, (count, -1, 3))[:, beads].reshape(-1, 3)
+        bonds = np.array(shared.bonds)[None, :, :] + (
+            np.arange(count)[:, None, None] * shared.num_beads
+        )
+        self._append(coords, shared.types * count, bonds.reshape(-1, 2))
+        self.molecules += count
+        self._count(shared, count)
+
+    @staticmethod
+    def _numbering(molecule: Species, shared: Species) -> np.ndarray:
+        """Bead of a molecule at every bead of its shared equivalent"""
+        if shared.script == molecule.script:
+            return np.arange(molecule.num_beads)
+        return molecule.canonical[0][np.argsort(shared.canonical[0])]
+
+    def _shared(self, molecule: Species) -> Species:
+        """
+        The first added molecule equivalent to the given one
+
+        Scripts are looked up first, canonical keys are compared only
+        between molecules with equal signatures
+        """
+        known = self.topologies.get(molecule.script)
+        if known is None:
+            known = next(
+                (
+                    other
+                    for other in self.topologies.values()
+                    if other.signature == molecule.signature
+                    and other.key == molecule.key
+                ),
+                molecule,
+            )
+            self.topologies[molecule.script] = known
+        return known
+
+    def _layout(self, molecule: Mol) -> Mol:
+        """
+        The shared molecule to build copies of, in its bead numbering
+
+        A chain of Pot.polydisperse is replaced by the Mol of its script,
+        which has the same numbering, any other molecule is reused as is
+        """
+        shared = self._shared(molecule)
+        if not isinstance(shared, Chain):
+            return shared
+        layout = Mol(shared.script)
+        for script, known in self.topologies.items():
+            if known is shared:
+                self.topologies[script] = layout
+        return layout
+
+    def _count(self, molecule: Species, count: int) -> None:
+        """Registers copies of a molecule, appended to the storage, as its species"""
+        script = self._shared(molecule).script
+        self.species[script] = self.species.get(script, 0) + count
+        if self.sequence and self.sequence[-1][0] == script:
+            count += self.sequence.pop()[1]
+        self.sequence.append((script, count))
+
+    @staged("polydisperse")
+    def polydisperse(
+        self,
+        template: str,
+        count: int,
+        mean: float,
+        pdi: float = 1.5,
+        distribution: str = "schulz-zimm",
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Adds a polydisperse ensemble of chains in one batch
+
+        Repeat counts are sampled at once and every chain is grown in a
+        single pass, see gsdc.polymers. Chains are stored longest first
+        and each chain length is a species, registered in the same order
+
+        Args:
+            template (str): script with a "{n}" repeat count closing it,
+                e.g. "(A){n}" or "(C)1((A)1[(B)2]){n}"
+            count (int): number of chains
+            mean (float): number average repeat count
+            pdi (float, optional): dispersity Mw / Mn. Defaults to 1.5.
+            distribution (str, optional): "schulz-zimm" or "log-normal".
+                Defaults to "schulz-zimm".
+            minimum (int, optional): smallest repeat count. Defaults to 1.
+            maximum (Optional[int]): largest repeat count. Defaults to None.
+
+        Raises:
+            ValueError: see gsdc.polymers.chain_lengths
+
+        Returns:
+            np.ndarray: (count,) repeat counts of the added chains, in order
+        """
+        if count < 1:
+            return np.empty(0, dtype=np.int64)
+        polymer = Polymer(template)
+        repeats = chain_lengths(
+            count, mean, pdi, self.rng, distribution, minimum, maximum
+        )
+        repeats = np.sort(repeats)[::-1]
+        anchors = self.box.sample(self.rng.random((count, 3)))
+        coords, types, bonds = polymer.grow(self.box, repeats, anchors, self.sampler)
+        starts = np.flatnonzero(np.diff(repeats, prepend=-1))
+        runs = [
+            (polymer.chain(int(n)), int(k))
+            for n, k in zip(repeats[starts], np.diff(np.append(starts, count)))
+        ]
+        # chains equivalent to an added molecule take its bead numbering
+        index = np.arange(len(coords))
+        first = 0
+        for chain, k in runs:
+            beads = self._numbering(chain, self._shared(chain))
+            copies = first + chain.num_beads * np.arange(k)[:, None] + beads
+            index[first : first + copies.size] = copies.ravel()
+            first += copies.size
+        coords, types = coords[index], np.array(types)[index].tolist()
+        self._append(coords, types, ordering.inverse(index)[bonds])
+        self.molecules += count
+        for chain, k in runs:
+            self._count(chain, k)
+        return repeats
+
+    @staged("add_bead")
     def add_bead(self, bead_name: str):
-        x = (0.5 - np.random.random()) * self.box.x
-        y = (0.5 - np.random.random()) * self.box.y
-        z = (0.5 - np.random.random()) * self.box.z
-        coord = np.array([x, y, z])
-        if len(self.coords) > 1:
-            self.coords = np.vstack([self.coords, coord])
-        else: 
-            self.coords = coord
-        self.types += [bead_name]
-        self.N += 1
-        
-    def fuller(self, bead_name: str):
-        num_solvent = int(self.box.volume * self.rho) - self.N
+        coord = self.box.sample(self.sampler.uniform(3))
+        self._append(coord, [bead_name])
+
+    @staged("fuller")
+    def fuller(
+        self,
+        bead_name: Union[str, Dict[str, Union[int, float]]],
+        number: Optional[int] = None,
+    ):
+        """
+        Fills the pot with solvent beads up to the number density self.rho
+
+        A mixture is given as a composition, e.g. {"W": 0.9, "E": 0.1} or
+        {"Na": 20, "Cl": 20, "W": 1.0}: integers are exact counts, floats
+        share the rest in proportion. All positions are drawn in one batch,
+        types are shuffled over them and everything is appended at once
+
+        Args:
+            bead_name (Union[str, Dict[str, Union[int, float]]]): solvent
+                bead type or composition
+            number (Optional[int]): exact number of solvent beads to add.
+                Defaults to int(volume * rho) - N.
+
+        Raises:
+            ValueError: number of solvent beads < 1 or a wrong composition
+        """
+        if number is None:
+            num_solvent = int(self.box.volume * self.rho) - self.N
+        else:
+            num_solvent = number
         if num_solvent < 1:
             raise ValueError('Pot: fuller: num_solvent < 1')
-        x = (0.5 - np.random.random(num_solvent)) * self.box.x
-        y = (0.5 - np.random.random(num_solvent)) * self.box.y
-        z = (0.5 - np.random.random(num_solvent)) * self.box.z
-        coord = np.vstack([x, y, z]).T
-        if len(self.coords) > 1:
-            self.coords = np.vstack([self.coords, coord])
-        else: 
-            self.coords = coord
-        self.types += [bead_name] * num_solvent
-        self.N += num_solvent
-        
-        
-    def brew(self, name: str = "input.gsd"):
-        bonds = np.array(self.bonds)
-        coords = np.array(self.coords)
+        coords = self.box.sample(self.rng.random((num_solvent, 3)))
+        if isinstance(bead_name, str):
+            bead_name = {bead_name: 1.0}
+        counts = _split(bead_name, num_solvent)
+        typeid = np.repeat(self.type_ids(bead_name), counts)
+        if len(counts) > 1:
+            typeid = self.rng.permutation(typeid)
+        self._append_ids(coords, typeid)
+
+    @staged("graft")
+    def graft(
+        self,
+        molecule: Mol,
+        density: float,
+        face: str = "z-",
+        jitter: float = 0.5,
+        offset: float = 0.5 * BOND_LENGTH,
+    ) -> int:
+        """
+        Grafts a polymer brush by bead 0 of each chain to a box face
+
+        Anchors form a jittered square lattice on the face and all chains
+        are grown together away from it, the grafting axis acts as a wall
+        in addition to the walls of the box
+
+        Args:
+            molecule (Mol): grafted molecule (directed, without cycles)
+            density (float): number of chains per unit area
+            face (str, optional): "x-", "x+", "y-", "y+", "z-" or "z+".
+                Defaults to "z-".
+            jitter (float, optional): random shift of anchors in lattice
+                spacings, 0.0 keeps a perfect lattice. Defaults to 0.5.
+            offset (float, optional): distance of anchors from the face.
+                Defaults to half of BOND_LENGTH.
+
+        Raises:
+            ValueError: unknown face or non-positive density
+
+        Returns:
+            int: number of grafted chains
+        """
+        if len(face) != 2 or face[0] not in "xyz" or face[1] not in "-+":
+            raise ValueError(f"Pot: graft: unknown face {face}")
+        if density <= 0.0:
+            raise ValueError("Pot: graft: density <= 0")
+        axis = "xyz".index(face[0])
+        others = [a for a in range(3) if a != axis]
+        lengths = np.array([self.box.x, self.box.y, self.box.z])
+        grid = lattice(lengths[others], density, jitter, self.rng)
+        anchors = np.empty((len(grid), 3))
+        anchors[:, others] = grid
+        sign = -1.0 if face[1] == "-" else 1.0
+        anchors[:, axis] = sign * (0.5 * lengths[axis] - offset)
+        coords = molecule.grow_many(
+            self.box,
+            anchors,
+            walls=sorted(set(self.box.walls) | {axis}),
+            sampler=self.sampler,
+        )
+        self._extend(molecule, coords.reshape(-1, 3), len(anchors))
+        return len(anchors)
+
+    def _place(
+        self,
+        molecule: Mol,
+        template: Template,
+        heads: np.ndarray,
+        directions: np.ndarray,
+    ) -> int:
+        """Places oriented copies of a template and wraps them into the box"""
+        coords = template.place(heads, directions, self.rng).reshape(-1, 3)
+        coords = self.box.wrap(coords)
+        self._extend(molecule, coords, len(heads))
+        return len(heads)
+
+    def _leaflets(
+        self, template: Template, area: float, axis: int, center: float, gap: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Heads and directions of the two leaflets of a planar bilayer"""
+        others = [a for a in range(3) if a != axis]
+        lengths = np.array([self.box.x, self.box.y, self.box.z])
+        heads, directions = list(), list()
+        for sign in (1.0, -1.0):
+            grid = lattice(lengths[others], 1.0 / area, 0.5, self.rng)
+            leaflet = np.empty((len(grid), 3))
+            leaflet[:, others] = grid
+            leaflet[:, axis] = center + sign * (template.length + 0.5 * gap)
+            direction = np.zeros((len(grid), 3))
+            direction[:, axis] = -sign
+            heads.append(leaflet)
+            directions.append(direction)
+        return np.vstack(heads), np.vstack(directions)
+
+    @staged("bilayer")
+    def bilayer(
+        self,
+        molecule: Mol,
+        head: Sequence[str],
+        tail: Sequence[str],
+        area: float = 1.0,
+        axis: str = "z",
+        center: float = 0.0,
+        gap: float = BOND_LENGTH,
+    ) -> int:
+        """
+        Builds a planar bilayer spanning the box, tails meet at the midplane
+
+        Args:
+            molecule (Mol): amphiphilic molecule
+            head (Sequence[str]), tail (Sequence[str]): bead types of the
+                head group and of the tail, they define the director
+            area (float, optional): area per molecule in a leaflet. Defaults to 1.0.
+            axis (str, optional): normal of the bilayer. Defaults to "z".
+            center (float, optional): position of the midplane. Defaults to 0.0.
+            gap (float, optional): distance between tail ends of the leaflets.
+                Defaults to BOND_LENGTH.
+
+        Returns:
+            int: number of placed molecules
+        """
+        template = Template(molecule, head, tail, self.rng)
+        heads, directions = self._leaflets(
+            template, area, "xyz".index(axis), center, gap
+        )
+        return self._place(molecule, template, heads, directions)
+
+    @staged("lamellae")
+    def lamellae(
+        self,
+        molecule: Mol,
+        head: Sequence[str],
+        tail: Sequence[str],
+        layers: int,
+        area: float = 1.0,
+        axis: str = "z",
+        gap: float = BOND_LENGTH,
+    ) -> int:
+        """
+        Builds a stack of equally spaced bilayers along an axis
+
+        Args:
+            molecule (Mol): amphiphilic molecule
+            head (Sequence[str]), tail (Sequence[str]): head and tail bead types
+            layers (int): number of bilayers in the box
+            area (float, optional): area per molecule in a leaflet. Defaults to 1.0.
+            axis (str, optional): normal of the bilayers. Defaults to "z".
+            gap (float, optional): Defaults to BOND_LENGTH.
+
+        Raises:
+            ValueError: layers < 1 or a bilayer is thicker than the period
+
+        Returns:
+            int: number of placed molecules
+        """
+        if layers < 1:
+            raise ValueError("Pot: lamellae: layers < 1")
+        template = Template(molecule, head, tail, self.rng)
+        k = "xyz".index(axis)
+        period = [self.box.x, self.box.y, self.box.z][k] / layers
+        if 2.0 * template.length + gap >= period:
+            raise ValueError("Pot: lamellae: bilayers do not fit in the period")
+        heads, directions = list(), list()
+        for layer in range(layers):
+            center = (layer + 0.5) * period - 0.5 * period * layers
+            h, d = self._leaflets(template, area, k, center, gap)
+            heads.append(h)
+            directions.append(d)
+        return self._place(molecule, template, np.vstack(heads), np.vstack(directions))
+
+    @staged("micelle")
+    def micelle(
+        self,
+        molecule: Mol,
+        head: Sequence[str],
+        tail: Sequence[str],
+        count: int,
+        center: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+        gap: float = BOND_LENGTH,
+    ) -> int:
+        """
+        Builds a spherical micelle with tails pointing to its center
+
+        Args:
+            molecule (Mol): amphiphilic molecule
+            head (Sequence[str]), tail (Sequence[str]): head and tail bead types
+            count (int): aggregation number
+            center (Tuple[float, float, float], optional): Defaults to (0.0, 0.0, 0.0).
+            gap (float, optional): diameter of the empty core. Defaults to BOND_LENGTH.
+
+        Returns:
+            int: number of placed molecules
+        """
+        template = Template(molecule, head, tail, self.rng)
+        normals = sphere(count)
+        heads = np.array(center) + normals * (template.length + 0.5 * gap)
+        return self._place(molecule, template, heads, -normals)
+
+    @staged("vesicle")
+    def vesicle(
+        self,
+        molecule: Mol,
+        head: Sequence[str],
+        tail: Sequence[str],
+        radius: float,
+        area: float = 1.0,
+        center: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+        gap: float = BOND_LENGTH,
+    ) -> int:
+        """
+        Builds a spherical vesicle, a closed bilayer with the given midplane radius
+
+        Args:
+            molecule (Mol): amphiphilic molecule
+            head (Sequence[str]), tail (Sequence[str]): head and tail bead types
+            radius (float): radius of the bilayer midplane
+            area (float, optional): area per molecule in a leaflet. Defaults to 1.0.
+            center (Tuple[float, float, float], optional): Defaults to (0.0, 0.0, 0.0).
+            gap (float, optional): Defaults to BOND_LENGTH.
+
+        Raises:
+            ValueError: radius is too small for the inner leaflet
+
+        Returns:
+            int: number of placed molecules
+        """
+        template = Template(molecule, head, tail, self.rng)
+        shift = template.length + 0.5 * gap
+        if radius <= shift:
+            raise ValueError("Pot: vesicle: radius is too small")
+        heads, directions = list(), list()
+        for sign in (1.0, -1.0):
+            r = radius + sign * shift
+            normals = sphere(max(int(round(4.0 * np.pi * r**2 / area)), 1))
+            heads.append(np.array(center) + normals * r)
+            directions.append(-sign * normals)
+        return self._place(molecule, template, np.vstack(heads), np.vstack(directions))
+
+    def _remove(self, mask: np.ndarray) -> None:
+        """
+        Removes masked beads and renumbers bonds
+
+        Raises:
+            ValueError: some masked bead is bonded
+        """
+        if np.any(mask[self.bonds]):
+            raise ValueError("Pot: remove: bonded beads can't be removed")
+        keep = ~mask
+        index = np.cumsum(keep) - 1
+        self._coords.assign(self.coords[keep])
+        self._typeid.assign(self.typeid[keep])
+        self._bonds.assign(index[self.bonds])
+
+    @staged("trim")
+    def trim(self, solvent: str, cutoff: float = BOND_LENGTH) -> int:
+        """
+        Removes solvent beads closer than cutoff to any other bead
+
+        Solvent fills the box uniformly, so after fuller() it overlaps
+        pre-assembled structures; trimming carves their volume out. Only
+        unbonded beads of the solvent type are solvent, beads of that type
+        inside molecules are kept
+
+        Args:
+            solvent (str): solvent bead type
+            cutoff (float, optional): Defaults to BOND_LENGTH.
+
+        Returns:
+            int: number of removed beads
+        """
+        is_solvent = self.typeid == self.type_ids([solvent])[0]
+        is_solvent[self.bonds.ravel()] = False
+        i, j, _ = CellList(self.coords, self.box, cutoff).pairs()
+        mixed = is_solvent[i] != is_solvent[j]
+        mask = np.zeros(self.N, dtype=bool)
+        mask[np.where(is_solvent[i[mixed]], i[mixed], j[mixed])] = True
+        self._remove(mask)
+        return int(mask.sum())
+
+    @staged("crosslink")
+    def crosslink(
+        self,
+        first: str,
+        second: str,
+        radius: float = 2.0 * BOND_LENGTH,
+        conversion: float = 1.0,
+        name: str = "link",
+    ) -> int:
+        """
+        Bonds nearby reactive beads of different molecules or chain parts
+
+        Candidate pairs within the capture radius come from the periodic
+        cell list. Links are taken shortest first in rounds: a pair is
+        accepted when it is the shortest free pair of both of its beads,
+        so no reactive site is used twice, also across calls
+
+        Args:
+            first (str), second (str): reactive bead types, may be equal
+            radius (float, optional): capture radius. Defaults to 2 * BOND_LENGTH.
+            conversion (float, optional): target fraction of the limiting
+                reactive sites to link. Defaults to 1.0.
+            name (str, optional): bond type of the links. Defaults to "link".
+
+        Raises:
+            ValueError: conversion is not in [0.0, 1.0]
+
+        Returns:
+            int: number of new links
+        """
+        if not 0.0 <= conversion <= 1.0:
+            raise ValueError("Pot: crosslink: conversion is not in [0.0, 1.0]")
+        types = self.typeid
+        first, second = self.type_ids([first, second])
+        bonds = self.bonds.astype(np.int64)
+        used = np.zeros(self.N, dtype=bool)
+        used[bonds[self.bond_typeid != 0].ravel()] = True
+        sites = np.flatnonzero(np.isin(types, [first, second]) & ~used)
+        if first == second:
+            target = int(conversion * len(sites)) // 2
+        else:
+            target = int(conversion * min(np.sum(types[sites] == first),
+                                          np.sum(types[sites] == second)))
+        if target < 1:
+            return 0
+        i, j, r = CellList(self.coords[sites], self.box, radius).pairs()
+        i, j = sites[i], sites[j]
+        lo, hi = np.minimum(i, j), np.maximum(i, j)
+        keep = (types[i] == first) & (types[j] == second)
+        keep |= (types[i] == second) & (types[j] == first)
+        if len(bonds):
+            bonded = np.sort(bonds, axis=1) @ np.array([self.N, 1])
+            keep &= ~np.isin(lo * self.N + hi, bonded)
+        order = np.argsort(r[keep], kind="stable")
+        lo, hi = lo[keep][order], hi[keep][order]
+        links: List[np.ndarray] = list()
+        count = 0
+        while len(lo) and count < target:
+            rank = np.arange(len(lo))
+            best = np.full(self.N, len(lo))
+            np.minimum.at(best, lo, rank)
+            np.minimum.at(best, hi, rank)
+            accepted = (best[lo] == rank) & (best[hi] == rank)
+            accepted[np.flatnonzero(accepted)[target - count :]] = False
+            links.append(np.stack([lo[accepted], hi[accepted]], axis=1))
+            count += len(links[-1])
+            used[lo[accepted]] = used[hi[accepted]] = True
+            free = ~used[lo] & ~used[hi]
+            lo, hi = lo[free], hi[free]
+        if count == 0:
+            return 0
+        kind, dtype = encode(self.bond_names, [name], self._bond_typeid.dtype)
+        if dtype != self._bond_typeid.dtype:
+            self._bond_typeid.astype(dtype)
+        self._bonds.extend(np.concatenate(links))
+        self._bond_typeid.extend(np.repeat(kind, count))
+        self.profiler.peak("bonds", len(self._bonds))
+        return count
+
+    @staged("quality_report")
+    def quality_report(
+        self,
+        cutoff: float = CUTOFF,
+        voxel: float = VOXEL,
+        thresholds: Optional[Dict[str, float]] = None,
+    ) -> Dict:
+        """
+        Checks the configuration before it is written
+
+        Args:
+            cutoff (float, optional): range of the closest pair search.
+                Defaults to CUTOFF.
+            voxel (float, optional): edge of density voxels. Defaults to VOXEL.
+            thresholds (Optional[Dict[str, float]]): limits, e.g.
+                {"min_distance": 0.05, "bond_max": 1.0, "density_cv": 0.3,
+                "outside": 0}. Defaults to None.
+
+        Raises:
+            QualityError: some threshold is violated
+
+        Returns:
+            Dict: metrics, see gsdc.quality.quality_report
+        """
+        report = quality_report(
+            self.coords, self.bonds, self.box, cutoff, voxel
+        )
+        failed = check(report, thresholds)
+        if failed:
+            raise QualityError(failed)
+        return report
+
+    @staged("replicate")
+    def replicate(self, nx: int = 1, ny: int = 1, nz: int = 1) -> "Pot":
+        """
+        Tiles the pot periodically into a box nx * ny * nz times larger
+
+        Bonds that cross the periodic border of the small box are connected
+        to the bead of the neighbouring image, so molecules stay whole. The
+        beads of every molecule are stored together, molecules are grouped
+        by species in the order of self.species and free beads follow them
+
+        Args:
+            nx (int, optional), ny (int, optional), nz (int, optional):
+                number of images along each axis. Defaults to 1.
+
+        Raises:
+            ValueError: some number of images < 1 or > 1 along a wall axis
+
+        Returns:
+            Pot: new pot in the larger box
+        """
+        n = np.array([nx, ny, nz])
+        if np.any(n < 1):
+            raise ValueError("Pot: replicate: number of images < 1")
+        if np.any(n[self.box.walls] > 1):
+            raise ValueError("Pot: replicate: images across a wall")
+        lengths = self.box.lengths
+        images = np.array(np.meshgrid(*[np.arange(k) for k in n], indexing="ij"))
+        images = images.reshape(3, -1).T
+        x, y, z = (lengths * n).tolist()
+        pot = Pot(
+            Box(x, y, z, pbc=self.box.pbc),
+            seed=self.seed_sequence.spawn(1)[0],
+            dtype=self.dtype,
+        )
+        pot.rho = self.rho
+        for name in ("masses", "charges", "diameters", "bond_params"):
+            setattr(pot, name, dict(getattr(self, name)))
+        pot.type_names = list(self.type_names)
+        pot.bond_names = list(self.bond_names)
+        pot._typeid = Buffer((), self._typeid.dtype)
+        pot._bond_typeid = Buffer((), self._bond_typeid.dtype)
+        base = np.reshape(self.coords, (-1, 3))
+        shift = (images + 0.5) * lengths - 0.5 * lengths * n
+        coords = (base[None, :, :] + shift[:, None, :]).reshape(-1, 3)
+        bonds = self.bonds.astype(np.int64)
+        d = base[bonds[:, 1]] - base[bonds[:, 0]]
+        crossed = np.round(d / lengths).astype(np.int64)
+        partner = (images[:, None, :] - crossed[None, :, :]) % n
+        partner = np.ravel_multi_index(np.moveaxis(partner, -1, 0), n)
+        first = np.arange(len(images))[:, None] * self.N + bonds[None, :, 0]
+        second = partner * self.N + bonds[None, :, 1]
+        bonds = np.sort(np.stack([first, second], axis=-1).reshape(-1, 2), axis=1)
+        # crossing bonds join beads of different images: beads of a molecule
+        # are gathered in their inner order, molecules grouped by species
+        # and free beads put after them
+        blocks = self._field_blocks()
+        rank = np.where(blocks < 0, len(self.species), blocks)
+        groups = ordering.molecule_ids(len(coords), bonds)
+        local = np.tile(np.arange(self.N), len(images))
+        order = np.lexsort((local, groups, rank[local]))
+        pot._append_ids(
+            coords[order],
+            np.tile(self.typeid, len(images))[order],
+            np.sort(ordering.inverse(order)[bonds], axis=1),
+            np.tile(self.bond_typeid, len(images)),
+        )
+        pot.molecules = self.molecules * len(images)
+        pot.species = {k: v * len(images) for k, v in self.species.items()}
+        pot.sequence = list(pot.species.items())
+        pot.topologies = dict(self.topologies)
+        return pot
+
+    def snapshot(self) -> "Pot":
+        """
+        Returns a frozen copy of the pot for deferred output
+
+        The copy owns its arrays and they are read-only, so later additions
+        to the pot do not leak into files that are still being written
+
+        Returns:
+            Pot: immutable copy of the current state
+        """
+        pot = copy.copy(self)
+        pot.box = copy.copy(self.box)
+        for name in ("_coords", "_typeid", "_bonds", "_bond_typeid"):
+            buffer = getattr(self, name).copy()
+            buffer.data.flags.writeable = False
+            setattr(pot, name, buffer)
+        pot.type_names = list(self.type_names)
+        pot.bond_names = list(self.bond_names)
+        pot.species = dict(self.species)
+        pot.sequence = list(self.sequence)
+        pot.topologies = dict(self.topologies)
+        for name in ("masses", "charges", "diameters", "bond_params"):
+            setattr(pot, name, dict(getattr(self, name)))
+        return pot
+
+    def _bond_type_table(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Bond type names and ids: script bonds are named by their bead types
+        in alphabetical order ("AB"), links keep their own names
+
+        Returns:
+            Tuple[List[str], np.ndarray]: sorted names and (M,) ids
+        """
+        names = np.array(self.type_names, dtype=str)
+        rank = np.argsort(np.argsort(names))
+        a, b = self.typeid[self.bonds[:, 0]], self.typeid[self.bonds[:, 1]]
+        swap = rank[a] > rank[b]
+        lo, hi = np.where(swap, b, a), np.where(swap, a, b)
+        size = len(names)
+        code = lo.astype(np.int64) * size + hi
+        linked = self.bond_typeid != 0
+        code[linked] = size * size + self.bond_typeid[linked]
+        codes, inverse = np.unique(code, return_inverse=True)
+        labels = [
+            self.bond_names[c - size * size]
+            if c >= size * size
+            else names[c // size] + names[c % size]
+            for c in codes.tolist()
+        ]
+        order = np.argsort(labels, kind="stable")
+        position = np.empty(len(order), dtype=np.uint32)
+        position[order] = np.arange(len(order))
+        return [labels[i] for i in order], position[inverse.reshape(-1)]
+
+    def _script_bond_params(self, molecule: Species) -> np.ndarray:
+        """(m, 2) harmonic parameters of the bonds of one molecule"""
+        types = np.array(molecule.types, dtype=str)
+        bonds = np.reshape(np.array(molecule.bonds, dtype=np.int64), (-1, 2))
+        pair = np.sort(types[bonds], axis=1)
+        labels, ids = np.unique(np.char.add(pair[:, 0], pair[:, 1]), return_inverse=True)
+        return expand(
+            self.bond_params,
+            labels.tolist(),
+            ids.reshape(-1),
+            (BOND_K, BOND_R0),
+            np.float64,
+        )
+
+    def _curve_order(
+        self,
+        order: str,
+        cell: float,
+        beads: np.ndarray,
+        contiguous: bool = False,
+        blocks: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Space-filling curve permutation of a subset of beads
+
+        Args:
+            order (str): "morton" or "hilbert"
+            cell (float): cell edge of the curve
+            beads (np.ndarray): (n,) bead ids
+            contiguous (bool, optional): keep molecules whole. Defaults to False.
+            blocks (Optional[np.ndarray]): (n,) non-decreasing block ids of
+                the beads, molecules are sorted only inside their block.
+                Defaults to None.
+
+        Returns:
+            np.ndarray: beads in the new order
+        """
+        if not contiguous:
+            return beads[ordering.order(self.coords[beads], self.box, order, cell)]
+        groups = ordering.molecule_ids(self.N, self.bonds)[beads]
+        # beads of a crosslinked molecule may be apart in storage
+        gather = np.argsort(groups, kind="stable")
+        beads, groups = beads[gather], groups[gather]
+        if blocks is not None:
+            blocks = blocks[gather]
+        coords = self.coords[beads]
+        starts = np.diff(groups, prepend=-1) != 0
+        groups = np.cumsum(starts)
+        if blocks is not None:
+            blocks = blocks[starts]
+        return beads[ordering.order(coords, self.box, order, cell, groups, blocks)]
+
+    def _field_blocks(self) -> np.ndarray:
+        """
+        FIELD molecule of every bead: the index of its species in
+        self.species, 0 for the network of linked pots, -1 for free beads
+
+        Raises:
+            ValueError: stored molecules do not match self.sequence
+
+        Returns:
+            np.ndarray: (N,) block ids
+        """
+        blocks = np.full(self.N, -1, dtype=np.int64)
+        if np.any(self.bond_typeid):
+            blocks[self.bonds.ravel()] = 0
+            return blocks
+        index = {script: i for i, script in enumerate(self.species)}
+        groups = ordering.molecule_ids(self.N, self.bonds)
+        sizes = np.bincount(groups)
+        bonded = sizes > 1
+        runs = [
+            (index[script], count)
+            for script, count in self.sequence
+            if self.topologies[script].num_beads > 1
+        ]
+        ids = np.repeat([i for i, _ in runs], [k for _, k in runs]).astype(np.int64)
+        if len(ids) != np.sum(bonded):
+            raise ValueError("Pot: dl_meso_config: molecules do not match the species")
+        member = bonded[groups]
+        blocks[member] = ids[(np.cumsum(bonded) - 1)[groups[member]]]
+        for script, count in self.sequence:
+            molecule = self.topologies[script]
+            if molecule.num_beads == 1:
+                kind = self.type_ids(molecule.types)[0]
+                free = np.flatnonzero((blocks == -1) & (self.typeid == kind))
+                blocks[free[:count]] = index[script]
+        return blocks
+
+    @staged("brew")
+    def brew(
+        self,
+        name: str = "input.gsd",
+        order: Optional[str] = None,
+        contiguous: bool = False,
+        cell: float = ordering.CELL,
+    ) -> Optional[np.ndarray]:
+        """
+        Writes the pot into a GSD file
+
+        Args:
+            name (str, optional): file name. Defaults to "input.gsd".
+            order (Optional[str]): "morton" or "hilbert" to write beads
+                along a space-filling curve over box cells, None keeps the
+                storage order. Defaults to None.
+            contiguous (bool, optional): keep molecules whole when reordering.
+                Defaults to False.
+            cell (float, optional): cell edge of the curve. Defaults to 1.0.
+
+        Returns:
+            Optional[np.ndarray]: perm[k] is the pot index of the k-th
+                written bead, None without reordering
+        """
+        perm = None
+        if order is not None:
+            perm = self._curve_order(order, cell, np.arange(self.N), contiguous)
+
+        def arranged(values: np.ndarray) -> np.ndarray:
+            return values if perm is None else values[perm]
 
         snapshot = gsd.hoomd.Frame()
         snapshot.particles.N = self.N
         snapshot.configuration.box = [self.box.x, self.box.y, self.box.z, 0, 0, 0]
+        # GSD boxes are always periodic, walls are kept for the simulation setup
+        snapshot.log["box/periodic"] = np.array(self.box.pbc, dtype=np.uint8)
         snapshot.bonds.N = len(self.bonds)
 
-        snapshot.particles.types = sorted(list(set(self.types)))
-        b_types = set()
-        for b in self.bonds:
-
-            if self.types[b[0]] < self.types[b[1]]:
-                b_types.add(self.types[b[0]] + self.types[b[1]])
-            else:
-                b_types.add(self.types[b[1]] + self.types[b[0]])
-
-        snapshot.bonds.types = sorted(list(b_types))
+        # float32 positions and uint32 bonds are handed over as is, small
+        # type ids are widened once to the uint32 of GSD
+        snapshot.particles.types = list(self.type_names)
+        snapshot.particles.typeid = arranged(self.typeid).astype(np.uint32)
+        snapshot.particles.position = arranged(self.coords)
+        # per-type tables are expanded by type ids only here
+        snapshot.particles.mass = arranged(self._per_bead(self.masses, MASS))
+        snapshot.particles.charge = arranged(self._per_bead(self.charges, CHARGE))
+        snapshot.particles.diameter = arranged(
+            self._per_bead(self.diameters, DIAMETER)
+        )
 
-        snapshot.particles.typeid = np.array(
-            [snapshot.particles.types.index(t) for t in self.types]
+        b_types, b_typeid = self._bond_type_table()
+        snapshot.bonds.types = b_types
+        snapshot.bonds.typeid = b_typeid
+        if perm is None:
+            snapshot.bonds.group = self.bonds
+        else:
+            snapshot.bonds.group = ordering.inverse(perm).astype(BOND_DTYPE)[self.bonds]
+        # GSD has no bond parameters, they are logged per bond type
+        params = expand(
+            self.bond_params, b_types, np.arange(len(b_types)), (BOND_K, BOND_R0)
         )
-        snapshot.particles.position = coords
-        snapshot.particles.mass = np.array([1.0] * self.N)
-        snapshot.bonds.group = bonds
-        tmp_type: str = ""
-        b_type_id = list()
-        for b in self.bonds:
-            if self.types[b[0]] < self.types[b[1]]:
-                tmp_type = self.types[b[0]] + self.types[b[1]]
-            else:
-                tmp_type = self.types[b[1]] + self.types[b[0]]
-            b_type_id.append(snapshot.bonds.types.index(tmp_type))
-        snapshot.bonds.typeid = np.array(b_type_id)
+        snapshot.log["bonds/k"] = np.ascontiguousarray(params[:, 0])
+        snapshot.log["bonds/r0"] = np.ascontiguousarray(params[:, 1])
 
         with gsd.hoomd.open(name=name, mode="w") as f:
             f.append(snapshot)
+        self.profiler.count("bytes.gsd", os.path.getsize(name))
+        return perm
+
+
+    @staged("dl_meso_config")
+    def dl_meso_config(
+        self,
+        name: str = 'molecule cyclic example',
+        solvent: Union[str, Iterable[str]] = "W",
+        file: str = "CONFIG",
+        order: Optional[str] = None,
+        cell: float = ordering.CELL,
+    ) -> np.ndarray:
+        """
+        Writes the DL_MESO CONFIG file, solvent beads first
 
+        Other free beads follow, then molecules grouped by species in the
+        order of the FIELD file
 
-    def dl_meso_config(self, name: str = 'molecule cyclic example', solvent: str = "W"):
-        coords = np.array(self.coords)
+        Args:
+            name (str, optional): title of the file.
+            solvent (Union[str, Iterable[str]], optional): solvent bead
+                types. Defaults to "W".
+            file (str, optional): file name. Defaults to "CONFIG".
+            order (Optional[str]): "morton" or "hilbert" to sort solvent
+                beads along a space-filling curve and molecules by the cell
+                of their first bead; molecules stay whole and inside their
+                species. Defaults to None.
+            cell (float, optional): cell edge of the curve. Defaults to 1.0.
+
+        Returns:
+            np.ndarray: perm[k] is the pot index of the k-th written bead
+        """
+        solvent = [solvent] if isinstance(solvent, str) else list(solvent)
+        blocks = self._field_blocks()
+        is_solvent = np.isin(np.array(self.type_names, dtype=str), solvent)[self.typeid]
+        is_solvent &= blocks < 0
+        first, rest = np.flatnonzero(is_solvent), np.flatnonzero(~is_solvent)
+        rest = rest[np.argsort(blocks[rest], kind="stable")]
+        if order is not None:
+            first = self._curve_order(order, cell, first)
+            if np.any(self.bond_typeid):  # the network keeps the bead order of FIELD
+                free = blocks[rest] < 0
+                rest = np.concatenate(
+                    [self._curve_order(order, cell, rest[free]), rest[~free]]
+                )
+            else:
+                rest = self._curve_order(
+                    order, cell, rest, contiguous=True, blocks=blocks[rest]
+                )
+        perm = np.concatenate([first, rest])
+        coords = self.coords[perm].tolist()
         N = self.N
         box = [self.box.x, self.box.y, self.box.z]
-        types = self.types
-        num = 1
+        types = np.array(self.type_names, dtype=str)[self.typeid[perm]].tolist()
 
-        with open(file = 'CONFIG', mode = "w+") as f:
+        with open(file = file, mode = "w+") as f:
             f.write(f'DL_MESO {name}\n')
             f.write(f'       0       1{N:10.0f}\n')
             f.write(f'{box[0]:16.10f}{0.0:16.10f}{0.0:16.10f}\n')
             f.write(f'{0.0:16.10f}{box[1]:16.10f}{0.0:16.10f}\n')
             f.write(f'{0.0:16.10f}{0.0:16.10f}{box[2]:16.10f} \n')
-            for i, t in enumerate(types):
-                if t == solvent:
-                    f.write(f'{solvent}   {num :7.0f}\n')
-                    num += 1
-                    f.write(f'{coords[i][0] :16.10f}{coords[i][1] :16.10f}{coords[i][2] :16.10f}\n')
-            for i, t in enumerate(types):
-                if t != solvent:
-                    f.write(f'{t}   {num :7.0f}\n')
-                    num += 1
-                    f.write(f'{coords[i][0] :16.10f}{coords[i][1] :16.10f}{coords[i][2] :16.10f}\n')
+            for num, (t, c) in enumerate(zip(types, coords), start=1):
+                f.write(f'{t}   {num :7.0f}\n')
+                f.write(f'{c[0] :16.10f}{c[1] :16.10f}{c[2] :16.10f}\n')
+        self.profiler.count("bytes.config", os.path.getsize(file))
+        return perm
 
 
-    def dl_meso_field(self, name: str = 'molecule cyclic example'):
-        bonds = self.bonds
-        N = self.N
-        types = self.types
-        mol = self.molecules
-        num_beads = 1
+    @staged("dl_meso_field")
+    def dl_meso_field(
+        self,
+        name: str = 'molecule cyclic example',
+        file: str = "FIELD",
+        counts: Optional[np.ndarray] = None,
+    ):
+        """
+        Writes the DL_MESO FIELD file
+
+        Args:
+            name (str, optional): title of the file.
+            file (str, optional): file name. Defaults to "FIELD".
+            counts (Optional[np.ndarray]): number of beads of every type in
+                self.type_names, for a pot that keeps only the composition
+                of a system, see gsdc.domains. Defaults to the stored beads.
+        """
+        if counts is None:
+            counts = np.bincount(self.typeid, minlength=len(self.type_names))
+        types = [t for t, n in zip(self.type_names, counts.tolist()) if n]
         pairs = list()
+        free = Counter(dict(zip(self.type_names, counts.tolist())))
+        molecules: Dict[str, Species] = {m.script: m for m in self.topologies.values()}
+        species = dict(self.species)
+        if np.any(self.bond_typeid):
+            # DL_MESO has no bonds between molecules: a network is one molecule
+            bonds = np.reshape(np.array(self.bonds, dtype=np.int64), (-1, 2))
+            bonded = np.zeros(self.N, dtype=bool)
+            bonded[bonds.ravel()] = True
+            index = np.cumsum(bonded) - 1
+            names = np.array(self.type_names, dtype=str)
+            network = Chain(
+                "network", names[self.typeid[bonded]].tolist(), index[bonds]
+            )
+            molecules = {"network": network}
+            species = {"network": 1}
+            free = Counter(names[self.typeid[~bonded]].tolist())
+            labels, ids = self._bond_type_table()
+            params = {
+                "network": expand(
+                    self.bond_params, labels, ids, (BOND_K, BOND_R0), np.float64
+                )
+            }
+        else:
+            for script, count in species.items():
+                for t, n in Counter(molecules[script].types).items():
+                    free[t] -= n * count
+            params = {
+                script: self._script_bond_params(molecules[script])
+                for script in species
+            }
 
-        with open(file = 'FIELD', mode = "w+") as f:
+        with open(file = file, mode = "w+") as f:
             f.write(f'DL_MESO {name}\n')
             f.write(f'\n')
-            f.write(f'SPECIES {len(set(types))}\n')
-            for t in set(types):
-                num_type = 0
-                for x in types:
-                    if x == t:
-                        num_type += 1
-                f.write(f'{t}        1.0 0.0 {num_type}\n')
-            f.write(f'\n')
-            f.write(f'MOLECULES 1\n')
-            f.write(f'\n')
-            f.write(f'nummols {mol}\n')
+            f.write(f'SPECIES {len(types)}\n')
             for t in types:
-                if t != 'W':
-                    num_beads += 1
-            f.write(f'beads {num_beads}\n')
-            f.write(f'bonds {len(bonds)}\n')
-            for b in bonds:
-                f.write(f'harm  {b} 128.000 0.500000\n')
-            f.write(f'finish\n')
+                mass = self.masses.get(t, MASS)
+                charge = self.charges.get(t, CHARGE)
+                f.write(f'{t}        {mass} {charge} {free[t]}\n')
             f.write(f'\n')
-            f.write(f'INTERACTIONS 6\n')
-            for i, t in enumerate(set(types)):
-                pairs += [(t, x) for x in list(set(types))[i:]]
+            f.write(f'MOLECULES {len(species)}\n')
+            for script, count in species.items():
+                molecule = molecules[script]
+                f.write(f'{script}\n')
+                f.write(f'nummols {count}\n')
+                f.write(f'beads {molecule.num_beads}\n')
+                for t in molecule.types:
+                    f.write(f'{t}        0.0 0.0 0.0\n')
+                f.write(f'bonds {len(molecule.bonds)}\n')
+                for b, (k, r0) in zip(molecule.bonds, params[script].tolist()):
+                    f.write(f'harm  {b[0] + 1} {b[1] + 1} {k:.3f} {r0:.6f}\n')
+                f.write(f'finish\n')
+            f.write(f'\n')
+            for i, t in enumerate(types):
+                pairs += [(t, x) for x in types[i:]]
+            f.write(f'INTERACTIONS {len(pairs)}\n')
             for pair in pairs:
                 f.write(f'{pair[0]} {pair[1]} dpd {25.0:4f} {1.0:3f} {4.5:3f}\n')
             f.write(f'\n')
             f.write(f'close\n')
-            print(pairs)
\ No newline at end of file
+        self.profiler.count("bytes.field", os.path.getsize(file))
@@ -1,13 +1,21 @@
+from typing import Optional
+
 from .bonds_parser import bonds_parser
 from .check_script import check_script
 from .constructor import MolGraph
+from .profiler import DISABLED, Profiler
 from .types_parser import types_parser
 
 
 class Mol(MolGraph):
-    def __init__(self, script: str) -> None:
-        if check_script(script) != "No errors":
-            raise ValueError(f"{script}: is not correct")
-        self.types = types_parser(script)
-        self.bonds = bonds_parser(script)
-        super().__init__(self.bonds)
+    def __init__(self, script: str, profiler: Optional[Profiler] = None) -> None:
+        profiler = DISABLED if profiler is None else profiler
+        with profiler.stage("check_script"):
+            if check_script(script) != "No errors":
+                raise ValueError(f"{script}: is not correct")
+        self.script = script
+        with profiler.stage("parse"):
+            self.types = types_parser(script)
+            self.bonds = bonds_parser(script)
+        with profiler.stage("validate"):
+            super().__init__(self.bonds)
@@ -0,0 +1,194 @@
+"""
+Space-filling curve order of beads for output
+
+Beads close in space get close indices when they are sorted by the index
+of their box cell along a Morton (Z-order) or Hilbert curve, so MD engines
+start with good memory locality. Molecules, i.e. beads connected by
+bonds, can be kept contiguous: they are sorted by the cell of their first
+bead and keep their inner order
+"""
+
+from typing import Final, Optional, Tuple
+
+import numpy as np
+
+from .periodic_box import Box
+
+CURVES: Final[Tuple[str, ...]] = ("morton", "hilbert")
+CELL: Final[float] = 1.0
+DIMENSIONS: Final[int] = 3
+
+
+def _ramp(sizes: np.ndarray) -> np.ndarray:
+    """0..size-1 for every size, concatenated"""
+    return np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+
+def _interleave(axes: np.ndarray, bits: int) -> np.ndarray:
+    """(3, n) integers -> (n,) keys with bits of axis 0 most significant"""
+    key = np.zeros(axes.shape[1], dtype=np.uint64)
+    for b in range(bits - 1, -1, -1):
+        for axis in axes:
+            key = (key << np.uint64(1)) | ((axis >> np.uint64(b)) & np.uint64(1))
+    return key
+
+
+def morton(cells: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Morton (Z-order) keys of cells
+
+    Args:
+        cells (np.ndarray): (n, 3) non-negative cell indices
+        bits (int): bits per axis, at most 21
+
+    Returns:
+        np.ndarray: (n,) uint64 keys
+    """
+    return _interleave(np.asarray(cells, dtype=np.uint64).T, bits)
+
+
+def hilbert(cells: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Hilbert keys of cells (Skilling's transpose algorithm)
+
+    Consecutive keys always belong to cells sharing a face
+
+    Args:
+        cells (np.ndarray): (n, 3) non-negative cell indices
+        bits (int): bits per axis, at most 21
+
+    Returns:
+        np.ndarray: (n,) uint64 keys
+    """
+    x = np.asarray(cells, dtype=np.uint64).T.copy()
+    if bits < 1:
+        return np.zeros(x.shape[1], dtype=np.uint64)
+    q = 1 << (bits - 1)
+    while q > 1:
+        p = np.uint64(q - 1)
+        for i in range(DIMENSIONS):
+            high = (x[i] & np.uint64(q)) != 0
+            x[0] = np.where(high, x[0] ^ p, x[0])
+            if i:
+                t = np.where(high, np.uint64(0), (x[0] ^ x[i]) & p)
+                x[0] ^= t
+                x[i] ^= t
+        q >>= 1
+    for i in range(1, DIMENSIONS):
+        x[i] ^= x[i - 1]
+    t = np.zeros_like(x[0])
+    q = 1 << (bits - 1)
+    while q > 1:
+        t = np.where((x[-1] & np.uint64(q)) != 0, t ^ np.uint64(q - 1), t)
+        q >>= 1
+    x ^= t
+    return _interleave(x, bits)
+
+
+def curve_keys(
+    coords: np.ndarray, box: Box, curve: str = "hilbert", cell: float = CELL
+) -> np.ndarray:
+    """
+    Keys of beads along a space-filling curve over box cells
+
+    Args:
+        coords (np.ndarray): (n, 3) coordinates in the box centered at 0.0
+        box (Box): instance of box
+        curve (str, optional): "morton" or "hilbert". Defaults to "hilbert".
+        cell (float, optional): cell edge. Defaults to CELL.
+
+    Raises:
+        ValueError: unknown curve or cell <= 0
+
+    Returns:
+        np.ndarray: (n,) uint64 keys
+    """
+    if curve not in CURVES:
+        raise ValueError(f"curve_keys: unknown curve {curve}")
+    if cell <= 0.0:
+        raise ValueError("curve_keys: cell <= 0")
+    shape = np.maximum((box.lengths // cell).astype(np.int64), 1)
+    bits = int(np.ceil(np.log2(shape.max()))) if shape.max() > 1 else 0
+    if bits > 21:
+        raise ValueError("curve_keys: more than 2^21 cells along an axis")
+    frac = np.clip(np.reshape(coords, (-1, 3)) / box.lengths + 0.5, 0.0, 1.0)
+    cells = np.minimum((frac * shape).astype(np.int64), shape - 1)
+    return (morton if curve == "morton" else hilbert)(cells, bits)
+
+
+def molecule_ids(num_beads: int, bonds: np.ndarray) -> np.ndarray:
+    """
+    Molecule id of every bead: connected components of the bond graph
+
+    Every bead points to the smallest bead it is known to be joined with;
+    bonds hook the pointers of their ends together and pointer jumping
+    shortens the paths, until nothing changes
+
+    Args:
+        num_beads (int): number of beads
+        bonds (np.ndarray): (m, 2) bonded bead ids
+
+    Returns:
+        np.ndarray: (num_beads,) ids numbered from 0 in the order of the
+            first bead of each molecule
+    """
+    bonds = np.reshape(np.asarray(bonds, dtype=np.int64), (-1, 2))
+    parent = np.arange(num_beads)
+    while True:
+        a, b = parent[bonds[:, 0]], parent[bonds[:, 1]]
+        low = np.minimum(a, b)
+        hooked = parent.copy()
+        np.minimum.at(hooked, a, low)
+        np.minimum.at(hooked, b, low)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, parent):
+            break
+        parent = hooked
+    return np.unique(parent, return_inverse=True)[1].reshape(-1)
+
+
+def order(
+    coords: np.ndarray,
+    box: Box,
+    curve: str = "hilbert",
+    cell: float = CELL,
+    groups: Optional[np.ndarray] = None,
+    blocks: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Permutation of beads along a space-filling curve
+
+    Args:
+        coords (np.ndarray): (n, 3) coordinates
+        box (Box): instance of box
+        curve (str, optional): "morton" or "hilbert". Defaults to "hilbert".
+        cell (float, optional): cell edge. Defaults to CELL.
+        groups (Optional[np.ndarray]): (n,) non-decreasing group ids, groups
+            are kept contiguous and in their inner order. Defaults to None.
+        blocks (Optional[np.ndarray]): (number of groups,) non-decreasing
+            block ids, groups are sorted only inside their block.
+            Defaults to None.
+
+    Returns:
+        np.ndarray: new order, perm[k] is the old index of the k-th bead
+    """
+    keys = curve_keys(coords, box, curve, cell)
+    if groups is None:
+        return np.argsort(keys, kind="stable")
+    starts = np.flatnonzero(np.diff(groups, prepend=-1))
+    sizes = np.diff(np.append(starts, len(keys)))
+    if blocks is None:
+        blocks = np.zeros(len(starts), dtype=np.int64)
+    chosen = np.lexsort((keys[starts], blocks))
+    return np.repeat(starts[chosen], sizes[chosen]) + _ramp(sizes[chosen])
+
+
+def inverse(perm: np.ndarray) -> np.ndarray:
+    """New index of every old bead, e.g. to remap bonds: inverse(perm)[bonds]"""
+    result = np.empty_like(perm)
+    result[perm] = np.arange(len(perm), dtype=perm.dtype)
+    return result
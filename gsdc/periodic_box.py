@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Sequence, Tuple
 
 import numpy as np
 
@@ -10,17 +10,77 @@ class Box:
     Sets up a 3D-box for simulation of a molecular system
     Its center has coordinates (0.0, 0.0, 0.0)
     Edge sizes: self.x, self.y, self.z
+    Periodic or wall axes: self.pbc, e.g. (True, True, False) for a slit
     """
 
-    def __init__(self, x: float, y: float, z: float) -> None:
+    def __init__(
+        self,
+        x: float,
+        y: float,
+        z: float,
+        pbc: Sequence[bool] = (True, True, True),
+    ) -> None:
         self.x = x
         self.y = y
         self.z = z
+        x_pbc, y_pbc, z_pbc = (bool(p) for p in pbc)
+        self.pbc: Tuple[bool, bool, bool] = (x_pbc, y_pbc, z_pbc)
 
     @property
     def volume(self) -> float:
         return self.x * self.y * self.z
 
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.array([self.x, self.y, self.z], dtype=np.float64)
+
+    @property
+    def walls(self) -> List[int]:
+        """Impenetrable axes (0, 1, 2)"""
+        return [axis for axis in range(3) if not self.pbc[axis]]
+
+    def wrap(self, coords: np.ndarray) -> np.ndarray:
+        """
+        Returns (n, 3) coordinates into the box along the periodic axes
+
+        Args:
+            coords (np.ndarray): (..., 3) coordinates
+
+        Returns:
+            np.ndarray: wrapped copy, wall axes are untouched
+        """
+        lengths = self.lengths
+        shift = lengths * np.round(coords / lengths)
+        return coords - np.where(self.pbc, shift, 0.0)
+
+    def inside(self, coords: np.ndarray) -> np.ndarray:
+        """
+        Checks (..., 3) coordinates against the walls only
+
+        Returns:
+            np.ndarray: (...,) True where the bead is strictly between walls
+        """
+        walls = self.walls
+        return np.all(
+            np.abs(np.take(coords, walls, axis=-1)) < 0.5 * self.lengths[walls],
+            axis=-1,
+        )
+
+    def sample(self, u: np.ndarray) -> np.ndarray:
+        """
+        Uniform positions from uniform numbers in [0.0, 1.0)
+
+        Args:
+            u (np.ndarray): (..., 3) uniform numbers
+
+        Returns:
+            np.ndarray: (..., 3) positions, strictly inside along wall axes
+        """
+        half = 0.5 * self.lengths
+        coords = (np.asarray(u) - 0.5) * self.lengths
+        inner = np.nextafter(half, 0.0)
+        return np.where(self.pbc, coords, np.clip(coords, -inner, inner))
+
     def periodic_correct(
         self, xb: float, yb: float, zb: float
     ) -> Tuple[float, float, float]:
@@ -33,9 +93,12 @@ class Box:
         Returns:
             Tuple[float, float, float]: changed (or old) coordinates
         """
-        xb = Box.periodic(xb, self.x)
-        yb = Box.periodic(yb, self.y)
-        zb = Box.periodic(zb, self.z)
+        if self.pbc[0]:
+            xb = Box.periodic(xb, self.x)
+        if self.pbc[1]:
+            yb = Box.periodic(yb, self.y)
+        if self.pbc[2]:
+            zb = Box.periodic(zb, self.z)
         return xb, yb, zb
 
     def check_in_box(self, xb: float, yb: float, zb: float) -> bool:
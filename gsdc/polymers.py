@@ -0,0 +1,205 @@
+from typing import Final, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .canonical import Topology
+from .constructor import BOND_LENGTH, ITERATION_LIMIT
+from .exceptions import IterationLimitError
+from .molecule import Mol
+from .periodic_box import Box
+from .sampler import Sampler
+
+DISTRIBUTIONS: Final[Tuple[str, ...]] = ("schulz-zimm", "log-normal")
+
+
+def chain_lengths(
+    count: int,
+    mean: float,
+    pdi: float,
+    rng: np.random.Generator,
+    distribution: str = "schulz-zimm",
+    minimum: int = 1,
+    maximum: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Repeat counts of a polydisperse ensemble
+
+    Schulz-Zimm lengths follow a gamma distribution with the shape
+    1 / (pdi - 1), log-normal ones have sigma^2 = ln(pdi); both have the
+    number average mean and the dispersity pdi before rounding and clipping
+
+    Args:
+        count (int): number of chains
+        mean (float): number average repeat count
+        pdi (float): dispersity Mw / Mn, 1.0 gives monodisperse chains
+        rng (np.random.Generator): source of random numbers
+        distribution (str, optional): "schulz-zimm" or "log-normal".
+            Defaults to "schulz-zimm".
+        minimum (int, optional): smallest repeat count. Defaults to 1.
+        maximum (Optional[int]): largest repeat count. Defaults to None.
+
+    Raises:
+        ValueError: unknown distribution, minimum < 1, mean < minimum or
+            pdi < 1.0
+
+    Returns:
+        np.ndarray: (count,) repeat counts
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"chain_lengths: unknown distribution {distribution}")
+    if minimum < 1:
+        raise ValueError("chain_lengths: minimum < 1")
+    if mean < minimum or pdi < 1.0:
+        raise ValueError("chain_lengths: mean < minimum or pdi < 1.0")
+    if pdi == 1.0:
+        lengths = np.full(count, float(mean))
+    elif distribution == "schulz-zimm":
+        shape = 1.0 / (pdi - 1.0)
+        lengths = rng.gamma(shape, mean / shape, count)
+    else:
+        sigma = np.sqrt(np.log(pdi))
+        lengths = rng.lognormal(np.log(mean) - 0.5 * sigma**2, sigma, count)
+    return np.clip(np.round(lengths), minimum, maximum).astype(np.int64)
+
+
+class Chain(Topology):
+    """
+    Topology of one chain length, enough to describe its species
+
+    Attributes:
+        self.script (str): script of the chain
+        self.types (List[str]): bead types
+        self.bonds (List[Tuple[int, int]]): bonded bead ids
+        self.num_beads (int): number of beads
+    """
+
+    def __init__(
+        self, script: str, types: List[str], bonds: Union[Sequence, np.ndarray]
+    ) -> None:
+        self.script = script
+        self.types = types
+        self.bonds = [(int(i), int(j)) for i, j in bonds]
+        self.num_beads = len(types)
+
+
+class Polymer:
+    """
+    Chains of a script template with a variable repeat count
+
+    The template has one "{n}" placeholder that closes the script, e.g.
+    "(A){n}" or "(C)1((A)1[(B)2]){n}". It is compiled for three repeat
+    counts only; the topology of any length is a prefix of a tiled one,
+    so a whole ensemble is grown in one pass over the bonds of its
+    longest chain
+
+    Attributes:
+        self.template (str): script template
+        self.prefix (int): beads before the first repeat unit
+        self.unit (int): beads per repeat unit
+    """
+
+    def __init__(self, template: str) -> None:
+        """
+        Args:
+            template (str): script with a "{n}" repeat count
+
+        Raises:
+            ValueError: the repeat does not close the script or the chain
+                is not a directed tree
+        """
+        self.template = template
+        first, second, third = (Mol(template.format(n=n)) for n in (2, 3, 4))
+        self.unit = second.num_beads - first.num_beads
+        self.prefix = first.num_beads - 2 * self.unit
+        if self.unit < 1 or self.prefix < 0 or first.cyclical or not first.directed:
+            raise ValueError(f"{template}: is not a repeatable chain")
+        self._types = second.types[: self.prefix + self.unit]
+        self._unit_types = second.types[self.prefix : self.prefix + self.unit]
+        bonds = np.array(second.bonds, dtype=np.int64)
+        edge = self.prefix + self.unit
+        self._base = bonds[bonds[:, 1] < edge]
+        self._link = bonds[(bonds[:, 1] >= edge) & (bonds[:, 1] < edge + self.unit)]
+        types, tiled = self.topology(4)
+        expected = sorted(third.bonds, key=lambda b: b[1])
+        if types != third.types or list(map(tuple, tiled.tolist())) != expected:
+            raise ValueError(f"{template}: the repeat must close the script")
+
+    def num_beads(self, n: np.ndarray) -> np.ndarray:
+        return self.prefix + self.unit * np.asarray(n)
+
+    def topology(self, n: int) -> Tuple[List[str], np.ndarray]:
+        """
+        Types and bonds of a chain with n repeat units
+
+        Returns:
+            Tuple[List[str], np.ndarray]: types and (m, 2) bonds sorted by
+                the second bead, so every parent precedes its children
+        """
+        types = self._types[: self.prefix] + self._unit_types * n
+        shifts = self.unit * np.arange(max(n - 1, 0))
+        links = (self._link[None, :, :] + shifts[:, None, None]).reshape(-1, 2)
+        bonds = np.concatenate([self._base, links])
+        bonds = bonds[bonds[:, 1] < len(types)]
+        return types, bonds[np.argsort(bonds[:, 1], kind="stable")]
+
+    def chain(self, n: int) -> Chain:
+        return Chain(self.template.format(n=n), *self.topology(n))
+
+    def grow(
+        self,
+        box: Box,
+        repeats: np.ndarray,
+        anchors: np.ndarray,
+        sampler: Sampler,
+        bond_length: float = BOND_LENGTH,
+        iteration_limit: int = ITERATION_LIMIT,
+        walls: Optional[Sequence[int]] = None,
+    ) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """
+        Grows chains of different lengths in one vectorized pass
+
+        Bonds of the longest chain are visited once; each step moves only
+        the chains that are long enough to contain it
+
+        Args:
+            box (Box): instance of box
+            repeats (np.ndarray): (count,) repeat counts, non-increasing
+            anchors (np.ndarray): (count, 3) coordinates of bead 0
+            sampler (Sampler): source of random directions
+            bond_length (float, optional): Defaults to BOND_LENGTH.
+            iteration_limit (int, optional): redraws per bond. Defaults to ITERATION_LIMIT.
+            walls (Optional[Sequence[int]]): impenetrable axes. Defaults to box.walls.
+
+        Raises:
+            IterationLimitError: some chain can't be grown
+
+        Returns:
+            Tuple[np.ndarray, List[str], np.ndarray]: chain after chain
+                coordinates, types and bonds numbered from 0
+        """
+        sizes = self.num_beads(repeats)
+        types, bonds = self.topology(int(repeats[0]))
+        if walls is not None:
+            box = Box(box.x, box.y, box.z, [i not in walls for i in range(3)])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        coords = np.empty((int(sizes.sum()), 3))
+        coords[offsets] = np.reshape(anchors, (-1, 3))
+        ascending = sizes[::-1]
+        for parent, child in bonds:
+            todo = offsets[: len(sizes) - np.searchsorted(ascending, child, "right")]
+            for _ in range(iteration_limit):
+                new = coords[todo + parent] + sampler.vectors(len(todo), bond_length)
+                inside = box.inside(new)
+                coords[todo[inside] + child] = new[inside]
+                todo = todo[~inside]
+                if len(todo) == 0:
+                    break
+            else:
+                raise IterationLimitError(iteration_limit)
+        coords = box.wrap(coords)
+        local = np.arange(len(coords)) - np.repeat(offsets, sizes)
+        counts = np.searchsorted(bonds[:, 1], sizes)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        index = np.arange(int(counts.sum())) - np.repeat(starts, counts)
+        chain_bonds = bonds[index] + np.repeat(offsets, counts)[:, None]
+        return coords, np.array(types)[local].tolist(), chain_bonds
@@ -0,0 +1,154 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import IO, Callable, Dict, Iterator, List
+
+Callback = Callable[[str, str, float], None]
+
+
+class Profiler:
+    """
+    Lightweight instrumentation of the build pipeline
+
+    Collects wall time and calls per stage, event counters (relaxation
+    iterations, rejected moves), bytes written per format and peak array
+    sizes. A disabled profiler does nothing, so it can be passed everywhere.
+    Records are merged under a lock, so Writer threads can report into the
+    profiler of the pot that is still being built
+
+    Attributes:
+        self.enabled (bool): False turns every method into a no-op
+        self.stages (Dict[str, Dict[str, float]]): seconds and calls per stage
+        self.counters (Dict[str, int]): event counters
+        self.peaks (Dict[str, int]): maximal observed values
+        self.callbacks (List[Callback]): called as callback(kind, name, value)
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.stages: Dict[str, Dict[str, float]] = dict()
+        self.counters: Dict[str, int] = dict()
+        self.peaks: Dict[str, int] = dict()
+        self.callbacks: List[Callback] = list()
+        self._lock = threading.RLock()
+
+    def subscribe(self, callback: Callback) -> None:
+        """
+        Registers a callback for every recorded event
+
+        Args:
+            callback (Callback): function of (kind, name, value), kind is
+                "stage", "count" or "peak"
+        """
+        self.callbacks.append(callback)
+
+    def _emit(self, kind: str, name: str, value: float) -> None:
+        for callback in self.callbacks:
+            callback(kind, name, value)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                stage["seconds"] += seconds
+                stage["calls"] += 1
+                self._emit("stage", name, seconds)
+
+    def stage(self, name: str):
+        """
+        Context manager timing a stage
+
+        Args:
+            name (str): stage name
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Increments a counter
+
+        Args:
+            name (str): counter name
+            value (int, optional): increment. Defaults to 1.
+        """
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+                self._emit("count", name, value)
+
+    def peak(self, name: str, value: int) -> None:
+        """
+        Keeps the maximal value of a quantity (array sizes, memory)
+
+        Args:
+            name (str): quantity name
+            value (int): current value
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if value > self.peaks.get(name, -1):
+                self.peaks[name] = value
+                self._emit("peak", name, value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.peaks.clear()
+
+    def to_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters),
+                "peaks": dict(self.peaks),
+            }
+
+    def to_json_lines(self, f: IO[str]) -> None:
+        """
+        Writes one JSON record per stage, counter and peak
+
+        Args:
+            f (IO[str]): opened text file
+        """
+        stamp = time.time()
+        report = self.to_dict()
+        for name, stage in report["stages"].items():
+            record = {"time": stamp, "kind": "stage", "name": name, **stage}
+            f.write(json.dumps(record) + "\n")
+        for kind, key in (("count", "counters"), ("peak", "peaks")):
+            for name, value in report[key].items():
+                record = {"time": stamp, "kind": kind, "name": name, "value": value}
+                f.write(json.dumps(record) + "\n")
+
+
+DISABLED = Profiler(enabled=False)
+
+
+def staged(name: str) -> Callable:
+    """
+    Decorator timing a method as a stage of self.profiler
+
+    Args:
+        name (str): stage name
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
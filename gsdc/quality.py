@@ -0,0 +1,114 @@
+from typing import Dict, Final, List, Optional
+
+import numpy as np
+
+from .cell_list import CellList
+from .periodic_box import Box
+
+CUTOFF: Final[float] = 0.5
+VOXEL: Final[float] = 1.0
+BINS: Final[int] = 50
+
+# metric -> kind of its limit: "max" fails above the limit, "min" fails below it
+THRESHOLDS: Final[Dict[str, str]] = {
+    "min_distance": "min",
+    "bond_max": "max",
+    "bond_min": "min",
+    "density_cv": "max",
+    "outside": "max",
+}
+
+
+def quality_report(
+    coords: np.ndarray,
+    bonds: np.ndarray,
+    box: Box,
+    cutoff: float = CUTOFF,
+    voxel: float = VOXEL,
+    bins: int = BINS,
+) -> Dict:
+    """
+    Metrics of an initial configuration
+
+    Args:
+        coords (np.ndarray): (n, 3) coordinates
+        bonds (np.ndarray): (m, 2) bonded bead ids
+        box (Box): instance of box
+        cutoff (float, optional): range of the closest pair search. Defaults to CUTOFF.
+        voxel (float, optional): edge of density voxels. Defaults to VOXEL.
+        bins (int, optional): bins of the histograms. Defaults to BINS.
+
+    Returns:
+        Dict: "min_distance", "closest" histogram of nearest neighbour
+            distances below cutoff, bond length statistics, voxel density
+            statistics and the number of beads "outside" the box
+    """
+    coords = np.reshape(coords, (-1, 3))
+    bonds = np.reshape(bonds, (-1, 2))
+    lengths = box.lengths
+    image = np.where(box.pbc, lengths, np.inf)
+    report: Dict = {"N": len(coords), "bonds": len(bonds)}
+
+    report["outside"] = int(np.sum(np.any(np.abs(coords) > 0.5 * lengths, axis=1)))
+
+    i, j, r = CellList(coords, box, cutoff).pairs()
+    nearest = np.full(len(coords), np.inf)
+    np.minimum.at(nearest, i, r)
+    np.minimum.at(nearest, j, r)
+    nearest = nearest[np.isfinite(nearest)]
+    counts, edges = np.histogram(nearest, bins=bins, range=(0.0, cutoff))
+    report["min_distance"] = float(r.min()) if len(r) else float(cutoff)
+    report["closest"] = {"counts": counts.tolist(), "edges": edges.tolist()}
+
+    if len(bonds):
+        d = coords[bonds[:, 1]] - coords[bonds[:, 0]]
+        d -= lengths * np.round(d / image)
+        r = np.sqrt(np.sum(d**2, axis=1))
+        report.update(
+            bond_min=float(r.min()),
+            bond_max=float(r.max()),
+            bond_mean=float(r.mean()),
+            bond_std=float(r.std()),
+        )
+
+    shape = np.maximum(np.round(lengths / voxel), 1).astype(np.int64)
+    frac = coords / lengths + 0.5
+    frac = np.where(box.pbc, frac % 1.0, np.clip(frac, 0.0, 1.0))
+    cell = np.minimum((frac * shape).astype(np.int64), shape - 1)
+    density = np.bincount(
+        np.ravel_multi_index(cell.T, shape), minlength=int(np.prod(shape))
+    ) / np.prod(lengths / shape)
+    report.update(
+        density_mean=float(density.mean()),
+        density_std=float(density.std()),
+        density_min=float(density.min()),
+        density_max=float(density.max()),
+        density_cv=float(density.std() / density.mean()) if density.mean() else 0.0,
+    )
+    return report
+
+
+def check(report: Dict, thresholds: Optional[Dict[str, float]]) -> List[str]:
+    """
+    Metrics violating thresholds
+
+    Args:
+        report (Dict): result of quality_report
+        thresholds (Optional[Dict[str, float]]): limits of metrics from THRESHOLDS
+
+    Raises:
+        KeyError: unknown metric
+
+    Returns:
+        List[str]: violated metrics as "name=value"
+    """
+    failed: List[str] = list()
+    for name, limit in (thresholds or dict()).items():
+        kind = THRESHOLDS[name]
+        if name not in report:
+            continue
+        if (kind == "max" and report[name] > limit) or (
+            kind == "min" and report[name] < limit
+        ):
+            failed.append(f"{name}={report[name]:g}")
+    return failed
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Final, List, Union
+
+import numpy as np
+
+BLOCK: Final[int] = 4096
+
+SeedType = Union[int, np.random.SeedSequence, np.random.Generator, None]
+
+
+class Sampler:
+    """
+    Block-buffered source of random unit vectors and uniform numbers
+
+    Directions are normalized normal triples, so they are uniform on the
+    sphere. They are generated in blocks and handed out one by one or in
+    batches, which removes a NumPy call per bond from chain growth
+
+    Attributes:
+        self.block (int): size of a generated block
+        self.seed_sequence (np.random.SeedSequence): seed of the sampler
+        self.rng (np.random.Generator): generator filling the blocks
+    """
+
+    def __init__(self, seed: SeedType = None, block: int = BLOCK) -> None:
+        """
+        Args:
+            seed (SeedType, optional): int, SeedSequence or a Generator
+                to draw the blocks from. Defaults to None.
+            block (int, optional): size of a generated block. Defaults to BLOCK.
+        """
+        if isinstance(seed, np.random.Generator):
+            self.rng = seed
+            self.seed_sequence = seed.bit_generator.seed_seq
+        else:
+            if isinstance(seed, np.random.SeedSequence):
+                self.seed_sequence = seed
+            else:
+                self.seed_sequence = np.random.SeedSequence(seed)
+            self.rng = np.random.default_rng(self.seed_sequence)
+        self.block = block
+        self._vectors = np.empty((0, 3))
+        self._uniform = np.empty(0)
+        self._vector_pos = 0
+        self._uniform_pos = 0
+
+    def spawn(self, n: int) -> List["Sampler"]:
+        """
+        Independent samplers, e.g. one per worker or per molecule copy
+
+        Args:
+            n (int): number of samplers
+
+        Raises:
+            ValueError: the generator of the sampler has no SeedSequence
+
+        Returns:
+            List[Sampler]: samplers with spawned seeds and the same block size
+        """
+        if not isinstance(self.seed_sequence, np.random.SeedSequence):
+            raise ValueError("Sampler: spawn needs a SeedSequence seed")
+        return [Sampler(seed, self.block) for seed in self.seed_sequence.spawn(n)]
+
+    def vectors(self, count: int, length: float = 1.0) -> np.ndarray:
+        """
+        Random vectors of a given length
+
+        Args:
+            count (int): number of vectors
+            length (float, optional): Defaults to 1.0.
+
+        Returns:
+            np.ndarray: (count, 3) vectors
+        """
+        if self._vector_pos + count > len(self._vectors):
+            rest = self._vectors[self._vector_pos :]
+            v = self.rng.normal(size=(max(self.block, count - len(rest)), 3))
+            v /= np.sqrt(np.sum(v**2, axis=1))[:, None]
+            self._vectors = np.vstack([rest, v])
+            self._vector_pos = 0
+        v = self._vectors[self._vector_pos : self._vector_pos + count] * length
+        self._vector_pos += count
+        return v
+
+    def vector(self, length: float = 1.0) -> np.ndarray:
+        """
+        One random vector of a given length
+
+        Args:
+            length (float, optional): Defaults to 1.0.
+
+        Returns:
+            np.ndarray: (3,) vector
+        """
+        return self.vectors(1, length)[0]
+
+    def uniform(self, count: int) -> np.ndarray:
+        """
+        Uniform numbers in [0.0, 1.0)
+
+        Args:
+            count (int): number of values
+
+        Returns:
+            np.ndarray: (count,) values
+        """
+        if self._uniform_pos + count > len(self._uniform):
+            rest = self._uniform[self._uniform_pos :]
+            u = self.rng.random(max(self.block, count - len(rest)))
+            self._uniform = np.concatenate([rest, u])
+            self._uniform_pos = 0
+        u = self._uniform[self._uniform_pos : self._uniform_pos + count]
+        self._uniform_pos += count
+        return u
+
+    def state(self) -> Dict[str, Any]:
+        """Generator state and unused buffered numbers, see Sampler.set_state"""
+        return {
+            "block": self.block,
+            "rng": self.rng.bit_generator.state,
+            "vectors": self._vectors[self._vector_pos :].copy(),
+            "uniform": self._uniform[self._uniform_pos :].copy(),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Continues the stream exactly where Sampler.state was taken
+
+        Args:
+            state (Dict[str, Any]): result of Sampler.state
+        """
+        self.block = int(state["block"])
+        self.rng.bit_generator.state = state["rng"]
+        self._vectors = np.array(state["vectors"], dtype=np.float64).reshape(-1, 3)
+        self._uniform = np.array(state["uniform"], dtype=np.float64)
+        self._vector_pos = 0
+        self._uniform_pos = 0
@@ -0,0 +1,135 @@
+from typing import Any, Dict, Final, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+POSITION_DTYPE: Final = np.float32
+BOND_DTYPE: Final = np.uint32
+GROWTH: Final[float] = 1.5
+
+
+def typeid_dtype(num_types: int) -> np.dtype:
+    """Smallest unsigned dtype for type ids: uint8, uint16 or uint32"""
+    for dtype in (np.uint8, np.uint16):
+        if num_types <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    return np.dtype(np.uint32)
+
+
+class Buffer:
+    """
+    Growable array with amortized appends
+
+    Values are cast to the buffer dtype once, when they are copied in,
+    so the stored array can be handed to writers as is
+
+    Attributes:
+        self.data (np.ndarray): storage, its first axis has spare capacity
+        self.size (int): number of used rows
+    """
+
+    def __init__(self, shape: Tuple[int, ...] = (), dtype: DTypeLike = np.float64):
+        self.data = np.empty((0, *shape), dtype=dtype)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def array(self) -> np.ndarray:
+        """View of the used rows"""
+        return self.data[: self.size]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.data.dtype
+
+    def extend(self, values: np.ndarray) -> None:
+        """
+        Appends rows
+
+        Args:
+            values (np.ndarray): (n, *shape) values of any numeric dtype
+        """
+        values = np.reshape(values, (-1, *self.data.shape[1:]))
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(
+                (max(int(GROWTH * len(self.data)), end), *self.data.shape[1:]),
+                dtype=self.data.dtype,
+            )
+            grown[: self.size] = self.data[: self.size]
+            self.data = grown
+        self.data[self.size : end] = values
+        self.size = end
+
+    def assign(self, values: np.ndarray) -> None:
+        """Replaces the content, keeping the dtype"""
+        self.data = np.array(values, dtype=self.data.dtype).reshape(
+            -1, *self.data.shape[1:]
+        )
+        self.size = len(self.data)
+
+    def astype(self, dtype: DTypeLike) -> None:
+        """Changes the dtype of the stored values"""
+        self.data = self.data[: self.size].astype(dtype)
+
+    def copy(self) -> "Buffer":
+        buffer = Buffer(self.data.shape[1:], self.data.dtype)
+        buffer.assign(self.array)
+        return buffer
+
+
+def encode(
+    names: List[str], values: Iterable[str], dtype: np.dtype
+) -> Tuple[np.ndarray, np.dtype]:
+    """
+    Ids of names in a registry, new names are appended to it
+
+    Args:
+        names (List[str]): registry of names, changed in place
+        values (Iterable[str]): names to encode
+        dtype (np.dtype): current id dtype
+
+    Returns:
+        Tuple[np.ndarray, np.dtype]: ids and the id dtype, wider if the
+            registry has outgrown the current one
+    """
+    unique, inverse = np.unique(
+        np.asarray(list(values), dtype=str), return_inverse=True
+    )
+    lookup = dict(zip(names, range(len(names))))
+    for name in unique.tolist():
+        if name not in lookup:
+            lookup[name] = len(names)
+            names.append(name)
+    dtype = np.promote_types(dtype, typeid_dtype(len(names)))
+    ids = np.array([lookup[name] for name in unique.tolist()], dtype=dtype)
+    return ids[inverse.reshape(-1)], dtype
+
+
+def expand(
+    table: Dict[str, Any],
+    names: Sequence[str],
+    ids: np.ndarray,
+    default: Any,
+    dtype: DTypeLike = np.float32,
+) -> np.ndarray:
+    """
+    Per-item values of a per-name table
+
+    The table is turned into one row per registered name and indexed by
+    the ids, so the result costs no Python work per item
+
+    Args:
+        table (Dict[str, Any]): values by name, scalars or tuples
+        names (Sequence[str]): registry the ids refer to
+        ids (np.ndarray): (n,) ids into names
+        default (Any): value of names missing in the table
+        dtype (DTypeLike, optional): Defaults to np.float32.
+
+    Returns:
+        np.ndarray: (n, ...) values
+    """
+    lookup = np.array([table.get(name, default) for name in names], dtype=dtype)
+    return lookup.reshape(len(names), *np.shape(default))[ids]
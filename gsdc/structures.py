@@ -0,0 +1,192 @@
+from typing import Final, Sequence
+
+import numpy as np
+
+from .constructor import BOND_LENGTH
+from .molecule import Mol
+from .periodic_box import Box
+
+POOL_SIZE: Final[int] = 64
+KEEP: Final[float] = 0.25
+
+
+def lattice(
+    lengths: np.ndarray, density: float, jitter: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Jittered square lattice on a rectangle centered at 0.0
+
+    Args:
+        lengths (np.ndarray): two edges of the rectangle
+        density (float): number of points per unit area
+        jitter (float): random shift in lattice spacings
+        rng (np.random.Generator): source of random numbers
+
+    Returns:
+        np.ndarray: (count, 2) points
+    """
+    n = np.maximum(np.round(lengths * np.sqrt(density)), 1).astype(int)
+    grid = np.array(np.meshgrid(*[np.arange(k) for k in n], indexing="ij"))
+    grid = grid.reshape(2, -1).T + 0.5
+    grid += jitter * (rng.random(grid.shape) - 0.5)
+    return grid * lengths / n - 0.5 * lengths
+
+
+def sphere(count: int) -> np.ndarray:
+    """
+    Nearly uniform points on the unit sphere (Fibonacci lattice)
+
+    Args:
+        count (int): number of points
+
+    Returns:
+        np.ndarray: (count, 3) unit vectors
+    """
+    k = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * k / count
+    phi = np.pi * (1.0 + 5.0**0.5) * k
+    r = np.sqrt(1.0 - z**2)
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis=-1)
+
+
+def cross_matrix(v: np.ndarray) -> np.ndarray:
+    """(k, 3) vectors -> (k, 3, 3) matrices of the cross product with them"""
+    zero = np.zeros(len(v))
+    x, y, z = v.T
+    return np.stack(
+        [
+            np.stack([zero, -z, y], -1),
+            np.stack([z, zero, -x], -1),
+            np.stack([-y, x, zero], -1),
+        ],
+        axis=1,
+    )
+
+
+def align(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Rotations turning unit vectors a into unit vectors b
+
+    Args:
+        a (np.ndarray), b (np.ndarray): (k, 3) unit vectors
+
+    Returns:
+        np.ndarray: (k, 3, 3) rotation matrices
+    """
+    v = np.cross(a, b)
+    c = np.sum(a * b, axis=1)
+    k = cross_matrix(v)
+    eye = np.broadcast_to(np.eye(3), k.shape)
+    opposite = c < -1.0 + 1e-9
+    scale = 1.0 / np.where(opposite, 1.0, 1.0 + c)
+    rotation = eye + k + np.einsum("kij,kjl->kil", k, k) * scale[:, None, None]
+    if np.any(opposite):
+        # half turn around any axis perpendicular to a
+        p = np.cross(a[opposite], [1.0, 0.0, 0.0])
+        small = np.sum(p**2, axis=1) < 1e-12
+        p[small] = np.cross(a[opposite][small], [0.0, 1.0, 0.0])
+        p /= np.linalg.norm(p, axis=1)[:, None]
+        rotation[opposite] = 2.0 * p[:, :, None] * p[:, None, :] - np.eye(3)
+    return rotation
+
+
+def spin(axes: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Rotations by angles around unit axes (Rodrigues formula)
+
+    Args:
+        axes (np.ndarray): (k, 3) unit vectors
+        angles (np.ndarray): (k,) angles in radians
+
+    Returns:
+        np.ndarray: (k, 3, 3) rotation matrices
+    """
+    k = cross_matrix(axes)
+    sin = np.sin(angles)[:, None, None]
+    cos = np.cos(angles)[:, None, None]
+    return np.eye(3) + sin * k + (1.0 - cos) * np.einsum("kij,kjl->kil", k, k)
+
+
+class Template:
+    """
+    Extended conformations of a molecule oriented from head to tail
+
+    A pool of conformations is grown at once and only the most extended
+    of them are kept. Each one is shifted so the centroid of head beads is
+    at 0.0, its director points from the head centroid to the tail centroid
+
+    Attributes:
+        self.coords (np.ndarray): (pool, num_beads, 3) conformations
+        self.director (np.ndarray): (pool, 3) unit head-to-tail vectors
+        self.length (float): mean extent of the molecule along the director
+    """
+
+    def __init__(
+        self,
+        molecule: Mol,
+        head: Sequence[str],
+        tail: Sequence[str],
+        rng: np.random.Generator,
+        pool_size: int = POOL_SIZE,
+        keep: float = KEEP,
+        bond_length: float = BOND_LENGTH,
+    ) -> None:
+        """
+        Args:
+            molecule (Mol): molecule
+            head (Sequence[str]): bead types of the head group
+            tail (Sequence[str]): bead types of the tail
+            rng (np.random.Generator): source of random numbers
+            pool_size (int, optional): grown conformations. Defaults to POOL_SIZE.
+            keep (float, optional): kept fraction of the most extended ones.
+                Defaults to KEEP.
+            bond_length (float, optional): Defaults to BOND_LENGTH.
+
+        Raises:
+            ValueError: no head or no tail beads in the molecule
+        """
+        types = np.array(molecule.types)
+        is_head = np.isin(types, list(head))
+        is_tail = np.isin(types, list(tail))
+        if not is_head.any() or not is_tail.any():
+            raise ValueError(f"{molecule.script}: no head or tail beads")
+        edge = 4.0 * bond_length * molecule.num_beads
+        coords = molecule.grow_many(
+            Box(edge, edge, edge),
+            np.zeros((pool_size, 3)),
+            bond_length=bond_length,
+            rng=rng,
+        )
+        head_center = coords[:, is_head].mean(axis=1)
+        director = coords[:, is_tail].mean(axis=1) - head_center
+        extent = np.linalg.norm(director, axis=1)
+        best = np.argsort(extent)[::-1][: max(int(keep * pool_size), 1)]
+        self.coords = coords[best] - head_center[best][:, None, :]
+        self.director = director[best] / extent[best][:, None]
+        self.length = float(
+            np.mean(np.max(np.einsum("pnj,pj->pn", self.coords, self.director), 1))
+        )
+
+    def place(
+        self, heads: np.ndarray, directions: np.ndarray, rng: np.random.Generator
+    ) -> np.ndarray:
+        """
+        Places copies with head centroids at heads, pointing along directions
+
+        Args:
+            heads (np.ndarray): (k, 3) positions of head centroids
+            directions (np.ndarray): (k, 3) unit head-to-tail directions
+            rng (np.random.Generator): source of random numbers
+
+        Returns:
+            np.ndarray: (k, num_beads, 3) unwrapped coordinates
+        """
+        chosen = rng.integers(len(self.coords), size=len(heads))
+        rotation = align(self.director[chosen], directions)
+        rotation = np.einsum(
+            "kij,kjl->kil",
+            spin(directions, rng.uniform(0.0, 2.0 * np.pi, len(heads))),
+            rotation,
+        )
+        coords = np.einsum("kij,knj->kni", rotation, self.coords[chosen])
+        return coords + heads[:, None, :]
@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Final, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .gsdc import Pot
+
+FORMATS: Final[Tuple[str, ...]] = ("gsd", "config", "field")
+FILE_NAMES: Final[Dict[str, str]] = {
+    "gsd": "input.gsd",
+    "config": "CONFIG",
+    "field": "FIELD",
+}
+
+
+class Writer:
+    """
+    Background output of pots in worker threads
+
+    Every submitted pot is frozen with Pot.snapshot(), so the caller may
+    keep adding molecules to it (or start the next system) while the
+    files of the previous one are still being flushed
+
+    Attributes:
+        self.max_workers (int): number of writer threads
+        self.pending (List[Future]): futures that are not yet collected
+    """
+
+    def __init__(self, max_workers: int = len(FORMATS)) -> None:
+        """
+        Args:
+            max_workers (int, optional): number of writer threads.
+                Defaults to the number of supported formats.
+        """
+        self.max_workers = max_workers
+        self.pending: List[Future] = list()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gsdc-writer"
+        )
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def submit(
+        self,
+        pot: "Pot",
+        formats: Iterable[str] = FORMATS,
+        directory: str = ".",
+        name: str = "molecule cyclic example",
+        solvent: str = "W",
+    ) -> Dict[str, Future]:
+        """
+        Schedules output of a pot in the requested formats
+
+        Args:
+            pot (Pot): pot to write, it is copied before the call returns
+            formats (Iterable[str], optional): any of "gsd", "config", "field".
+                Defaults to all of them.
+            directory (str, optional): output directory. Defaults to ".".
+            name (str, optional): title of DL_MESO files.
+            solvent (str, optional): solvent bead name for CONFIG. Defaults to "W".
+
+        Raises:
+            ValueError: unknown output format
+
+        Returns:
+            Dict[str, Future]: future per format, its result is the file path
+        """
+        formats = list(formats)
+        for fmt in formats:
+            if fmt not in FILE_NAMES:
+                raise ValueError(f"Writer: unknown format {fmt}")
+        snapshot = pot.snapshot()
+        futures: Dict[str, Future] = dict()
+        for fmt in formats:
+            path = os.path.join(directory, FILE_NAMES[fmt])
+            futures[fmt] = self._executor.submit(
+                Writer._write, snapshot, fmt, path, name, solvent
+            )
+        self.pending += futures.values()
+        return futures
+
+    async def write(
+        self,
+        pot: "Pot",
+        formats: Iterable[str] = FORMATS,
+        directory: str = ".",
+        name: str = "molecule cyclic example",
+        solvent: str = "W",
+    ) -> Dict[str, str]:
+        """
+        Asyncio counterpart of Writer.submit
+
+        Returns:
+            Dict[str, str]: written file path per format
+        """
+        import asyncio
+
+        futures = self.submit(pot, formats, directory, name, solvent)
+        paths = await asyncio.gather(
+            *[asyncio.wrap_future(future) for future in futures.values()]
+        )
+        return dict(zip(futures.keys(), paths))
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until all submitted files are written
+
+        Raises:
+            Exception: the first error raised by a writer thread
+        """
+        done, _ = wait(self.pending, timeout=timeout)
+        self.pending = [future for future in self.pending if future not in done]
+        for future in done:
+            future.result()
+
+    def close(self) -> None:
+        """Waits for the pending files and stops the writer threads"""
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _write(pot: "Pot", fmt: str, path: str, name: str, solvent: str) -> str:
+        if fmt == "gsd":
+            pot.brew(name=path)
+        elif fmt == "config":
+            pot.dl_meso_config(name=name, solvent=solvent, file=path)
+        else:
+            pot.dl_meso_field(name=name, file=path)
+        return path
@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+RUN = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "run.py")
+
+
+def test_every_benchmark_case_runs(tmp_path) -> None:
+    output = tmp_path / "bench.json"
+    command = [sys.executable, RUN, "--sizes", "300", "--no-memory"]
+    subprocess.run(command + ["--output", str(output)], check=True, capture_output=True)
+    results = json.loads(output.read_text())["results"]
+    assert len(results) == 36
+    for topology in ("linear", "branched", "cyclic"):
+        for box in ("periodic", "walls"):
+            assert f"pot_add/{topology}/{box}/300" in results
+    assert all(record["seconds"] >= 0.0 for record in results.values())
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, ConformerLibrary, Mol, MolGraph, Pot
+from gsdc.canonical import canonical_form, intern
+from gsdc.constructor import BOND_LENGTH
+
+
+@pytest.mark.parametrize(
+    "first, second, equal",
+    [
+        ("(A)2[(B)2](A)3", "(A)4[(B)2](A)1", True),
+        ("(A)2[(B)2](A)3", "(A)3[(B)2](A)2", False),
+        ("(A)1[(B)1][(B)1](A)1", "(A)1[(B)1](A)1(B)1", False),
+        ("(A)5", "(A)5", True),
+    ],
+)
+def test_equivalent_scripts(first: str, second: str, equal: bool) -> None:
+    a, b = Mol(first), Mol(second)
+    assert (a.key == b.key) is equal
+
+
+def test_canonical_order_of_relabelled_ring() -> None:
+    bonds = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 6)]
+    types = ["A", "B", "A", "B", "A", "B", "C"]
+    permutation = np.random.default_rng(1).permutation(7)
+    relabelled = [(int(permutation[i]), int(permutation[j])) for i, j in bonds]
+    shuffled = [""] * 7
+    for i, t in enumerate(types):
+        shuffled[permutation[i]] = t
+    order, key = canonical_form(types, bonds)
+    assert canonical_form(shuffled, relabelled)[1] == key
+    assert sorted(order.tolist()) == list(range(7))
+    assert MolGraph(bonds).key != key
+
+
+def test_regular_graph_keys_ignore_numbering() -> None:
+    # Frucht graph: 3-regular, refinement alone never splits its beads
+    shifts = [-5, -2, -4, 2, 5, -2, 2, 5, -2, -5, 4, 2]
+    ring = [(i, (i + 1) % 12) for i in range(12)]
+    chords = [(i, (i + shift) % 12) for i, shift in enumerate(shifts)]
+    bonds = sorted({(min(b), max(b)) for b in ring + chords})
+    rng = np.random.default_rng(3)
+    keys = set()
+    for _ in range(20):
+        permutation = rng.permutation(12)
+        relabelled = [(int(permutation[i]), int(permutation[j])) for i, j in bonds]
+        keys.add(canonical_form(["A"] * 12, relabelled)[1])
+    assert len(keys) == 1
+
+
+def test_intern_holds_molecules_weakly() -> None:
+    a = Mol("(A)2(B)7")
+    assert intern(Mol("(B)7(A)2")) is not a
+    assert intern(a) is a
+
+
+def test_pot_shares_species(tmp_path) -> None:
+    a, b = Mol("(A)2[(B)2](A)3"), Mol("(A)4[(B)2](A)1")
+    assert intern(b) is intern(a)
+    pot = Pot(Box(5.0, 5.0, 5.0), seed=1)
+    library = ConformerLibrary(pool_size=2, seed=1)
+    pot.add_many(a, 3, library=library)
+    pot.add_many(b, 2, library=library)
+    pot.add(b)
+    assert pot.species == {a.script: 6} and len(library) == 1
+    pool = library.get(b)
+    d = pool[:, [i for i, j in b.bonds]] - pool[:, [j for i, j in b.bonds]]
+    assert np.allclose(np.linalg.norm(d, axis=-1), BOND_LENGTH)
+    pot.fuller("W")
+    path = tmp_path / "FIELD"
+    pot.dl_meso_field(file=str(path))
+    text = path.read_text()
+    assert "MOLECULES 1" in text and "nummols 6" in text
+    assert f"W        1.0 0.0 {pot.types.count('W')}" in text
+    assert "A        1.0 0.0 0" in text
+
+
+@pytest.mark.parametrize("size", [1, 2, 9, 10])
+def test_tree_keys_ignore_numbering(size: int) -> None:
+    rng = np.random.default_rng(size)
+    bonds = [(int(rng.integers(0, i)), i) for i in range(1, size)]
+    types = rng.choice(["A", "B"], size).tolist()
+    permutation = rng.permutation(size)
+    relabelled = [(int(permutation[i]), int(permutation[j])) for i, j in bonds]
+    shuffled = [""] * size
+    for i, t in enumerate(types):
+        shuffled[permutation[i]] = t
+    order, key = canonical_form(types, bonds)
+    assert sorted(order.tolist()) == list(range(size))
+    assert canonical_form(shuffled, relabelled)[1] == key
+
+
+def test_pot_computes_keys_for_equal_signatures_only() -> None:
+    pot = Pot(Box(5.0, 5.0, 5.0), seed=1)
+    pot.add(Mol("(A)3(B)1"))
+    pot.add(Mol("(B)1(A)3"))
+    pot.add(Mol("(A)1(B)1(A)2"))
+    pot.add(Mol("(C)2"))
+    assert pot.species == {"(A)3(B)1": 2, "(A)1(B)1(A)2": 1, "(C)2": 1}
+    assert "canonical" not in vars(pot.topologies["(C)2"])
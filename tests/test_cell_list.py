@@ -0,0 +1,54 @@
+import numpy as np
+
+from gsdc import Box
+from gsdc.cell_list import CellList
+
+
+def brute_force(coords: np.ndarray, lengths: np.ndarray, cutoff: float) -> set:
+    d = coords[None, :, :] - coords[:, None, :]
+    d -= lengths * np.round(d / lengths)
+    r = np.sqrt(np.sum(d**2, axis=2))
+    i, j = np.nonzero(np.triu(r < cutoff, k=1))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def test_pairs_match_brute_force() -> None:
+    box = Box(4.0, 2.5, 1.0)
+    lengths = np.array([box.x, box.y, box.z])
+    coords = (np.random.default_rng(3).random((300, 3)) - 0.5) * lengths
+    i, j, r = CellList(coords, box, 0.6).pairs()
+    assert set(zip(i.tolist(), j.tolist())) == brute_force(coords, lengths, 0.6)
+    assert np.all(r < 0.6)
+
+
+def test_pairs_do_not_cross_walls() -> None:
+    box = Box(3.0, 3.0, 3.0, pbc=(True, False, True))
+    coords = np.array(
+        [[0.0, -1.45, 0.0], [0.0, 1.45, 0.0], [1.45, 0.0, 0.0], [-1.45, 0.0, 0.0]]
+    )
+    i, j, r = CellList(coords, box, 0.5).pairs()
+    assert list(zip(i.tolist(), j.tolist())) == [(2, 3)]
+    assert np.allclose(r, 0.1)
+
+
+def test_pairs_with_walls_match_brute_force() -> None:
+    box = Box(4.0, 1.2, 2.5, pbc=(False, True, False))
+    lengths = np.array([box.x, box.y, box.z])
+    coords = (np.random.default_rng(5).random((300, 3)) - 0.5) * lengths
+    i, j, _ = CellList(coords, box, 0.6).pairs()
+    d = coords[None, :, :] - coords[:, None, :]
+    d[..., 1] -= lengths[1] * np.round(d[..., 1] / lengths[1])
+    a, b = np.nonzero(np.triu(np.sqrt(np.sum(d**2, axis=2)) < 0.6, k=1))
+    assert set(zip(i.tolist(), j.tolist())) == set(zip(a.tolist(), b.tolist()))
+
+
+def test_half_shell_pairs_match_brute_force() -> None:
+    box = Box(3.0, 4.2, 2.0)
+    lengths = np.array([box.x, box.y, box.z])
+    coords = (np.random.default_rng(11).random((400, 3)) - 0.5) * lengths
+    cells = CellList(coords, box, 0.6)
+    assert cells._shifts()[1]
+    i, j, _ = cells.pairs()
+    assert len(i) == len(set(zip(i.tolist(), j.tolist())))
+    assert set(zip(i.tolist(), j.tolist())) == brute_force(coords, lengths, 0.6)
+    assert np.all(i < j)
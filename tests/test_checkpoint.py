@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, IterationLimitError, Mol, Pot
+
+
+@pytest.fixture
+def recipe():
+    return [(Mol("(A)5"), 4), (Mol("(A)1[(B)2](A)2"), 3)]
+
+
+def test_resume_matches_uninterrupted_build(tmp_path, recipe) -> None:
+    path = str(tmp_path / "pot.npz")
+    full = Pot(Box(6.0, 6.0, 6.0), seed=11)
+    full.build(recipe)
+    full.add_many(Mol("(A)3"), 2, workers=1)
+    full.fuller("W")
+
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=11)
+    pot.build(recipe[:1], path=path)
+    resumed, position = Pot.resume(path)
+    assert position == 4
+    resumed.build(recipe, path=path, position=position)
+    resumed.add_many(Mol("(A)3"), 2, workers=1)
+    resumed.fuller("W")
+
+    assert resumed.N == full.N and resumed.species == full.species
+    assert resumed.types == full.types
+    np.testing.assert_array_equal(resumed.bonds, full.bonds)
+    np.testing.assert_array_equal(resumed.coords, full.coords)
+
+
+def test_failed_build_is_saved(tmp_path, monkeypatch, recipe) -> None:
+    path = str(tmp_path / "pot.npz")
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=3)
+    add = Pot.add
+    limits = list()
+
+    def failing(self, molecule, library=None, iteration_limit=0):
+        if self.molecules == 5:
+            limits.append(iteration_limit)
+            raise IterationLimitError(iteration_limit)
+        return add(self, molecule, library, iteration_limit)
+
+    monkeypatch.setattr(Pot, "add", failing)
+    with pytest.raises(IterationLimitError):
+        pot.build(recipe, path=path, retries=2)
+    resumed, position = Pot.resume(path)
+    assert position == 5 and resumed.N == pot.N
+    assert limits == [limits[0], 2 * limits[0], 4 * limits[0]]
+
+
+def test_box_and_tables_are_saved(tmp_path) -> None:
+    pot = Pot(Box(4.0, 4.0, 4.0, pbc=(True, False, True)), seed=1)
+    pot.add(Mol("(A)5"))
+    pot.set_type("A", mass=3.0)
+    pot.set_bond_type("AA", k=50.0)
+    pot.checkpoint(str(tmp_path / "slit.npz"))
+    resumed, _ = Pot.resume(str(tmp_path / "slit.npz"))
+    assert resumed.box.pbc == (True, False, True)
+    assert resumed.masses == {"A": 3.0}
+    assert resumed.bond_params == {"AA": (50.0, 0.5)}
+
+
+def test_retry_limit_backs_off(monkeypatch, recipe) -> None:
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=3)
+    add = Pot.add
+    limits = list()
+
+    def failing(self, molecule, library=None, iteration_limit=0):
+        limits.append(iteration_limit)
+        if self.molecules == 2 and len(limits) == 3:
+            raise IterationLimitError(iteration_limit)
+        return add(self, molecule, library, iteration_limit)
+
+    monkeypatch.setattr(Pot, "add", failing)
+    pot.build(recipe[:1])
+    assert limits[3:] == [2 * limits[0]] * (len(limits) - 3)
@@ -0,0 +1,38 @@
+import json
+
+from gsdc.cli import expand, main, up_to_date
+
+
+def recipe(tmp_path) -> dict:
+    return {
+        "output": str(tmp_path / "runs"),
+        "name": "sweep",
+        "box": [3.0, 3.0, 3.0],
+        "seed": 1,
+        "molecules": [{"script": "(A)1[(B)2](A)2", "count": 2}],
+        "formats": ["gsd", "config"],
+        "sweep": {"rho": [3, 4], "molecules.0.count": [1, 2]},
+    }
+
+
+def test_expand_sweep(tmp_path) -> None:
+    systems = expand(recipe(tmp_path))
+    assert len(systems) == 4
+    assert [s["name"] for s in systems] == [f"sweep_{i}" for i in range(4)]
+    assert {(s["rho"], s["molecules"][0]["count"]) for s in systems} == {
+        (3, 1),
+        (3, 2),
+        (4, 1),
+        (4, 2),
+    }
+
+
+def test_main_builds_and_skips(tmp_path, capsys) -> None:
+    path = tmp_path / "recipe.json"
+    path.write_text(json.dumps(recipe(tmp_path)))
+    assert main([str(path), "--workers", "1"]) == 0
+    systems = expand(recipe(tmp_path))
+    assert all(up_to_date(s) for s in systems)
+    capsys.readouterr()
+    assert main([str(path), "--workers", "1"]) == 0
+    assert "0 built, 4 skipped" in capsys.readouterr().out
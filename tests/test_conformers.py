@@ -0,0 +1,44 @@
+import numpy as np
+
+from gsdc import Box, ConformerLibrary, Mol, Pot
+from gsdc.constructor import BOND_LENGTH
+
+mol = Mol("(A)2[(B)2](A)3")
+ring = Mol("(A)1[(B)2](A)2")
+
+
+def test_library_hits_and_persistence(tmp_path) -> None:
+    path = str(tmp_path / "conformers.npz")
+    with ConformerLibrary(path, pool_size=4, seed=1) as library:
+        pool = library.get(mol)
+        library.get(mol)
+        assert pool.shape == (4, mol.num_beads, 3)
+        assert library.stats["hits"] == 1 and library.stats["misses"] == 1
+    reloaded = ConformerLibrary(path)
+    assert np.array_equal(reloaded.get(mol), pool)
+    assert reloaded.hits == 1
+    reloaded.invalidate()
+    assert len(reloaded) == 0
+
+
+def test_library_size_cap() -> None:
+    library = ConformerLibrary(pool_size=2, max_bytes=1)
+    library.get(mol)
+    library.get(ring)
+    assert len(library) == 1 and library.evictions == 1
+
+
+def test_pot_add_many_with_library() -> None:
+    box = Box(4.0, 4.0, 4.0)
+    lengths = np.array([4.0, 4.0, 4.0])
+    pot = Pot(box, seed=2)
+    library = ConformerLibrary(pool_size=3, seed=2)
+    pot.add_many(mol, 10, library=library)
+    pot.add(mol, library=library)
+    assert pot.N == 11 * mol.num_beads and pot.species[mol.script] == 11
+    assert np.all(np.abs(pot.coords) <= 2.0)
+    bonds = np.array(pot.bonds)
+    d = pot.coords[bonds[:, 1]] - pot.coords[bonds[:, 0]]
+    d -= lengths * np.round(d / lengths)
+    r = np.sqrt(np.sum(d**2, axis=1))
+    assert np.allclose(r, BOND_LENGTH)
@@ -1,5 +1,6 @@
 from typing import Final
 
+import numpy as np
 import pytest
 
 from gsdc import Box, MolGraph
@@ -22,3 +23,35 @@ def test_get_coords(graph: MolGraph, box: Box, bond_length) -> None:
         dz = z[bond[0]] - z[bond[1]]
         r = dx**2 + dy**2 + dz**2
         assert abs(r - bond_length**2) < EPS
+
+
+def test_grow_many_walls() -> None:
+    anchors = np.zeros((50, 3))
+    anchors[:, 2] = -0.9
+    coords = graph.grow_many(box, anchors, bond_length=0.5, walls=[2])
+    assert coords.shape == (50, graph.num_beads, 3)
+    assert np.all(np.abs(coords[..., 2]) < 1.0)
+    assert np.all(np.abs(coords) <= 1.0)
+    for bond in graph.bonds:
+        d = coords[:, bond[1]] - coords[:, bond[0]]
+        d[..., :2] -= 2.0 * np.round(d[..., :2] / 2.0)
+        assert np.allclose(np.sum(d**2, axis=1), 0.25)
+
+
+@pytest.mark.parametrize("bonds", [LINEAR, [(0, 1), (1, 2), (2, 3), (3, 0)]])
+def test_get_coords_slit(bonds) -> None:
+    slit = Box(4.0, 4.0, 1.0, pbc=(True, True, False))
+    graph = MolGraph(bonds=bonds, sort=True)
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        coords = np.column_stack(graph.get_coords(slit, bond_length=0.6, rng=rng))
+        assert np.all(np.abs(coords[:, 2]) < 0.5)
+        assert np.all(np.abs(coords[:, :2]) <= 2.0)
+
+
+def test_grow_many_box_walls() -> None:
+    slit = Box(2.0, 2.0, 2.0, pbc=(True, True, False))
+    anchors = np.zeros((50, 3))
+    anchors[:, 2] = -0.9
+    coords = graph.grow_many(slit, anchors, bond_length=0.5)
+    assert np.all(np.abs(coords[..., 2]) < 1.0)
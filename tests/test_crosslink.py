@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot
+
+
+def make_pot() -> Pot:
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=8)
+    pot.add_many(Mol("(R)1(A)4(R)1"), 60, workers=1)
+    return pot
+
+
+@pytest.mark.parametrize("conversion", [0.3, 1.0])
+def test_crosslink(conversion: float) -> None:
+    pot = make_pot()
+    bonds = len(pot.bonds)
+    links = pot.crosslink("R", "R", radius=1.0, conversion=conversion)
+    assert 0 < links <= int(conversion * 120) // 2
+    new = np.array(pot.bonds[bonds:])
+    assert len(new) == links and pot.bond_types[bonds:] == ["link"] * links
+    assert len(np.unique(new)) == 2 * links
+    assert all(pot.types[i] == "R" for i in new.ravel())
+    d = pot.coords[new[:, 1]] - pot.coords[new[:, 0]]
+    d -= 6.0 * np.round(d / 6.0)
+    assert np.all(np.linalg.norm(d, axis=1) <= 1.0)
+    again = pot.crosslink("R", "R", radius=1.0)
+    assert len(np.unique(pot.bonds[bonds:])) == 2 * (links + again)
+
+
+def test_crosslink_outputs(tmp_path) -> None:
+    pot = make_pot()
+    links = pot.crosslink("R", "R", radius=1.0)
+    pot.fuller("W")
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    text = (tmp_path / "FIELD").read_text()
+    assert "MOLECULES 1" in text and "nummols 1" in text
+    assert f"bonds {60 * 5 + links}" in text
+    pot.checkpoint(str(tmp_path / "pot.npz"))
+    resumed, _ = Pot.resume(str(tmp_path / "pot.npz"))
+    assert resumed.bond_types == pot.bond_types
+
+
+def test_crosslink_bond_types_in_gsd(tmp_path) -> None:
+    import gsd.hoomd
+
+    pot = make_pot()
+    links = pot.crosslink("R", "R", radius=1.0)
+    pot.brew(name=str(tmp_path / "input.gsd"))
+    with gsd.hoomd.open(str(tmp_path / "input.gsd")) as f:
+        bonds = f[0].bonds
+    assert "link" in bonds.types
+    assert np.sum(bonds.typeid == bonds.types.index("link")) == links
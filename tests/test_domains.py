@@ -0,0 +1,54 @@
+import gsd.hoomd
+import numpy as np
+
+from gsdc import Box, Mol
+from gsdc.constructor import BOND_LENGTH
+from gsdc.domains import DomainBuilder
+
+
+def test_domain_builder_write(tmp_path) -> None:
+    box = Box(8.0, 4.0, 4.0)
+    builder = DomainBuilder(box, domains=4, axis="x", seed=5)
+    builder.add(Mol("(A)1[(B)2](A)2"), 8)
+    config = tmp_path / "CONFIG"
+    report = builder.write(config=str(config), workers=1)
+    lines = config.read_text().splitlines()
+    assert int(lines[1].split()[-1]) == builder.N
+    assert len(lines) == 5 + 2 * builder.N
+    assert [line.split()[0] for line in lines[5::2]].count("W") == builder.N - 40
+    assert report["pairs"] >= 0
+
+
+def test_domain_builder_reproducible() -> None:
+    builder = DomainBuilder(Box(6.0, 3.0, 3.0), domains=3, seed=1)
+    builder.add(Mol("(A)3"), 3)
+    first = [coords for _, coords, *_ in builder.build(workers=1)]
+    second = [coords for _, coords, *_ in builder.build(workers=2)]
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+        assert np.all(np.abs(a) <= 3.0)
+
+
+def test_domain_builder_streams_all_formats(tmp_path) -> None:
+    builder = DomainBuilder(Box(8.0, 4.0, 4.0), domains=4, axis="x", seed=3)
+    builder.add(Mol("(A)3"), 8)
+    builder.add(Mol("(B)2"), 4)
+    builder.add(Mol("(A)3"), 4)
+    paths = {fmt: str(tmp_path / fmt) for fmt in ("CONFIG", "FIELD", "gsd")}
+    builder.write(paths["CONFIG"], paths["gsd"], workers=2, field=paths["FIELD"])
+    field = open(paths["FIELD"]).read()
+    assert "MOLECULES 2" in field and "nummols 12" in field and "nummols 4" in field
+    assert f"W        1.0 0.0 {builder.N - 44}" in field
+    with open(paths["CONFIG"]) as f:
+        types = [line.split()[0] for line in f.readlines()[5::2]]
+    assert "".join(types) == "W" * (builder.N - 44) + "A" * 36 + "B" * 8
+    with gsd.hoomd.open(paths["gsd"]) as f:
+        frame = f[0]
+    assert frame.particles.N == builder.N and frame.bonds.N == 28
+    assert frame.particles.types == ["A", "B", "W"]
+    assert frame.bonds.types == ["AA", "BB"]
+    names = np.array(frame.particles.types)[frame.particles.typeid]
+    assert np.all(names[frame.bonds.group[:, 0]] == names[frame.bonds.group[:, 1]])
+    d = np.diff(frame.particles.position[frame.bonds.group], axis=1)[:, 0]
+    d -= [8.0, 4.0, 4.0] * np.round(d / [8.0, 4.0, 4.0])
+    assert np.allclose(np.linalg.norm(d, axis=1), BOND_LENGTH, atol=1e-4)
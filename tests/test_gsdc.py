@@ -0,0 +1,283 @@
+import gsd.hoomd
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, MolGraph, Pot
+from gsdc.constructor import BOND_LENGTH
+from gsdc.ordering import inverse
+
+box = Box(5.0, 5.0, 5.0)
+mol = Mol("(A)1[(B)2](A)2")
+
+
+def test_seed_reproducible() -> None:
+    first = Pot(box, seed=7)
+    second = Pot(box, seed=7)
+    for pot in (first, second):
+        pot.add(mol)
+        pot.fuller("W")
+    assert np.array_equal(first.coords, second.coords)
+
+
+def test_add_many_independent_of_workers() -> None:
+    serial = Pot(box, seed=11)
+    serial.add_many(mol, 5, workers=1)
+    parallel = Pot(box, seed=11)
+    parallel.add_many(mol, 5, workers=2)
+    assert np.array_equal(serial.coords, parallel.coords)
+    assert np.array_equal(serial.bonds, parallel.bonds)
+    assert serial.N == 5 * mol.num_beads
+    assert serial.molecules == 5
+    assert tuple(serial.bonds[len(mol.bonds)]) == (mol.num_beads, mol.num_beads + 1)
+
+
+class Ring(MolGraph):
+    def __init__(self, num_beads: int) -> None:
+        self.script = f"ring{num_beads}"
+        self.types = ["A"] * num_beads
+        bonds = [(i, i + 1) for i in range(num_beads - 1)] + [(0, num_beads - 1)]
+        super().__init__(bonds)
+
+
+def test_add_bare_molgraph() -> None:
+    ring = Ring(6)
+    pot = Pot(Box(4.0, 4.0, 4.0), seed=3)
+    pot.add(ring)
+    pot.add_many(Ring(6), 2, workers=1)
+    assert pot.species == {"ring6": 3} and pot.topologies["ring6"] is ring
+    assert len(pot.bonds) == 18
+
+
+def test_replicate() -> None:
+    pot = Pot(Box(2.0, 2.0, 2.0), seed=3)
+    pot.add(Mol("(A)6"))
+    pot.fuller("W")
+    big = pot.replicate(3, 2, 1)
+    assert (big.box.x, big.box.y, big.box.z) == (6.0, 4.0, 2.0)
+    assert big.N == 6 * pot.N
+    assert len(big.bonds) == 6 * len(pot.bonds)
+    assert big.species == {"(A)6": 6}
+    assert np.all(np.abs(big.coords) <= [3.0, 2.0, 1.0])
+    lengths = np.array([6.0, 4.0, 2.0])
+    bonds = np.array(big.bonds)
+    d = big.coords[bonds[:, 1]] - big.coords[bonds[:, 0]]
+    d -= lengths * np.round(d / lengths)
+    small = np.array(pot.bonds)
+    r = np.sqrt(np.sum(d**2, axis=1))
+    r0 = pot.coords[small[:, 1]] - pot.coords[small[:, 0]]
+    r0 -= 2.0 * np.round(r0 / 2.0)
+    assert np.allclose(np.sort(r), np.sort(np.tile(np.sqrt(np.sum(r0**2, axis=1)), 6)))
+
+
+def test_graft_brush() -> None:
+    pot = Pot(Box(4.0, 4.0, 6.0), seed=5)
+    chains = pot.graft(Mol("(A)1(B)9"), density=2.0, face="z-")
+    assert chains == 36 and pot.N == 360 and pot.species["(A)1(B)9"] == 36
+    anchors = pot.coords[::10]
+    assert np.allclose(anchors[:, 2], -3.0 + 0.5 * BOND_LENGTH)
+    assert np.all(pot.coords[:, 2] > -3.0) and np.all(pot.coords[:, 2] < 3.0)
+
+
+def test_slit_pot() -> None:
+    slit = Box(6.0, 6.0, 3.0, pbc=(True, True, False))
+    pot = Pot(slit, seed=8)
+    for _ in range(5):
+        pot.add(Mol("(A)10"))
+    pot.add_many(Mol("(B)6"), 20)
+    pot.polydisperse("(C){n}", 10, mean=8)
+    pot.add_bead("D")
+    pot.fuller("W")
+    assert np.all(slit.inside(pot.coords))
+    assert np.all(np.abs(pot.coords) <= [3.0, 3.0, 1.5])
+    bonds = pot.bonds
+    d = pot.coords[bonds[:, 1]] - pot.coords[bonds[:, 0]]
+    # bonds never jump through the walls
+    assert np.all(np.abs(d[:, 2]) < BOND_LENGTH + 1e-5)
+    assert pot.replicate(2, 2, 1).box.pbc == (True, True, False)
+    with pytest.raises(ValueError):
+        pot.replicate(1, 1, 2)
+
+
+@pytest.mark.parametrize(
+    "composition, expected",
+    [
+        ({"W": 0.75, "E": 0.25}, {"W": 281, "E": 94}),
+        ({"Na": 10, "Cl": 10, "W": 1.0}, {"Na": 10, "Cl": 10, "W": 355}),
+        ({"W": 300, "E": 75}, {"W": 300, "E": 75}),
+    ],
+)
+def test_fuller_composition(composition, expected) -> None:
+    pot = Pot(box, seed=2)
+    pot.fuller(composition)
+    assert pot.N == int(box.volume * pot.rho)
+    names, counts = np.unique(pot.types, return_counts=True)
+    assert dict(zip(names.tolist(), counts.tolist())) == expected
+    # types are shuffled, not laid out in blocks
+    for name, count in expected.items():
+        assert np.ptp(np.flatnonzero(np.array(pot.types) == name)) > count
+
+
+@pytest.mark.parametrize("composition", [{"W": 400}, {"W": 10}, {"W": -0.5, "E": 1.0}])
+def test_fuller_composition_raises(composition) -> None:
+    with pytest.raises(ValueError):
+        Pot(box, seed=2).fuller(composition)
+
+
+def test_property_tables(tmp_path) -> None:
+    pot = Pot(Box(3.0, 3.0, 3.0))
+    pot.add(mol)
+    pot.fuller("W")
+    pot.set_type("A", mass=2.0, charge=-1.0)
+    pot.set_type("W", diameter=0.5)
+    pot.set_bond_type("AB", k=64.0, r0=0.7)
+    pot.brew(str(tmp_path / "props.gsd"))
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    with gsd.hoomd.open(str(tmp_path / "props.gsd")) as f:
+        frame = f[0]
+    types = np.array(pot.types)
+    assert np.all(frame.particles.mass[types == "A"] == 2.0)
+    assert np.all(frame.particles.mass[types != "A"] == 1.0)
+    assert np.all(frame.particles.charge[types == "A"] == -1.0)
+    assert np.all(frame.particles.diameter == np.where(types == "W", 0.5, 1.0))
+    k = dict(zip(frame.bonds.types, frame.log["bonds/k"].tolist()))
+    assert k == {"AA": 128.0, "AB": 64.0, "BB": 128.0}
+    with open(tmp_path / "FIELD") as f:
+        lines = f.read().splitlines()
+    assert "A        2.0 -1.0 0" in lines
+    harm = [line.split() for line in lines if line.startswith("harm")]
+    assert sorted((h[3], h[4]) for h in harm) == [
+        ("128.000", "0.500000"),
+        ("128.000", "0.500000"),
+        ("128.000", "0.500000"),
+        ("64.000", "0.700000"),
+    ]
+
+
+def test_link_parameters(tmp_path) -> None:
+    pot = Pot(Box(3.0, 3.0, 3.0), seed=4)
+    pot.add_many(Mol("(R)1(A)2"), 30, workers=1)
+    pot.set_bond_type("link", k=10.0, r0=1.0)
+    assert pot.crosslink("R", "R", radius=1.5) > 0
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    with open(tmp_path / "FIELD") as f:
+        harm = [line.split() for line in f if line.startswith("harm")]
+    assert {(h[3], h[4]) for h in harm} == {
+        ("128.000", "0.500000"),
+        ("10.000", "1.000000"),
+    }
+
+
+def test_field_interactions(tmp_path, capsys) -> None:
+    pot = Pot(Box(3.0, 3.0, 3.0))
+    pot.add(mol)
+    pot.fuller("W")
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    lines = (tmp_path / "FIELD").read_text().splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith("INTERACTIONS"))
+    count = int(lines[start].split()[1])
+    assert count == 6
+    assert all("dpd" in line for line in lines[start + 1 : start + 1 + count])
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("order", [None, "hilbert"])
+def test_config_follows_field_species(tmp_path, order) -> None:
+    pot = Pot(Box(4.0, 4.0, 4.0), seed=2)
+    pot.add_many(Mol("(A)3"), 2, workers=1)
+    pot.add(Mol("(B)2"))
+    pot.add(Mol("(A)1[(A)1](A)1"))
+    pot.add_bead("C")
+    pot.fuller("W")
+    assert pot.sequence == [("(A)3", 2), ("(B)2", 1), ("(A)3", 1)]
+    perm = pot.dl_meso_config(file=str(tmp_path / "CONFIG"), order=order)
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    field = (tmp_path / "FIELD").read_text()
+    assert field.index("(A)3\nnummols 3") < field.index("(B)2\nnummols 1")
+    rest = perm[pot.types.count("W") :]
+    assert "".join(np.array(pot.types)[rest]) == "C" + "AAA" * 3 + "BB"
+    assert sorted(rest[1:10].tolist()) == [0, 1, 2, 3, 4, 5, 8, 9, 10]
+    assert np.all(np.diff(rest[1:10].reshape(3, 3), axis=1) == 1)
+
+
+def check_config_field(pot: Pot, tmp_path, **kwargs) -> None:
+    """CONFIG lists the FIELD molecules bead by bead, bonds stay in them"""
+    perm = pot.dl_meso_config(file=str(tmp_path / "CONFIG"), **kwargs)
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    with open(tmp_path / "CONFIG") as f:
+        types = [line.split()[0] for line in f.readlines()[5::2]]
+    lines = (tmp_path / "FIELD").read_text().splitlines()
+    k = next(i for i, line in enumerate(lines) if line.startswith("MOLECULES"))
+    blocks = list()
+    for _ in range(int(lines[k].split()[1])):
+        copies, beads = int(lines[k + 2].split()[1]), int(lines[k + 3].split()[1])
+        names = [line.split()[0] for line in lines[k + 4 : k + 4 + beads]]
+        k += 4 + beads
+        count = int(lines[k].split()[1])
+        links = [tuple(map(int, line.split()[1:3])) for line in lines[k + 1 :][:count]]
+        blocks.append((copies, names, links))
+        k += 1 + count
+    first = len(types) - sum(copies * len(names) for copies, names, _ in blocks)
+    expected, bonds = list(), set()
+    for copies, names, links in blocks:
+        for _ in range(copies):
+            bonds |= {(first + i - 1, first + j - 1) for i, j in links}
+            expected += names
+            first += len(names)
+    assert types[len(types) - len(expected) :] == expected
+    stored = np.sort(inverse(perm)[pot.bonds], axis=1)
+    assert set(map(tuple, stored.tolist())) == bonds
+
+
+def grafted(pot: Pot, molecule: Mol) -> None:
+    pot.graft(molecule, density=1.0)
+
+
+def micelle(pot: Pot, molecule: Mol) -> None:
+    pot.micelle(molecule, head=["H"], tail=["T"], count=10)
+
+
+def bilayer(pot: Pot, molecule: Mol) -> None:
+    pot.bilayer(molecule, head=["H"], tail=["T"], area=2.0)
+
+
+def vesicle(pot: Pot, molecule: Mol) -> None:
+    pot.vesicle(molecule, head=["H"], tail=["T"], radius=2.5, area=4.0)
+
+
+def lamellae(pot: Pot, molecule: Mol) -> None:
+    pot.lamellae(molecule, head=["H"], tail=["T"], layers=1, area=2.0)
+
+
+def many(pot: Pot, molecule: Mol) -> None:
+    pot.add_many(molecule, 3, workers=1)
+
+
+@pytest.mark.parametrize("build", [grafted, micelle, bilayer, vesicle, lamellae, many])
+def test_builders_use_shared_numbering(tmp_path, build) -> None:
+    pot = Pot(Box(8.0, 8.0, 8.0), seed=6)
+    pot.add(Mol("(T)4(H)2"))
+    build(pot, Mol("(H)2(T)4"))
+    assert list(pot.species) == ["(T)4(H)2"]
+    pot.fuller("W")
+    check_config_field(pot, tmp_path)
+    check_config_field(pot, tmp_path, order="hilbert")
+
+
+def test_polydisperse_uses_shared_numbering(tmp_path) -> None:
+    pot = Pot(Box(5.0, 5.0, 5.0), seed=6)
+    pot.add(Mol("(B)2(A)1"))
+    pot.polydisperse("(A)1(B){n}", 20, 3.0)
+    assert pot.species["(B)2(A)1"] > 1
+    check_config_field(pot, tmp_path, solvent=[])
+
+
+@pytest.mark.parametrize("order", [None, "hilbert"])
+def test_replicate_keeps_field_molecules(tmp_path, order) -> None:
+    pot = Pot(Box(2.5, 2.5, 2.5), seed=9)
+    for _ in range(3):
+        pot.add(Mol("(A)6"))
+        pot.add(Mol("(B)4"))
+    pot.fuller("W")
+    big = pot.replicate(2, 2, 1)
+    assert big.sequence == [("(A)6", 12), ("(B)4", 12)]
+    check_config_field(big, tmp_path, order=order)
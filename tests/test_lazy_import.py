@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+
+def test_check_script_does_not_import_numpy() -> None:
+    statement = (
+        "import sys, gsdc; gsdc.check_script('(A)2'); "
+        "assert 'numpy' not in sys.modules and 'gsd' not in sys.modules; "
+        "gsdc.Pot; assert 'gsd.hoomd' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+def test_public_api_is_unchanged() -> None:
+    import gsdc
+
+    for name in gsdc.__all__:
+        assert getattr(gsdc, name) is not None
+        assert name in dir(gsdc)
@@ -0,0 +1,91 @@
+import gsd.hoomd
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot
+from gsdc.cell_list import CellList
+from gsdc.ordering import hilbert, inverse, molecule_ids, morton, order
+
+
+def grid(bits: int) -> np.ndarray:
+    n = 1 << bits
+    return np.array(np.meshgrid(*[np.arange(n)] * 3, indexing="ij")).reshape(3, -1).T
+
+
+@pytest.mark.parametrize("bits", [1, 2, 3, 4])
+def test_hilbert_steps_to_face_neighbours(bits: int) -> None:
+    cells = grid(bits)
+    keys = hilbert(cells, bits)
+    assert np.array_equal(np.sort(keys), np.arange(len(cells)))
+    steps = np.abs(np.diff(cells[np.argsort(keys)], axis=0)).sum(axis=1)
+    assert np.all(steps == 1)
+
+
+def test_morton_interleaves_bits() -> None:
+    keys = morton(np.array([[0, 0, 1], [0, 1, 0], [1, 0, 0], [1, 1, 1], [2, 0, 0]]), 2)
+    assert keys.tolist() == [1, 2, 4, 7, 32]
+
+
+def test_molecule_ids_and_order() -> None:
+    bonds = np.array([[0, 1], [1, 2], [3, 4], [4, 5], [6, 7]])
+    groups = molecule_ids(10, bonds)
+    assert groups.tolist() == [0, 0, 0, 1, 1, 1, 2, 2, 3, 4]
+    perm = order(np.zeros((10, 3)), Box(4.0, 4.0, 4.0), groups=groups)
+    assert perm.tolist() == list(range(10))
+    assert np.array_equal(inverse(perm[::-1]), np.arange(10)[::-1])
+
+
+def test_molecule_ids_follow_crosslinks() -> None:
+    bonds = np.array([[0, 1], [1, 2], [3, 4], [4, 5], [6, 7], [7, 8], [2, 6]])
+    assert molecule_ids(9, bonds).tolist() == [0, 0, 0, 1, 1, 1, 0, 0, 0]
+    assert molecule_ids(3, np.empty((0, 2))).tolist() == [0, 1, 2]
+
+
+def make_pot() -> Pot:
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=7)
+    pot.add_many(Mol("(A)1[(B)2](A)2"), 20, workers=1)
+    pot.add_many(Mol("(C)4"), 10, workers=1)
+    pot.fuller({"W": 0.9, "E": 0.1})
+    return pot
+
+
+@pytest.mark.parametrize("curve", ["morton", "hilbert"])
+@pytest.mark.parametrize("contiguous", [False, True])
+def test_brew_reordered(tmp_path, curve: str, contiguous: bool) -> None:
+    pot = make_pot()
+    perm = pot.brew(str(tmp_path / "sorted.gsd"), order=curve, contiguous=contiguous)
+    assert np.array_equal(np.sort(perm), np.arange(pot.N))
+    with gsd.hoomd.open(str(tmp_path / "sorted.gsd")) as f:
+        frame = f[0]
+    assert np.array_equal(frame.particles.position, pot.coords[perm])
+    assert np.array_equal(frame.particles.typeid, pot.typeid[perm])
+    assert np.array_equal(perm[frame.bonds.group], pot.bonds)
+    # neighbours are closer in the written order
+    i, j, _ = CellList(frame.particles.position, pot.box, 1.0).pairs()
+    k, m, _ = CellList(pot.coords, pot.box, 1.0).pairs()
+    assert np.median(np.abs(i - j)) < 0.5 * np.median(np.abs(k - m))
+    if contiguous:
+        groups = molecule_ids(pot.N, pot.bonds)[perm]
+        assert len(np.unique(groups)) == len(np.flatnonzero(np.diff(groups))) + 1
+
+
+def test_brew_keeps_storage_order(tmp_path) -> None:
+    assert make_pot().brew(str(tmp_path / "plain.gsd")) is None
+
+
+def test_config_reordered(tmp_path) -> None:
+    pot = make_pot()
+    perm = pot.dl_meso_config(
+        file=str(tmp_path / "CONFIG"), solvent=["W", "E"], order="hilbert"
+    )
+    types = np.array(pot.types)[perm]
+    solvent = np.isin(types, ["W", "E"])
+    assert np.all(solvent[: solvent.sum()])
+    rest = perm[solvent.sum() :]
+    # molecules stay whole, in their inner order, species stay together
+    inner = np.diff(molecule_ids(pot.N, pot.bonds)[rest]) == 0
+    assert np.all(np.diff(rest)[inner] == 1)
+    assert "".join(types[solvent.sum() :].tolist()).startswith("ABBAA" * 20)
+    with open(tmp_path / "CONFIG") as f:
+        lines = f.readlines()[5:]
+    assert [line.split()[0] for line in lines[::2]] == types.tolist()
@@ -1,5 +1,6 @@
 from typing import Final
 
+import numpy as np
 import pytest
 
 from gsdc import Box, OutBoxError
@@ -19,3 +20,25 @@ def test_periodic_raises():
     with pytest.raises(OutBoxError) as err:
         Box.periodic(coord=11, box=0)
     assert "Some bead occure out of box > 1.5 box" in str(err.value)
+
+
+def test_wrap_only_periodic_axes():
+    box = Box(2.0, 2.0, 2.0, pbc=(True, False, True))
+    coords = np.array([[1.5, 1.5, -1.5]])
+    assert np.allclose(box.wrap(coords), [[-0.5, 1.5, 0.5]])
+    assert box.walls == [1]
+    assert not box.inside(coords)[0]
+    assert box.inside(box.wrap(np.array([[1.5, 0.5, -1.5]])))[0]
+
+
+def test_sample_strictly_inside_walls():
+    box = Box(2.0, 3.0, 4.0, pbc=(False, False, True))
+    coords = box.sample(np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5]]))
+    assert np.all(box.inside(coords))
+    assert coords[0, 2] == -2.0
+    assert np.allclose(coords[1], 0.0)
+
+
+def test_periodic_correct_keeps_walls():
+    box = Box(2.0, 2.0, 2.0, pbc=(True, True, False))
+    assert box.periodic_correct(1.5, 0.0, 1.5) == (-0.5, 0.0, 1.5)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot
+from gsdc.constructor import BOND_LENGTH
+from gsdc.polymers import Polymer, chain_lengths
+
+
+@pytest.mark.parametrize("distribution", ["schulz-zimm", "log-normal"])
+def test_chain_lengths(distribution: str) -> None:
+    rng = np.random.default_rng(1)
+    n = chain_lengths(100000, 40.0, 1.5, rng, distribution, maximum=1000)
+    assert np.isclose(n.mean(), 40.0, rtol=0.02)
+    assert np.isclose((n**2).mean() / n.mean() ** 2, 1.5, rtol=0.05)
+    assert n.min() >= 1 and n.max() <= 1000
+
+
+@pytest.mark.parametrize("n", [1, 2, 5])
+def test_polymer_topology(n: int) -> None:
+    polymer = Polymer("(C)1((A)1[(B)2]){n}")
+    molecule = Mol(f"(C)1((A)1[(B)2]){n}")
+    types, bonds = polymer.topology(n)
+    assert types == molecule.types
+    assert sorted(map(tuple, bonds.tolist())) == molecule.bonds
+
+
+def test_polymer_template_must_end_with_repeat() -> None:
+    with pytest.raises(ValueError):
+        Polymer("(C)1((A)1[(B)2]){n}(C)1")
+
+
+def test_pot_polydisperse(tmp_path) -> None:
+    box = Box(8.0, 8.0, 8.0)
+    pot = Pot(box, seed=5)
+    repeats = pot.polydisperse("(A){n}", 200, 6.0, pdi=1.3, distribution="log-normal")
+    assert pot.N == repeats.sum() and pot.molecules == 200
+    assert sum(pot.species.values()) == 200
+    assert pot.species.get("(A)6", 0) == np.count_nonzero(repeats == 6)
+    bonds = np.array(pot.bonds)
+    assert len(bonds) == pot.N - 200
+    d = pot.coords[bonds[:, 1]] - pot.coords[bonds[:, 0]]
+    d -= 8.0 * np.round(d / 8.0)
+    assert np.allclose(np.linalg.norm(d, axis=1), BOND_LENGTH)
+    pot.dl_meso_field(file=str(tmp_path / "FIELD"))
+    pot.checkpoint(str(tmp_path / "pot.npz"))
+    resumed, _ = Pot.resume(str(tmp_path / "pot.npz"))
+    assert resumed.species == pot.species
+    lengths = [int(script[3:]) for script in pot.species]
+    assert lengths == sorted(set(repeats.tolist()), reverse=True)
+    assert [script for script, _ in pot.sequence] == list(pot.species)
+    pot.dl_meso_config(file=str(tmp_path / "CONFIG"), solvent=[])
+
+
+def test_chain_lengths_minimum() -> None:
+    with pytest.raises(ValueError):
+        chain_lengths(10, 5.0, 1.5, np.random.default_rng(1), minimum=0)
+
+
+def test_mol_after_equivalent_chain() -> None:
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=5)
+    pot.polydisperse("(A)1(B){n}", 3, 2.0, pdi=1.0)
+    pot.add(Mol("(A)1(B)2"))
+    pot.add_many(Mol("(B)2(A)1"), 2, workers=1)
+    assert pot.species == {"(A)1(B)2": 6}
+    assert isinstance(pot.topologies["(B)2(A)1"], Mol)
+
+
+def test_chains_after_equivalent_mol(tmp_path) -> None:
+    pot = Pot(Box(6.0, 6.0, 6.0), seed=5)
+    mol = Mol("(A)1(B)2")
+    pot.add(mol)
+    pot.polydisperse("(A)1(B){n}", 3, 2.0, pdi=1.0)
+    assert pot.species == {"(A)1(B)2": 4}
+    assert pot.topologies["(A)1(B)2"] is mol
+    pot.dl_meso_config(file=str(tmp_path / "CONFIG"), solvent=[])
+    with open(tmp_path / "CONFIG") as f:
+        types = [line.split()[0] for line in f.readlines()[5::2]]
+    assert types == ["A", "B", "B"] * 4
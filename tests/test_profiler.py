@@ -0,0 +1,34 @@
+import io
+import json
+
+from gsdc import Box, Mol, Pot, Profiler
+
+
+def test_profiler_records_pipeline(tmp_path) -> None:
+    profiler = Profiler()
+    events = []
+    profiler.subscribe(lambda kind, name, value: events.append((kind, name)))
+    mol = Mol("(A)1[(B)2](A)2", profiler=profiler)
+    pot = Pot(Box(3.0, 3.0, 3.0))
+    pot.profiler = profiler
+    pot.add(mol)
+    pot.fuller("W")
+    pot.dl_meso_config(file=str(tmp_path / "CONFIG"))
+    report = profiler.to_dict()
+    for stage in ("check_script", "parse", "validate", "get_coords", "add", "fuller"):
+        assert report["stages"][stage]["calls"] == 1
+    assert report["counters"]["get_coords.iterations"] >= mol.num_bonds
+    assert report["counters"]["bytes.config"] > 0
+    assert report["peaks"]["coords.nbytes"] == pot.N * 3 * pot.coords.itemsize
+    assert ("stage", "add") in events
+    f = io.StringIO()
+    profiler.to_json_lines(f)
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert {record["kind"] for record in records} == {"stage", "count", "peak"}
+
+
+def test_disabled_profiler_is_empty() -> None:
+    profiler = Profiler(enabled=False)
+    with profiler.stage("add"):
+        profiler.count("x")
+    assert profiler.to_dict() == {"stages": {}, "counters": {}, "peaks": {}}
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot, QualityError
+from gsdc.constructor import BOND_LENGTH
+
+
+def test_quality_report() -> None:
+    pot = Pot(Box(5.0, 5.0, 5.0), seed=4)
+    pot.add_many(Mol("(A)10"), 5, workers=1)
+    pot.fuller("W")
+    report = pot.quality_report(thresholds={"outside": 0, "density_cv": 1.0})
+    assert report["N"] == pot.N and report["outside"] == 0
+    assert np.isclose(report["bond_max"], BOND_LENGTH)
+    assert np.isclose(report["density_mean"], pot.N / 125.0)
+    assert 0.0 < report["min_distance"] < 0.5
+    assert sum(report["closest"]["counts"]) <= pot.N
+
+
+def test_quality_thresholds() -> None:
+    pot = Pot(Box(3.0, 3.0, 3.0), seed=4)
+    pot.fuller("W")
+    with pytest.raises(QualityError) as err:
+        pot.quality_report(thresholds={"min_distance": 0.49})
+    assert "min_distance" in str(err.value)
@@ -0,0 +1,19 @@
+import numpy as np
+
+from gsdc.sampler import Sampler
+
+
+def test_vectors_are_unit_and_isotropic() -> None:
+    sampler = Sampler(seed=1, block=1000)
+    v = np.vstack([sampler.vectors(700, 2.0), sampler.vectors(700, 2.0)])
+    assert np.allclose(np.linalg.norm(v, axis=1), 2.0)
+    # uniform on the sphere: each coordinate of a unit vector is U(-1, 1)
+    assert np.allclose(np.mean((v / 2.0) ** 2, axis=0), 1.0 / 3.0, atol=0.03)
+    assert sampler.vector().shape == (3,)
+
+
+def test_seeded_and_spawned() -> None:
+    first, second = Sampler(seed=5, block=16), Sampler(seed=5, block=64)
+    assert np.array_equal(first.uniform(100), second.uniform(100))
+    children = Sampler(seed=5).spawn(2)
+    assert not np.array_equal(children[0].vectors(4), children[1].vectors(4))
@@ -0,0 +1,49 @@
+import gsd.hoomd
+import numpy as np
+
+from gsdc import Box, Mol, Pot
+from gsdc.storage import Buffer, encode, expand
+
+
+def test_buffer_extend_and_cast() -> None:
+    buffer = Buffer((3,), np.float32)
+    for k in range(10):
+        buffer.extend(np.full((k, 3), k, dtype=np.float64))
+    assert len(buffer) == 45 and buffer.array.dtype == np.float32
+    assert buffer.array.flags.c_contiguous
+    assert np.all(buffer.array[-9:] == 9.0)
+
+
+def test_encode_widens_ids() -> None:
+    names: list = list()
+    ids, dtype = encode(names, ["B", "A", "B"], np.uint8)
+    assert names == ["A", "B"] and ids.tolist() == [1, 0, 1] and dtype == np.uint8
+    ids, dtype = encode(names, [f"T{k}" for k in range(300)], dtype)
+    assert dtype == np.uint16 and ids.max() == 301
+
+
+def test_pot_dtypes(tmp_path) -> None:
+    pot = Pot(Box(4.0, 4.0, 4.0), seed=1)
+    pot.add_many(Mol("(A)2[(B)2](A)3"), 4, workers=1)
+    pot.fuller("W")
+    assert pot.coords.dtype == np.float32
+    assert pot.typeid.dtype == np.uint8 and pot.bonds.dtype == np.uint32
+    assert pot.types[:7] == Mol("(A)2[(B)2](A)3").types
+    pot.brew(name=str(tmp_path / "input.gsd"))
+    with gsd.hoomd.open(str(tmp_path / "input.gsd")) as f:
+        frame = f[0]
+    np.testing.assert_array_equal(frame.particles.position, pot.coords)
+    assert [frame.particles.types[t] for t in frame.particles.typeid] == pot.types
+    assert frame.bonds.types == ["AA", "AB", "BB"]
+    wide = Pot(Box(4.0, 4.0, 4.0), seed=1, dtype=np.float64)
+    wide.add_many(Mol("(A)2[(B)2](A)3"), 4, workers=1)
+    assert wide.coords.dtype == np.float64
+    np.testing.assert_allclose(wide.coords, pot.coords[: wide.N], atol=1e-6)
+
+
+def test_expand() -> None:
+    ids = np.array([1, 0, 2, 1], dtype=np.uint8)
+    values = expand({"B": 2.0}, ["A", "B", "C"], ids, 1.0)
+    assert values.dtype == np.float32 and values.tolist() == [2.0, 1.0, 1.0, 2.0]
+    pairs = expand({"x": (1.0, 2.0)}, ["x", "y"], np.array([1, 0]), (0.0, 0.5))
+    assert pairs.tolist() == [[0.0, 0.5], [1.0, 2.0]]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot
+from gsdc.structures import align, sphere
+
+lipid = Mol("(H)2(T)4")
+
+
+def test_align() -> None:
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(20, 3))
+    a /= np.linalg.norm(a, axis=1)[:, None]
+    b = rng.normal(size=(20, 3))
+    b /= np.linalg.norm(b, axis=1)[:, None]
+    b[0] = -a[0]
+    rotation = align(a, b)
+    assert np.allclose(np.einsum("kij,kj->ki", rotation, a), b)
+    assert np.allclose(np.linalg.det(rotation), 1.0)
+
+
+def test_sphere() -> None:
+    points = sphere(100)
+    assert np.allclose(np.linalg.norm(points, axis=1), 1.0)
+    assert np.allclose(points.mean(axis=0), 0.0, atol=0.05)
+
+
+def test_bilayer_and_trim() -> None:
+    pot = Pot(Box(4.0, 4.0, 10.0), seed=1)
+    count = pot.bilayer(lipid, head=["H"], tail=["T"], area=1.0)
+    assert count == 32 and pot.N == 32 * 6
+    types = np.array(pot.types)
+    heads = np.abs(pot.coords[types == "H", 2]).mean()
+    tails = np.abs(pot.coords[types == "T", 2]).mean()
+    assert heads > tails
+    pot.fuller("W")
+    before = pot.N
+    removed = pot.trim("W")
+    assert removed > 0 and pot.N == before - removed
+    assert all(t != "W" for t in pot.types[: 32 * 6])
+    assert max(max(b) for b in pot.bonds) < 32 * 6
+
+
+def test_micelle() -> None:
+    pot = Pot(Box(8.0, 8.0, 8.0), seed=2)
+    pot.micelle(lipid, head=["H"], tail=["T"], count=30)
+    types = np.array(pot.types)
+    r = np.linalg.norm(pot.coords, axis=1)
+    assert r[types == "H"].mean() > r[types == "T"].mean()
+
+
+def test_trim_keeps_bonded_solvent_type() -> None:
+    pot = Pot(Box(3.0, 3.0, 3.0), seed=4)
+    pot.add_many(Mol("(A)2(W)2"), 5, workers=1)
+    bonds = pot.bonds.copy()
+    pot.fuller("W")
+    pot.trim("W", cutoff=1.0)
+    assert np.array_equal(pot.bonds, bonds)
+    assert np.all(pot.bonds[:, 0] != pot.bonds[:, 1])
+    with pytest.raises(ValueError):
+        pot._remove(np.arange(pot.N) == 0)
+
+
+def test_lamellae_period_too_thin() -> None:
+    pot = Pot(Box(4.0, 4.0, 6.0), seed=1)
+    with pytest.raises(ValueError):
+        pot.lamellae(lipid, head=["H"], tail=["T"], layers=4)
+    assert pot.lamellae(lipid, head=["H"], tail=["T"], layers=1) > 0
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_package_type_checks() -> None:
+    pytest.importorskip("mypy")
+    command = [sys.executable, "-m", "mypy", "gsdc"]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from gsdc import Box, Mol, Pot, Profiler, Writer
+
+
+def make_pot() -> Pot:
+    pot = Pot(Box(3.0, 3.0, 3.0))
+    pot.add(Mol("(A)1[(B)2](A)2"))
+    pot.fuller("W")
+    return pot
+
+
+def test_snapshot_is_frozen() -> None:
+    pot = make_pot()
+    snapshot = pot.snapshot()
+    pot.add(Mol("(A)3"))
+    assert snapshot.N == len(snapshot.coords) == pot.N - 3
+    with pytest.raises(ValueError):
+        snapshot.coords[0, 0] = 0.0
+
+
+def test_writer_submit(tmp_path) -> None:
+    pot = make_pot()
+    with Writer() as writer:
+        futures = writer.submit(pot, directory=str(tmp_path))
+        coords = np.array(pot.coords)
+        pot.add(Mol("(A)3"))
+        paths = {fmt: future.result() for fmt, future in futures.items()}
+    assert set(paths) == {"gsd", "config", "field"}
+    for path in paths.values():
+        assert os.path.getsize(path) > 0
+    with open(paths["config"]) as f:
+        assert f.readlines()[1].split()[-1] == str(len(coords))
+
+
+def test_writer_unknown_format(tmp_path) -> None:
+    with Writer() as writer:
+        with pytest.raises(ValueError):
+            writer.submit(make_pot(), formats=["xyz"], directory=str(tmp_path))
+
+
+def test_writer_reports_into_profiler(tmp_path) -> None:
+    profiler = Profiler()
+    pot = make_pot()
+    pot.profiler = profiler
+    with Writer() as writer:
+        writer.submit(pot, directory=str(tmp_path))
+        for _ in range(20):
+            pot.add(Mol("(A)3"))
+    report = profiler.to_dict()
+    assert report["stages"]["add"]["calls"] == 20
+    assert {"bytes.gsd", "bytes.config", "bytes.field"} <= set(report["counters"])